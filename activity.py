@@ -0,0 +1,388 @@
+"""Asynchronous, buffered activity logging.
+
+Activity records are put on a bounded in-memory queue and written in
+batches by a background thread, so logging never blocks a request on I/O.
+When the queue is full, records are handled by the configured overflow
+policy; only records are dropped, never the markers of ``flush`` and
+``close``. The queue is flushed when the process exits.
+"""
+
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from typing import Dict, List, Optional
+
+# Overflow policies for a full queue
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+
+class StreamSink:
+    """Writes activity records as text lines to a stream, stdout by default."""
+
+    def __init__(self, stream=None) -> None:
+        """Create the sink.
+
+        Args:
+            stream: Text stream, ``sys.stdout`` at write time if None
+        """
+        self.stream = stream
+
+    def write(self, records: List[Dict]) -> None:
+        """Write a batch of records.
+
+        Args:
+            records: Activity records
+        """
+        stream = self.stream or sys.stdout
+        stream.write(
+            "".join(f"Activity: {record['activity']} executed\n" for record in records)
+        )
+        stream.flush()
+
+    def close(self) -> None:
+        """Release resources; streams are left open."""
+
+
+class FileSink:
+    """Appends activity records as JSON lines to a size-rotated file."""
+
+    def __init__(self, path: str, max_bytes: int = 10_485_760, backups: int = 5):
+        """Create the sink.
+
+        Args:
+            path: Log file path
+            max_bytes: Size after which the file is rotated
+            backups: Number of rotated files to keep
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file = None
+
+    def write(self, records: List[Dict]) -> None:
+        """Write a batch of records, rotating the file first if needed.
+
+        Args:
+            records: Activity records
+        """
+        data = "".join(json.dumps(record) + "\n" for record in records)
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        if self.max_bytes and self._file.tell() + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+
+    def close(self) -> None:
+        """Close the log file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self) -> None:
+        """Shift ``path.N`` backups by one and start a new file."""
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+
+class SQLiteSink:
+    """Inserts activity records into an ``activity`` table of a SQLite file."""
+
+    def __init__(self, path: str) -> None:
+        """Create the sink; the connection is opened by the writer thread.
+
+        Args:
+            path: SQLite database path
+        """
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def write(self, records: List[Dict]) -> None:
+        """Insert a batch of records in one transaction.
+
+        Args:
+            records: Activity records
+        """
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS activity ("
+                "id INTEGER PRIMARY KEY, ts REAL NOT NULL, activity TEXT NOT NULL, "
+                "user_id INTEGER, duration_ms REAL)"
+            )
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO activity (ts, activity, user_id, duration_ms) "
+                "VALUES (:ts, :activity, :user_id, :duration_ms)",
+                [
+                    {
+                        "ts": record["ts"],
+                        "activity": record["activity"],
+                        "user_id": record.get("user_id"),
+                        "duration_ms": record.get("duration_ms"),
+                    }
+                    for record in records
+                ],
+            )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class ActivityLogger:
+    """Bounded queue of activity records drained by a background writer.
+
+    Attributes:
+        sink: Destination of the records
+        policy: Overflow policy, one of DROP_NEWEST, DROP_OLDEST or BLOCK
+        batch_size: Maximum number of records written at once
+        flush_interval: Seconds the writer waits for more records
+        block_timeout: Seconds ``log`` may block under the BLOCK policy
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        sink,
+        max_queue: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        policy: str = DROP_NEWEST,
+        block_timeout: float = 0.1,
+    ) -> None:
+        """Create the logger; the writer thread starts with the first record.
+
+        Args:
+            sink: Object with ``write(records)`` and ``close()`` methods
+            max_queue: Maximum number of buffered records
+            batch_size: Maximum number of records written at once
+            flush_interval: Seconds the writer waits for more records
+            policy: Overflow policy for a full queue
+            block_timeout: Seconds ``log`` may block under the BLOCK policy
+        """
+        if policy not in (DROP_NEWEST, DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.sink = sink
+        self.policy = policy
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        # Markers taken off a full queue to make room under DROP_OLDEST
+        self._displaced: List = []
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def log(self, record: Dict) -> bool:
+        """Queue a record without waiting for it to be written.
+
+        Args:
+            record: Activity record
+
+        Returns:
+            bool: False if the record was dropped
+        """
+        if self._closed:
+            self.dropped += 1
+            return False
+        self._ensure_started()
+
+        try:
+            if self.policy == BLOCK:
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            pass
+
+        if self.policy == DROP_OLDEST:
+            try:
+                oldest = self._queue.get_nowait()
+                if oldest is self._STOP or isinstance(oldest, threading.Event):
+                    # The records before the marker are already with the
+                    # writer, which settles the marker after its next batch
+                    with self._lock:
+                        self._displaced.append(oldest)
+                else:
+                    self.dropped += 1
+                self._queue.put_nowait(record)
+                return True
+            except (queue.Empty, queue.Full):
+                pass
+        self.dropped += 1
+        return False
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Wait until all records queued so far are written.
+
+        Args:
+            timeout: Maximum seconds to wait, None to wait indefinitely
+
+        Returns:
+            bool: True if the records were written in time
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty()
+        marker = threading.Event()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Write the remaining records, stop the writer and close the sink.
+
+        Args:
+            timeout: Maximum seconds to wait for the writer
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            # The writer closes the sink, which may be bound to its thread
+            self._queue.put(self._STOP)
+            self._thread.join(timeout)
+        else:
+            self.sink.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the logger counters.
+
+        Returns:
+            Dict[str, int]: ``queued``, ``written``, ``dropped`` and ``errors``
+        """
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+    def _ensure_started(self) -> None:
+        """Start the writer thread if it is not running."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="activity-writer", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self) -> None:
+        """Writer loop: collect batches from the queue and write them."""
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+
+            batch = []
+            markers = []
+            stop = False
+            while item is not None:
+                if item is self._STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    self.sink.write(batch)
+                    self.written += len(batch)
+                except Exception:
+                    self.errors += 1
+            with self._lock:
+                displaced, self._displaced = self._displaced, []
+            for item in displaced:
+                if item is self._STOP:
+                    stop = True
+                else:
+                    markers.append(item)
+            for marker in markers:
+                marker.set()
+            if stop:
+                self.sink.close()
+                return
+
+
+def create_activity_logger(config) -> ActivityLogger:
+    """Create an activity logger from application configuration.
+
+    Args:
+        config: Flask configuration mapping
+
+    Returns:
+        ActivityLogger: Configured logger
+    """
+    sink_type = config.get("ACTIVITY_LOG_SINK", "file")
+    path = config.get("ACTIVITY_LOG_PATH", "activity.log")
+    if sink_type == "sqlite":
+        sink = SQLiteSink(path)
+    elif sink_type == "stream":
+        sink = StreamSink()
+    else:
+        sink = FileSink(
+            path,
+            max_bytes=config.get("ACTIVITY_LOG_MAX_BYTES", 10_485_760),
+            backups=config.get("ACTIVITY_LOG_BACKUPS", 5),
+        )
+    return ActivityLogger(
+        sink,
+        max_queue=config.get("ACTIVITY_LOG_QUEUE_SIZE", 10_000),
+        batch_size=config.get("ACTIVITY_LOG_BATCH_SIZE", 500),
+        flush_interval=config.get("ACTIVITY_LOG_FLUSH_INTERVAL", 1.0),
+        policy=config.get("ACTIVITY_LOG_POLICY", DROP_NEWEST),
+    )
+
+
+# Logger used outside of an application context
+default_logger = ActivityLogger(StreamSink())
+
+
+def get_activity_logger() -> ActivityLogger:
+    """Return the activity logger of the current application.
+
+    Returns:
+        ActivityLogger: The application's logger, or the stdout
+            ``default_logger`` outside an application context
+    """
+    from flask import current_app
+
+    if not current_app:
+        return default_logger
+    return current_app.extensions.get("activity_logger", default_logger)
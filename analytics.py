@@ -0,0 +1,232 @@
+"""Vectorized streak and completion analytics across all habits.
+
+The progress table is loaded as ``(habit_id, date, completed)`` column
+arrays in one query, and streaks are computed for every habit at once with
+NumPy run-length operations instead of iterating over Progress objects. The
+results follow the semantics of the streak calculators in ``models``.
+"""
+
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import String, cast, select
+
+from db import db
+from models import Habit, Progress
+
+
+# Row layout of the progress columns loaded from the database
+PROGRESS_DTYPE = np.dtype(
+    [("habit_id", np.int64), ("date", "datetime64[D]"), ("completed", bool)]
+)
+
+
+def load_progress_arrays(chunk_size: int = 100_000) -> np.ndarray:
+    """Load all progress entries as a record array sorted by habit and date.
+
+    Rows are fetched through the raw DB-API cursor and converted by NumPy in
+    chunks, with dates passed as ISO strings, so no Python object is built
+    per value.
+
+    Args:
+        chunk_size: Number of rows fetched per round trip
+
+    Returns:
+        np.ndarray: Records of ``PROGRESS_DTYPE``
+    """
+    table = Progress.__table__
+    statement = select(
+        table.c.habit_id, cast(table.c.date, String), table.c.completed
+    ).order_by(table.c.habit_id, table.c.date)
+    connection = db.session.connection()
+    compiled = statement.compile(dialect=connection.dialect)
+
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute(str(compiled), compiled.params)
+        chunks = []
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=PROGRESS_DTYPE))
+    finally:
+        cursor.close()
+
+    if not chunks:
+        return np.empty(0, dtype=PROGRESS_DTYPE)
+    return np.concatenate(chunks)
+
+
+def week_indexes(dates: np.ndarray) -> np.ndarray:
+    """Return a consecutive index of the ISO week of every date.
+
+    Indexes of consecutive weeks differ by one, also across year
+    boundaries; they are offset from ``models.week_index`` but compare the
+    same way.
+
+    Args:
+        dates: datetime64[D] array
+
+    Returns:
+        np.ndarray: Week indexes, counted from Monday 1969-12-29
+    """
+    # 1970-01-01 was a Thursday, three days after the Monday starting its week
+    return (dates.astype(np.int64) + 3) // 7
+
+
+def streak_arrays(
+    habit_ids: np.ndarray, dates: np.ndarray, completed: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """Compute streaks of every habit from progress column arrays.
+
+    Entries must be sorted by habit and date.
+
+    Args:
+        habit_ids: Habit ID of every entry
+        dates: Date of every entry
+        completed: Completion state of every entry
+
+    Returns:
+        Dict[str, np.ndarray]: Arrays aligned with the sorted unique
+            ``habit_id`` array: ``current_daily``, ``longest_daily``,
+            ``current_weekly``, ``longest_weekly`` and ``completed_count``
+    """
+    unique_ids, habit_index = np.unique(habit_ids, return_inverse=True)
+    count = len(unique_ids)
+    positions = np.arange(len(habit_ids))
+    missed = ~completed
+
+    # Current daily streak: completed entries after the latest missed one
+    last_missed = np.full(count, -1, dtype=np.int64)
+    np.maximum.at(last_missed, habit_index[missed], positions[missed])
+    after_missed = completed & (positions > last_missed[habit_index])
+    current_daily = np.bincount(habit_index, weights=after_missed, minlength=count)
+
+    # Longest daily streak: runs start at every missed entry and new habit
+    starts = missed.copy()
+    starts[1:] |= habit_index[1:] != habit_index[:-1]
+    if len(starts):
+        starts[0] = True
+    run_ids = np.cumsum(starts) - 1
+    run_lengths = np.bincount(run_ids, weights=completed)
+    longest_daily = np.zeros(count)
+    np.maximum.at(longest_daily, habit_index, run_lengths[run_ids])
+
+    # Weekly streaks: runs of consecutive weeks with a completion
+    weeks = week_indexes(dates)
+    latest_week = np.full(count, np.iinfo(np.int64).min, dtype=np.int64)
+    np.maximum.at(latest_week, habit_index, weeks)
+    week_habits = habit_index[completed]
+    completed_weeks = weeks[completed]
+    # Entries are sorted, so repeated (habit, week) pairs are adjacent
+    distinct = np.ones(len(week_habits), dtype=bool)
+    distinct[1:] = (week_habits[1:] != week_habits[:-1]) | (
+        completed_weeks[1:] != completed_weeks[:-1]
+    )
+    week_habits = week_habits[distinct]
+    completed_weeks = completed_weeks[distinct]
+    week_starts = np.ones(len(week_habits), dtype=bool)
+    week_starts[1:] = (week_habits[1:] != week_habits[:-1]) | (
+        completed_weeks[1:] != completed_weeks[:-1] + 1
+    )
+    week_run_ids = np.cumsum(week_starts) - 1
+    week_run_lengths = np.bincount(week_run_ids)
+    longest_weekly = np.zeros(count, dtype=np.int64)
+    np.maximum.at(longest_weekly, week_habits, week_run_lengths[week_run_ids])
+    # The last run of a habit is current if it ends in the latest week
+    last = np.ones(len(week_habits), dtype=bool)
+    last[:-1] = week_habits[1:] != week_habits[:-1]
+    ongoing = last & (completed_weeks == latest_week[week_habits])
+    current_weekly = np.zeros(count, dtype=np.int64)
+    current_weekly[week_habits[ongoing]] = week_run_lengths[week_run_ids[ongoing]]
+
+    return {
+        "habit_id": unique_ids,
+        "current_daily": current_daily.astype(np.int64),
+        "longest_daily": longest_daily.astype(np.int64),
+        "current_weekly": current_weekly,
+        "longest_weekly": longest_weekly,
+        "completed_count": np.bincount(
+            habit_index, weights=completed, minlength=count
+        ).astype(np.int64),
+    }
+
+
+def habit_report(today: Optional[date] = None) -> List[Dict]:
+    """Compute streak and completion analytics for every habit.
+
+    Args:
+        today: Reference day for completion rates, today (UTC) if None
+
+    Returns:
+        List[Dict]: One row per habit with ``habit_id``, ``user_id``,
+            ``periodicity``, ``current_streak``, ``longest_streak``,
+            ``weekly_streak``, ``completed_count`` and ``completion_rate``
+    """
+    today = today or datetime.now(timezone.utc).date()
+    habits = db.session.execute(
+        select(
+            Habit.id,
+            Habit.user_id,
+            Habit.periodicity,
+            Habit.target_days,
+            Habit.created_at,
+        ).order_by(Habit.id)
+    ).all()
+    if not habits:
+        return []
+
+    progress = load_progress_arrays()
+    streaks = streak_arrays(
+        progress["habit_id"], progress["date"], progress["completed"]
+    )
+
+    # Scatter per-habit streaks onto all habits, including those without
+    # progress; both ID arrays are sorted
+    ids = np.array([habit.id for habit in habits], dtype=np.int64)
+    slots = np.searchsorted(ids, streaks["habit_id"])
+    known = slots < len(ids)
+    known[known] = ids[slots[known]] == streaks["habit_id"][known]
+
+    def per_habit(name):
+        values = np.zeros(len(ids), dtype=np.int64)
+        values[slots[known]] = streaks[name][known]
+        return values
+
+    current_daily = per_habit("current_daily")
+    longest_daily = per_habit("longest_daily")
+    current_weekly = per_habit("current_weekly")
+    longest_weekly = per_habit("longest_weekly")
+    completed_count = per_habit("completed_count")
+
+    created = np.array(
+        [habit.created_at.date().isoformat() for habit in habits],
+        dtype="datetime64[D]",
+    )
+    elapsed = (np.datetime64(today, "D") - created).astype(np.int64) + 1
+    total_days = np.minimum(elapsed, [habit.target_days for habit in habits])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.where(
+            total_days > 0, np.round((completed_count / total_days) * 100), 0
+        )
+    daily = np.array([habit.periodicity == "daily" for habit in habits])
+
+    return [
+        {
+            "habit_id": habit.id,
+            "user_id": habit.user_id,
+            "periodicity": habit.periodicity,
+            "current_streak": int(
+                current_daily[index] if daily[index] else current_weekly[index]
+            ),
+            "longest_streak": int(
+                longest_daily[index] if daily[index] else longest_weekly[index]
+            ),
+            "weekly_streak": int(current_weekly[index]),
+            "completed_count": int(completed_count[index]),
+            "completion_rate": int(rates[index]),
+        }
+        for index, habit in enumerate(habits)
+    ]
@@ -2,25 +2,44 @@
 
 This module creates and configures the Flask application instance,
 initializes extensions, and registers blueprints.
+
+Importing it is cheap: Flask, SQLAlchemy, the extensions and the route
+modules are imported by ``create_app``, and the module-level ``app`` used by
+``flask`` commands and WSGI servers is only built when it is first accessed.
 """
 
-from flask import Flask
-from flask_login import LoginManager
-from typing import Optional
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
 
-from config import Config
-from db import db
-from models import User
+if TYPE_CHECKING:
+    from flask import Flask
 
 
-def create_app() -> Flask:
+def create_app(config: Optional[Dict[str, Any]] = None) -> "Flask":
     """Create and configure the Flask application.
 
+    Args:
+        config: Settings overriding ``Config``, applied before the
+            extensions are built from the configuration
+
     Returns:
         Flask: Configured Flask application instance
     """
+    from flask import Flask
+    from flask_login import LoginManager
+    from sqlalchemy import inspect
+    from sqlalchemy.orm import make_transient_to_detached
+
+    from activity import create_activity_logger
+    from cache import FragmentCache, TTLCache
+    from config import Config
+    from db import db
+    from models import User
+    from security import HashingPool, LoginThrottle
+
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.config.update(config or {})
 
     # Initialize extensions
     db.init_app(app)
@@ -29,31 +48,139 @@ def create_app() -> Flask:
     login_manager.init_app(app)
     login_manager.login_view = "auth.login"
 
+    user_cache = TTLCache(
+        maxsize=app.config.get("USER_CACHE_SIZE", 1024),
+        ttl=app.config.get("USER_CACHE_TTL", 300),
+    )
+    app.extensions["user_cache"] = user_cache
+    app.extensions["fragment_cache"] = FragmentCache(
+        max_bytes=app.config.get("FRAGMENT_CACHE_MAX_BYTES", 16_777_216)
+    )
+    app.extensions["streak_cache"] = TTLCache(
+        maxsize=app.config.get("STREAK_CACHE_SIZE", 1024),
+        ttl=app.config.get("STREAK_CACHE_TTL", 3600),
+    )
+
+    # The worker processes start, and register their shutdown, on first use
+    app.extensions["hashing_pool"] = HashingPool(
+        workers=app.config.get("HASH_POOL_WORKERS", 2),
+        max_pending=app.config.get("HASH_MAX_PENDING", 32),
+        queue_timeout=app.config.get("HASH_QUEUE_TIMEOUT", 5.0),
+    )
+    app.extensions["login_throttle"] = LoginThrottle(
+        window=app.config.get("LOGIN_ATTEMPT_WINDOW", 300)
+    )
+    # The writer thread starts, and registers its exit flush, on first use
+    app.extensions["activity_logger"] = create_activity_logger(app.config)
+
     @login_manager.user_loader
     def load_user(user_id: str) -> Optional[User]:
         """Load user by ID for Flask-Login.
 
+        Users are served from the process-local user cache when possible.
+        A cached user is attached to the request's session without a query.
+
         Args:
             user_id (str): String representation of user ID
 
         Returns:
             Optional[User]: User instance if found, None otherwise
         """
-        return db.session.get(User, int(user_id))
+        values = user_cache.get(int(user_id))
+        if values is None:
+            user = db.session.get(User, int(user_id))
+            if user is not None:
+                user_cache.set(
+                    user.id,
+                    {
+                        attr.key: getattr(user, attr.key)
+                        for attr in inspect(User).column_attrs
+                    },
+                )
+            return user
+
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
 
     # Register blueprints
     from auth import auth_bp
-    from habits import habits_bp
+    from habits import load_routes
 
     app.register_blueprint(auth_bp)
-    app.register_blueprint(habits_bp)
+    app.register_blueprint(load_routes())
+
+    from commands import register_commands
+
+    register_commands(app)
+
+    from habits.write_buffer import init_write_buffer
+
+    init_write_buffer(app)
+
+    from jobs import init_jobs
+
+    init_jobs(app)
+
+    from instrumentation import init_instrumentation
+
+    init_instrumentation(app)
 
     return app
 
 
-app = create_app()
+class LazyApp:
+    """WSGI application that builds the Flask application on first use.
+
+    Servers that fork workers without preloading get workers that boot
+    without importing Flask or SQLAlchemy; the first request of each worker
+    pays for building the application instead.
+
+    Attributes:
+        factory: Function building the application
+    """
+
+    def __init__(self, factory: Callable[[], "Flask"] = create_app) -> None:
+        """Wrap an application factory.
+
+        Args:
+            factory: Function building the application
+        """
+        self.factory = factory
+        self._app: Optional["Flask"] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> "Flask":
+        """Build the application unless it was built already.
+
+        Returns:
+            Flask: The application
+        """
+        if self._app is None:
+            with self._lock:
+                if self._app is None:
+                    self._app = self.factory()
+        return self._app
+
+    def __call__(self, environ, start_response):
+        """Serve a request with the application."""
+        return self.load()(environ, start_response)
+
+
+_lazy_app = LazyApp()
+
+
+def __getattr__(name: str):
+    """Build the module-level ``app`` on first access."""
+    if name == "app":
+        return _lazy_app.load()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
+    from db import db
+
+    app = _lazy_app.load()
     with app.app_context():
         db.create_all()
     app.run(debug=True)
@@ -4,19 +4,61 @@ This module handles:
 - User registration
 - User login
 - User logout
+
+Password hashing runs in the application's hashing pool, and failed
+attempts are throttled per account and per client IP before any hashing
+happens.
 """
 
-from flask import Blueprint, render_template, redirect, url_for, flash
+from flask import (
+    Blueprint,
+    current_app,
+    render_template,
+    redirect,
+    request,
+    url_for,
+    flash,
+)
 from flask_login import login_user, logout_user, login_required
 from typing import Union, Tuple
 
 from models import User
 from forms import LoginForm, RegistrationForm
 from db import db
+from security import HashingBusy
 
 auth_bp = Blueprint("auth", __name__)
 
 
+def _throttle_limits(email: str) -> Tuple[Tuple[str, int], ...]:
+    """Return the throttle keys and limits of an authentication attempt.
+
+    Args:
+        email: Email address the attempt is made for
+
+    Returns:
+        Tuple[Tuple[str, int], ...]: Pairs of throttle key and attempt limit
+    """
+    config = current_app.config
+    return (
+        (f"account:{email.lower()}", config.get("LOGIN_MAX_ATTEMPTS_PER_ACCOUNT", 5)),
+        (f"ip:{request.remote_addr}", config.get("LOGIN_MAX_ATTEMPTS_PER_IP", 20)),
+    )
+
+
+def _is_throttled(limits: Tuple[Tuple[str, int], ...]) -> bool:
+    """Check whether any throttle key has used up its attempts.
+
+    Args:
+        limits: Pairs of throttle key and attempt limit
+
+    Returns:
+        bool: True if the attempt must be rejected
+    """
+    throttle = current_app.extensions["login_throttle"]
+    return any(throttle.is_blocked(key, limit) for key, limit in limits)
+
+
 @auth_bp.route("/register", methods=["GET", "POST"])
 def register() -> Union[str, Tuple[str, int]]:
     """Handle user registration.
@@ -33,13 +75,25 @@ def register() -> Union[str, Tuple[str, int]]:
     form = RegistrationForm()
 
     if form.validate_on_submit():
+        # Registration is throttled per client IP only
+        limits = _throttle_limits(form.email.data)[1:]
+        if _is_throttled(limits):
+            flash("Too many attempts. Please try again later.", "danger")
+            return render_template("register.html", form=form), 429
+        current_app.extensions["login_throttle"].record(limits[0][0])
+
         try:
             user = User(username=form.username.data, email=form.email.data)
-            user.set_password(form.password.data)
+            user.password = current_app.extensions["hashing_pool"].hash_password(
+                form.password.data
+            )
             db.session.add(user)
             db.session.commit()
             flash("Registration successful! Please log in.", "success")
             return redirect(url_for("auth.login"))
+        except HashingBusy:
+            flash("Server is busy. Please try again.", "danger")
+            return render_template("register.html", form=form), 503
         except Exception as e:
             db.session.rollback()
             flash("Registration failed. Please try again.", "danger")
@@ -64,11 +118,28 @@ def login() -> Union[str, Tuple[str, int]]:
     form = LoginForm()
 
     if form.validate_on_submit():
+        limits = _throttle_limits(form.email.data)
+        if _is_throttled(limits):
+            flash("Too many login attempts. Please try again later.", "danger")
+            return render_template("login.html", form=form), 429
+
         user = User.query.filter_by(email=form.email.data).first()
-        if user and user.check_password(form.password.data):
+        try:
+            valid = user is not None and current_app.extensions[
+                "hashing_pool"
+            ].check_password(user.password, form.password.data)
+        except HashingBusy:
+            flash("Server is busy. Please try again.", "danger")
+            return render_template("login.html", form=form), 503
+
+        throttle = current_app.extensions["login_throttle"]
+        if valid:
+            throttle.reset(limits[0][0])
             login_user(user)
             flash("Logged in successfully!", "success")
             return redirect(url_for("habits.dashboard"))
+        for key, _ in limits:
+            throttle.record(key)
         flash("Invalid email or password", "danger")
 
     return render_template("login.html", form=form)
@@ -0,0 +1,5 @@
+"""Performance benchmarks for PyTracker.
+
+Benchmarks are plain scripts run from the repository root, e.g.
+``python -m benchmarks.detail_chart``.
+"""
@@ -0,0 +1,124 @@
+"""Memory and latency comparison of the ORM and bitmap progress paths.
+
+For habits with a full history of 21, 365 and 3650 days, compares computing
+the current and longest streak, the completion count and the detail chart
+from ``Habit.progress`` objects against decoding the stored progress bitmap.
+
+Usage:
+    python -m benchmarks.bitmap [--repeat N]
+"""
+
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from app import create_app
+from db import db
+from habits.factory import HabitFactory
+from habits.routes.detail import build_bitmap_series, build_chart_series
+from habits.stats import rebuild_stats
+from models import DailyStreakCalculator, Habit, HabitStats, Progress, User
+
+HISTORY_DAYS = (21, 365, 3650)
+
+
+def seed_habit(days):
+    """Create a daily habit with a full history where every third day is missed.
+
+    Args:
+        days (int): Length of the history.
+
+    Returns:
+        int: ID of the created habit.
+    """
+    created_at = datetime.utcnow() - timedelta(days=days - 1)
+    habit = HabitFactory.create(f"Habit {days}", "daily", 1, days)
+    habit.created_at = created_at
+    db.session.add(habit)
+    db.session.flush()
+    db.session.bulk_insert_mappings(
+        Progress,
+        [
+            {
+                "habit_id": habit.id,
+                "date": created_at.date() + timedelta(days=offset),
+                "completed": offset % 3 != 0,
+            }
+            for offset in range(days)
+        ],
+    )
+    rebuild_stats([habit.id])
+    db.session.commit()
+    return habit.id
+
+
+def orm_path(habit_id, days):
+    """Compute streaks and chart from Progress objects."""
+    habit = db.session.get(Habit, habit_id)
+    entries = sorted(habit.progress, key=lambda entry: entry.date)
+    calculator = DailyStreakCalculator()
+    return (
+        calculator.calculate(entries),
+        calculator.longest(entries),
+        build_chart_series(habit.created_at.date(), days, entries),
+    )
+
+
+def bitmap_path(habit_id, days):
+    """Compute streaks and chart from the stored progress bitmap."""
+    bitmap = db.session.get(HabitStats, habit_id).bitmap()
+    calculator = DailyStreakCalculator()
+    return (
+        calculator.calculate_bitmap(bitmap),
+        calculator.longest_bitmap(bitmap),
+        build_bitmap_series(bitmap, bitmap.origin, days),
+    )
+
+
+def measure(func, habit_id, days, repeat):
+    """Return the best wall time in ms and peak allocated KiB of a path."""
+    best = float("inf")
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        func(habit_id, days)
+        best = min(best, time.perf_counter() - start)
+
+    db.session.expunge_all()
+    tracemalloc.start()
+    func(habit_id, days)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / 1024
+
+
+def main():
+    """Run the comparison and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username="bench", email="bench@example.com", password=""))
+        db.session.commit()
+
+        print(
+            f"{'days':>6} {'orm ms':>9} {'orm KiB':>9} "
+            f"{'bitmap ms':>10} {'bitmap KiB':>11}"
+        )
+        for days in HISTORY_DAYS:
+            habit_id = seed_habit(days)
+            orm_time, orm_memory = measure(orm_path, habit_id, days, args.repeat)
+            bits_time, bits_memory = measure(bitmap_path, habit_id, days, args.repeat)
+            print(
+                f"{days:>6} {orm_time:>9.2f} {orm_memory:>9.1f} "
+                f"{bits_time:>10.2f} {bits_memory:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Micro-benchmark for building the habit detail chart series.
+
+Compares the single-pass ``build_chart_series`` with the previous
+per-day linear search over all progress entries.
+
+Usage:
+    python -m benchmarks.detail_chart [--repeat N]
+"""
+
+import argparse
+import timeit
+from collections import namedtuple
+from datetime import date, timedelta
+
+from habits.routes.detail import build_chart_series
+
+Entry = namedtuple("Entry", ["date", "completed"])
+
+TARGET_DAYS = (21, 365, 3650)
+
+
+def linear_search_series(start_date, total_days, progress_data):
+    """Previous implementation: scan all entries for every charted day."""
+    labels = []
+    data = []
+    for day_offset in range(total_days):
+        current_date = start_date + timedelta(days=day_offset)
+        labels.append(current_date.strftime("%Y-%m-%d"))
+        progress = next((p for p in progress_data if p.date == current_date), None)
+        data.append(1 if progress and progress.completed else 0)
+    completed = len([p for p in progress_data if p.completed])
+    return labels, data, completed
+
+
+def make_history(start_date, days):
+    """Create a full history where every third day is missed."""
+    return [
+        Entry(start_date + timedelta(days=offset), offset % 3 != 0)
+        for offset in range(days)
+    ]
+
+
+def main():
+    """Run the benchmark and print per-call timings in milliseconds."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    start_date = date(2020, 1, 1)
+    print(f"{'days':>6} {'single pass':>14} {'linear search':>14}")
+    for days in TARGET_DAYS:
+        history = make_history(start_date, days)
+        assert build_chart_series(start_date, days, history) == (
+            linear_search_series(start_date, days, history)
+        )
+        timings = []
+        for func in (build_chart_series, linear_search_series):
+            number = 1 if days > 1000 and func is linear_search_series else 10
+            best = min(
+                timeit.repeat(
+                    lambda: func(start_date, days, history),
+                    number=number,
+                    repeat=args.repeat,
+                )
+            )
+            timings.append(best / number * 1000)
+        print(f"{days:>6} {timings[0]:>11.3f} ms {timings[1]:>11.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Throughput of the bulk progress importer.
+
+Generates a CSV history of ``--habits`` habits with ``--days`` days each and
+imports it into a fresh SQLite database. Reports the rows per second of
+reading, validating and writing the records, and of the whole import
+including the statistics rebuild of the affected habits.
+
+Usage:
+    python -m benchmarks.import_progress [--habits N] [--days D]
+        [--chunk-size N] [--database URI]
+"""
+
+import argparse
+import io
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from app import create_app
+from db import db
+from habits.factory import HabitFactory
+from habits.importer import import_progress, read_records
+from models import User
+
+
+def make_csv(habit_ids, start_date, days):
+    """Build an import file where every third day is missed."""
+    lines = ["habit_id,date,completed"]
+    for habit_id in habit_ids:
+        for offset in range(days):
+            day = (start_date + timedelta(days=offset)).isoformat()
+            lines.append(f"{habit_id},{day},{'false' if offset % 3 == 0 else 'true'}")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    """Run the import and print its throughput."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--habits", type=int, default=100)
+    parser.add_argument("--days", type=int, default=3650)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--database", help="Database URI, a temporary file by default")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    app = create_app()
+    app.config["SQLALCHEMY_DATABASE_URI"] = args.database or (
+        f"sqlite:///{os.path.join(directory, 'import.db')}"
+    )
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username="bench", email="bench@example.com", password=""))
+        created_at = datetime.utcnow() - timedelta(days=args.days - 1)
+        habits = []
+        for index in range(args.habits):
+            habit = HabitFactory.create(f"Habit {index}", "daily", 1, args.days)
+            habit.created_at = created_at
+            habits.append(habit)
+        db.session.add_all(habits)
+        db.session.commit()
+
+        data = make_csv([habit.id for habit in habits], created_at.date(), args.days)
+        written = []
+        report = import_progress(
+            read_records(io.StringIO(data), "csv"),
+            chunk_size=args.chunk_size,
+            on_chunk=lambda report: written.append(report.seconds),
+        )
+
+    print(
+        f"{'rows':>10} {'errors':>7} {'write s':>8} {'write rows/s':>13} "
+        f"{'total s':>8} {'total rows/s':>13}"
+    )
+    print(
+        f"{report.rows:>10} {report.error_count:>7} {written[-1]:>8.2f} "
+        f"{report.rows / written[-1]:>13.0f} {report.seconds:>8.2f} "
+        f"{report.rows / report.seconds:>13.0f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
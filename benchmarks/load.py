@@ -0,0 +1,297 @@
+"""Synthetic load benchmark of the main PyTracker routes.
+
+Seeds N users with M habits and D days of history each, then drives the
+dashboard, detail, mark and ``/api/progress`` routes of the real application
+through the Flask test client. For every route the latency percentiles,
+throughput and SQL queries per request are reported, and the results can be
+saved as JSON and compared with an earlier run.
+
+Usage:
+    python -m benchmarks.load [--users N] [--habits M] [--days D]
+        [--requests R] [--database URI] [--output results.json]
+    python -m benchmarks.load --compare before.json after.json
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event
+
+from app import create_app
+from db import db
+from habits.factory import HabitFactory
+from habits.stats import rebuild_stats
+from models import Progress, User
+
+
+def seed(users, habits, days):
+    """Create users with daily habits and a random history.
+
+    Every habit was created ``days`` ago and about 80% of its days are
+    completed, with 10% of the days missing.
+
+    Args:
+        users (int): Number of users.
+        habits (int): Habits per user.
+        days (int): Days of history per habit.
+
+    Returns:
+        dict: Habit IDs per user ID.
+    """
+    rng = random.Random(0)
+    created_at = datetime.utcnow() - timedelta(days=days - 1)
+    owned = {}
+    for index in range(users):
+        user = User(
+            username=f"user{index}", email=f"user{index}@example.com", password=""
+        )
+        db.session.add(user)
+        db.session.flush()
+        owned[user.id] = []
+        for number in range(habits):
+            habit = HabitFactory.create(f"Habit {number}", "daily", user.id, days)
+            habit.created_at = created_at
+            db.session.add(habit)
+            db.session.flush()
+            owned[user.id].append(habit.id)
+            db.session.bulk_insert_mappings(
+                Progress,
+                [
+                    {
+                        "habit_id": habit.id,
+                        "date": created_at.date() + timedelta(days=offset),
+                        "completed": rng.random() < 0.8,
+                    }
+                    for offset in range(days)
+                    if rng.random() >= 0.1
+                ],
+            )
+    rebuild_stats()
+    db.session.commit()
+    return owned
+
+
+class QueryCounter:
+    """Counts the SQL statements executed by an engine."""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._increment)
+
+    def _increment(self, *args):
+        self.count += 1
+
+
+def scenarios(owned):
+    """Return the benchmarked routes as request factories.
+
+    Every factory picks a random user and returns the user ID and the
+    test client call arguments.
+    """
+    rng = random.Random(1)
+    today = datetime.utcnow().date()
+
+    def pick():
+        user_id = rng.choice(list(owned))
+        return user_id, rng.choice(owned[user_id])
+
+    def dashboard():
+        user_id, _ = pick()
+        return user_id, "get", "/", {}
+
+    def detail():
+        user_id, habit_id = pick()
+        return user_id, "get", f"/{habit_id}", {}
+
+    def mark():
+        user_id, habit_id = pick()
+        completed = rng.choice(("true", "false"))
+        return user_id, "post", f"/{habit_id}/mark/{completed}", {}
+
+    def api_progress():
+        user_id, habit_id = pick()
+        day = today - timedelta(days=rng.randrange(30))
+        payload = {
+            "habit_id": habit_id,
+            "date": day.isoformat(),
+            "completed": rng.random() < 0.8,
+        }
+        return user_id, "post", "/api/progress", {"json": payload}
+
+    return {
+        "dashboard": dashboard,
+        "detail": detail,
+        "mark": mark,
+        "api_progress": api_progress,
+    }
+
+
+def percentile(values, percent):
+    """Return a percentile of the values by linear interpolation."""
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def drive(app, counter, factory, requests):
+    """Send requests for one route and summarize them.
+
+    Args:
+        app (Flask): Application under test.
+        counter (QueryCounter): Query counter of the engine.
+        factory (callable): Request factory of the route.
+        requests (int): Number of requests to send.
+
+    Returns:
+        dict: Latency percentiles in ms, throughput and queries per request.
+    """
+    client = app.test_client()
+    latencies = []
+    queries = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        user_id, method, url, kwargs = factory()
+        with client.session_transaction() as session:
+            session["_user_id"] = str(user_id)
+            session["_fresh"] = True
+        before = counter.count
+        start = time.perf_counter()
+        response = getattr(client, method)(url, **kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count - before)
+        if response.status_code >= 400:
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "throughput_rps": requests / elapsed,
+        "queries_per_request": statistics.mean(queries),
+        "max_queries": max(queries),
+    }
+
+
+def git_revision():
+    """Return the current commit hash, None outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    """Seed the database, drive every route and return the results."""
+    log_directory = tempfile.mkdtemp()
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": args.database,
+            "WTF_CSRF_ENABLED": False,
+            "HASH_POOL_WORKERS": 0,
+            "ACTIVITY_LOG_PATH": os.path.join(log_directory, "activity.log"),
+        }
+    )
+
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        owned = seed(args.users, args.habits, args.days)
+        seed_seconds = time.perf_counter() - started
+        counter = QueryCounter(db.engine)
+        routes = {
+            name: drive(app, counter, factory, args.requests)
+            for name, factory in scenarios(owned).items()
+        }
+    app.extensions["activity_logger"].close()
+
+    return {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "parameters": {
+            "users": args.users,
+            "habits": args.habits,
+            "days": args.days,
+            "requests": args.requests,
+            "database": args.database,
+        },
+        "seed_seconds": seed_seconds,
+        "routes": routes,
+    }
+
+
+def print_results(results):
+    """Print the route results as a table."""
+    print(
+        f"{'route':>14} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+        f"{'req/s':>8} {'queries':>8} {'errors':>7}"
+    )
+    for name, route in results["routes"].items():
+        print(
+            f"{name:>14} {route['p50_ms']:>8.2f} {route['p95_ms']:>8.2f} "
+            f"{route['p99_ms']:>8.2f} {route['throughput_rps']:>8.1f} "
+            f"{route['queries_per_request']:>8.1f} {route['errors']:>7}"
+        )
+
+
+def compare(before_path, after_path):
+    """Print the relative change of every route metric between two runs."""
+    with open(before_path) as before_file, open(after_path) as after_file:
+        before, after = json.load(before_file), json.load(after_file)
+    print(f"{before.get('revision')} -> {after.get('revision')}")
+    print(f"{'route':>14} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} {'queries':>8}")
+    for name, route in after["routes"].items():
+        old = before["routes"].get(name)
+        if old is None:
+            continue
+        changes = [
+            (route[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            for key in (
+                "p50_ms",
+                "p95_ms",
+                "p99_ms",
+                "throughput_rps",
+                "queries_per_request",
+            )
+        ]
+        print(f"{name:>14} " + " ".join(f"{change:>+7.1f}%" for change in changes))
+
+
+def main():
+    """Run the benchmark, or compare two saved runs."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--habits", type=int, default=5)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--database", default="sqlite:///:memory:")
+    parser.add_argument("--output", help="Save the results as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = run(args)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Read/write throughput of a SQLite file under concurrent worker threads.
+
+Reader threads load the dashboard habits and writer threads mark random
+days through ``record_progress``, each inside a request context, for a fixed
+duration. The run is repeated with SQLite defaults (rollback journal, no
+pool, deferred transactions) and with the production settings from
+``Config`` (WAL and pragmas, pooled connections, immediate write
+transactions). Failed operations are mostly "database is locked" errors.
+
+Usage:
+    python -m benchmarks.sqlite_concurrency [--readers N] [--writers N]
+        [--duration SECONDS]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy.exc import OperationalError
+
+from app import create_app
+from config import Config
+from db import db
+from habits.factory import HabitFactory
+from habits.progress import record_progress
+from habits.routes.dashboard import load_dashboard_habits
+from models import Habit, User
+
+PROFILES = {
+    "default": {
+        "SQLITE_PRAGMAS": {},
+        "SQLITE_IMMEDIATE_WRITES": False,
+        "SQLALCHEMY_ENGINE_OPTIONS": {},
+    },
+    "production": {
+        "SQLITE_PRAGMAS": Config.SQLITE_PRAGMAS,
+        "SQLITE_IMMEDIATE_WRITES": Config.SQLITE_IMMEDIATE_WRITES,
+        "SQLALCHEMY_ENGINE_OPTIONS": Config.SQLALCHEMY_ENGINE_OPTIONS,
+    },
+}
+HABITS = 20
+
+
+def create_bench_app(path, settings):
+    """Create an application on a SQLite file with a settings profile.
+
+    Args:
+        path (str): Database file path.
+        settings (dict): Configuration overrides.
+
+    Returns:
+        Flask: Configured application with seeded habits.
+    """
+    app = create_app()
+    app.config.update(settings)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username="bench", email="bench@example.com", password=""))
+        for index in range(HABITS):
+            db.session.add(HabitFactory.create(f"Habit {index}", "daily", 1, 365))
+        db.session.commit()
+    return app
+
+
+def reader(app, stop, counts):
+    """Load the dashboard habits until stopped."""
+    while not stop.is_set():
+        with app.test_request_context("/dashboard"):
+            try:
+                load_dashboard_habits(1)
+                counts["reads"] += 1
+            except OperationalError:
+                counts["errors"] += 1
+            finally:
+                db.session.remove()
+
+
+def writer(app, stop, counts):
+    """Mark random days of random habits until stopped."""
+    today = date.today()
+    while not stop.is_set():
+        with app.test_request_context("/api/progress", method="POST"):
+            try:
+                habit = db.session.get(Habit, random.randint(1, HABITS))
+                day = today - timedelta(days=random.randrange(365))
+                record_progress(habit, day, random.random() < 0.8)
+                db.session.commit()
+                counts["writes"] += 1
+            except OperationalError:
+                db.session.rollback()
+                counts["errors"] += 1
+            finally:
+                db.session.remove()
+
+
+def run(profile, readers, writers, duration):
+    """Run the workload for one profile.
+
+    Returns:
+        dict: Number of ``reads``, ``writes`` and ``errors``.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_bench_app(os.path.join(directory, "habits.db"), PROFILES[profile])
+        stop = threading.Event()
+        counts = [
+            {"reads": 0, "writes": 0, "errors": 0} for _ in range(readers + writers)
+        ]
+        threads = [
+            threading.Thread(target=reader, args=(app, stop, counts[index]))
+            for index in range(readers)
+        ] + [
+            threading.Thread(target=writer, args=(app, stop, counts[readers + index]))
+            for index in range(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        with app.app_context():
+            db.engine.dispose()
+    return {key: sum(count[key] for count in counts) for key in counts[0]}
+
+
+def main():
+    """Run both profiles and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'profile':>10} {'reads/s':>9} {'writes/s':>9} {'errors':>7}")
+    for profile in PROFILES:
+        totals = run(profile, args.readers, args.writers, args.duration)
+        print(
+            f"{profile:>10} {totals['reads'] / args.duration:>9.1f} "
+            f"{totals['writes'] / args.duration:>9.1f} {totals['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Startup cost of importing the application and building it.
+
+Every scenario runs in a fresh interpreter with ``python -X importtime``,
+so no module is cached. Reports the median wall time of the scenario, the
+import time it spent and the modules with the largest cumulative import
+time, and fails when a scenario exceeds its time budget.
+
+Usage:
+    python -m benchmarks.startup [--repeat N] [--top N] [--budget-scale X]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MARKER = "--- startup benchmark ---"
+
+# Statement and wall time budget in ms of every scenario
+SCENARIOS = {
+    "import app": ("import app", 100),
+    "import wsgi": ("import wsgi", 100),
+    "create_app": ("from app import create_app; create_app()", 2000),
+}
+
+CHILD = """
+import sys, time
+sys.stderr.write({marker!r} + "\\n")
+started = time.perf_counter()
+{statement}
+print(time.perf_counter() - started)
+"""
+
+
+def parse_importtime(stderr):
+    """Read the top-level imports logged after the marker.
+
+    Args:
+        stderr (str): Standard error of a ``-X importtime`` run.
+
+    Returns:
+        dict: Cumulative import time in microseconds per top-level module.
+    """
+    modules = {}
+    lines = stderr.split(MARKER, 1)[-1].splitlines()
+    for line in lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented by two spaces per level
+        if name.startswith("  "):
+            continue
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def run_scenario(statement):
+    """Run a statement in a fresh interpreter.
+
+    Args:
+        statement (str): Python code to measure.
+
+    Returns:
+        tuple: Wall time in ms and cumulative import time in microseconds
+        per top-level module.
+    """
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            CHILD.format(marker=MARKER, statement=statement),
+        ],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall = float(result.stdout.strip().splitlines()[-1]) * 1000
+    return wall, parse_importtime(result.stderr)
+
+
+def main():
+    """Measure every scenario and check it against its budget."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scenario.")
+    parser.add_argument("--top", type=int, default=5, help="Slowest modules listed.")
+    parser.add_argument(
+        "--budget-scale",
+        type=float,
+        default=1.0,
+        help="Multiply the budgets, e.g. on slow machines.",
+    )
+    args = parser.parse_args()
+
+    over_budget = []
+    for label, (statement, budget) in SCENARIOS.items():
+        walls = []
+        imports = defaultdict(list)
+        for _ in range(args.repeat):
+            wall, modules = run_scenario(statement)
+            walls.append(wall)
+            for name, cumulative in modules.items():
+                imports[name].append(cumulative)
+
+        wall = statistics.median(walls)
+        medians = {name: statistics.median(times) for name, times in imports.items()}
+        limit = budget * args.budget_scale
+        status = "ok" if wall <= limit else "OVER BUDGET"
+        imported = sum(medians.values()) / 1000
+        print(
+            f"{label:<12} {wall:8.1f} ms  imports {imported:8.1f} ms"
+            f"  budget {limit:7.0f} ms  {status}"
+        )
+        slowest = sorted(medians.items(), key=lambda item: item[1], reverse=True)
+        for name, cumulative in slowest[: args.top]:
+            print(f"    {cumulative / 1000:8.1f} ms  {name}")
+        if wall > limit:
+            over_budget.append(label)
+
+    if over_budget:
+        print(f"Over budget: {', '.join(over_budget)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Compact bit array representation of habit progress.
+
+A habit's history is encoded as two bit arrays indexed by the day offset from
+an origin date, normally the day the habit was created: ``recorded`` has a
+bit set for every day with a progress entry and ``completed`` for every
+completed day. Python integers serve as arbitrary length bit arrays, so
+streaks and counts are computed with bit operations instead of iterating
+over Progress objects.
+"""
+
+from datetime import date, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+
+def popcount(value: int) -> int:
+    """Count the set bits of a non-negative integer.
+
+    Args:
+        value: Bit array
+
+    Returns:
+        int: Number of set bits
+    """
+    return bin(value).count("1")
+
+
+class ProgressBitmap:
+    """Progress history of a habit as day-indexed bit arrays.
+
+    Attributes:
+        origin: Date of bit 0
+        recorded: Bits of days with a progress entry
+        completed: Bits of completed days, always a subset of ``recorded``
+    """
+
+    __slots__ = ("origin", "recorded", "completed")
+
+    def __init__(self, origin: date, recorded: int = 0, completed: int = 0) -> None:
+        """Create a bitmap.
+
+        Args:
+            origin: Date of bit 0
+            recorded: Bits of days with a progress entry
+            completed: Bits of completed days
+        """
+        self.origin = origin
+        self.recorded = recorded
+        self.completed = completed
+
+    @classmethod
+    def from_entries(cls, origin: date, entries: Iterable) -> "ProgressBitmap":
+        """Build a bitmap from progress entries in a single pass.
+
+        Entries dated before ``origin`` move the origin back to the earliest
+        entry.
+
+        Args:
+            origin: Preferred date of bit 0
+            entries: Progress entries (or rows with ``date`` and ``completed``)
+
+        Returns:
+            ProgressBitmap: Bitmap of the entries
+        """
+        days = [(entry.date, bool(entry.completed)) for entry in entries]
+        if days:
+            origin = min(origin, min(day for day, _ in days))
+
+        recorded = bytearray()
+        completed = bytearray()
+        for day, is_completed in days:
+            offset = (day - origin).days
+            byte, bit = divmod(offset, 8)
+            if byte >= len(recorded):
+                padding = byte + 1 - len(recorded)
+                recorded.extend(bytes(padding))
+                completed.extend(bytes(padding))
+            recorded[byte] |= 1 << bit
+            if is_completed:
+                completed[byte] |= 1 << bit
+            else:
+                completed[byte] &= ~(1 << bit) & 0xFF
+
+        return cls(
+            origin,
+            int.from_bytes(recorded, "little"),
+            int.from_bytes(completed, "little"),
+        )
+
+    @classmethod
+    def from_bytes(
+        cls, origin: date, recorded: bytes, completed: bytes
+    ) -> "ProgressBitmap":
+        """Decode a bitmap stored with ``to_bytes``.
+
+        Args:
+            origin: Date of bit 0
+            recorded: Little-endian recorded bits
+            completed: Little-endian completed bits
+
+        Returns:
+            ProgressBitmap: Decoded bitmap
+        """
+        return cls(
+            origin,
+            int.from_bytes(recorded, "little"),
+            int.from_bytes(completed, "little"),
+        )
+
+    def to_bytes(self) -> Tuple[bytes, bytes]:
+        """Encode the bit arrays as little-endian bytes.
+
+        Returns:
+            Tuple[bytes, bytes]: Recorded and completed bits
+        """
+        length = (self.recorded.bit_length() + 7) // 8
+        return (
+            self.recorded.to_bytes(length, "little"),
+            self.completed.to_bytes(length, "little"),
+        )
+
+    def offset(self, day: date) -> int:
+        """Return the bit index of a day.
+
+        Args:
+            day: Date to locate
+
+        Returns:
+            int: Day offset from the origin, negative before the origin
+        """
+        return (day - self.origin).days
+
+    def day(self, offset: int) -> date:
+        """Return the date of a bit index.
+
+        Args:
+            offset: Day offset from the origin
+
+        Returns:
+            date: Corresponding date
+        """
+        return self.origin + timedelta(days=offset)
+
+    def get(self, day: date) -> Optional[bool]:
+        """Return the completion state of a day.
+
+        Args:
+            day: Date to look up
+
+        Returns:
+            Optional[bool]: Completion state, None if the day has no entry
+        """
+        offset = self.offset(day)
+        if offset < 0 or not (self.recorded >> offset) & 1:
+            return None
+        return bool((self.completed >> offset) & 1)
+
+    def set(self, day: date, completed: bool) -> None:
+        """Record the completion state of a day.
+
+        Args:
+            day: Date of the entry
+            completed: Whether the habit was completed that day
+        """
+        offset = self.offset(day)
+        if offset < 0:
+            self.recorded <<= -offset
+            self.completed <<= -offset
+            self.origin = day
+            offset = 0
+
+        bit = 1 << offset
+        self.recorded |= bit
+        if completed:
+            self.completed |= bit
+        else:
+            self.completed &= ~bit
+
+    def count(self, start: Optional[date] = None, end: Optional[date] = None) -> int:
+        """Count completed days, optionally within an inclusive date range.
+
+        Args:
+            start: First day to count
+            end: Last day to count
+
+        Returns:
+            int: Number of completed days
+        """
+        bits = self.completed
+        if end is not None:
+            bits &= (1 << max(self.offset(end) + 1, 0)) - 1
+        if start is not None:
+            bits >>= max(self.offset(start), 0)
+        return popcount(bits)
+
+    def last_entry_date(self) -> Optional[date]:
+        """Return the date of the latest entry, None if there is none."""
+        if not self.recorded:
+            return None
+        return self.day(self.recorded.bit_length() - 1)
+
+    def last_completed_date(self) -> Optional[date]:
+        """Return the date of the latest completed entry, None if there is none."""
+        if not self.completed:
+            return None
+        return self.day(self.completed.bit_length() - 1)
+
+    def series(self, start: date, total_days: int) -> List[int]:
+        """Return 1/0 completion values for consecutive days.
+
+        Args:
+            start: First day of the series
+            total_days: Number of days
+
+        Returns:
+            List[int]: 1 for every completed day, 0 otherwise
+        """
+        if total_days <= 0:
+            return []
+        offset = self.offset(start)
+        bits = self.completed >> offset if offset >= 0 else self.completed << -offset
+        bits &= (1 << total_days) - 1
+        # bin() lists the highest bit first, the series starts with the lowest
+        digits = bin(bits)[2:].zfill(total_days)[::-1]
+        return [1 if digit == "1" else 0 for digit in digits]
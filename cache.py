@@ -0,0 +1,258 @@
+"""Process-local caches.
+
+Caches live in ``app.extensions`` so every application instance has its own.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Union
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a time to live.
+
+    Attributes:
+        maxsize: Maximum number of entries, 0 disables the cache
+        ttl: Seconds an entry stays valid
+        hits: Number of lookups answered from the cache
+        misses: Number of lookups not found or expired
+        evictions: Number of entries dropped to respect ``maxsize``
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 60.0,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Create an empty cache.
+
+        Args:
+            maxsize: Maximum number of entries, 0 disables the cache
+            ttl: Seconds an entry stays valid
+            timer: Monotonic clock used for expiry
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._timer = timer
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a cached value and mark it as recently used.
+
+        Args:
+            key: Cache key
+            default: Value returned on a miss
+
+        Returns:
+            Any: Cached value, or ``default`` if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._timer():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries if full.
+
+        Args:
+            key: Cache key
+            value: Value to store
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._timer() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Remove an entry if present.
+
+        Args:
+            key: Cache key
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the cache counters.
+
+        Returns:
+            Dict[str, int]: ``hits``, ``misses``, ``evictions`` and ``size``
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+            }
+
+    def __len__(self) -> int:
+        """Return the number of stored entries, including expired ones."""
+        return len(self._entries)
+
+
+class FragmentCache:
+    """Thread-safe LRU cache of rendered fragments with a memory cap.
+
+    Entries are strings, or tuples of strings, whose size is counted in
+    characters. Every entry can carry a tag, e.g. the ID of the habit it was
+    rendered from, so all entries of a tag are dropped at once.
+
+    Attributes:
+        max_bytes: Maximum total size of the entries, 0 disables the cache
+        hits: Number of lookups answered from the cache
+        misses: Number of lookups not found
+        evictions: Number of entries dropped to respect ``max_bytes``
+    """
+
+    def __init__(self, max_bytes: int = 16_777_216) -> None:
+        """Create an empty cache.
+
+        Args:
+            max_bytes: Maximum total size of the entries, 0 disables the cache
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a cached fragment and mark it as recently used.
+
+        Args:
+            key: Cache key
+            default: Value returned on a miss
+
+        Returns:
+            Any: Cached fragment, or ``default`` if missing
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, tag: Hashable = None) -> None:
+        """Store a fragment, evicting the least recently used ones if full.
+
+        Fragments larger than the whole cache are not stored.
+
+        Args:
+            key: Cache key
+            value: String or tuple of strings
+            tag: Tag to invalidate the fragment by
+        """
+        size = _fragment_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, size, tag)
+            self._size += size
+            if tag is not None:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_tag(self, tag: Hashable) -> None:
+        """Remove all fragments stored with a tag.
+
+        Args:
+            tag: Fragment tag
+        """
+        with self._lock:
+            for key in self._tags.pop(tag, ()):
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Remove all fragments."""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return the cache counters.
+
+        Returns:
+            Dict[str, int]: ``hits``, ``misses``, ``evictions``, ``size``
+                and ``bytes``
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "bytes": self._size,
+            }
+
+    def __len__(self) -> int:
+        """Return the number of stored fragments."""
+        return len(self._entries)
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove an entry and its tag reference; the lock must be held."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        _, size, tag = entry
+        self._size -= size
+        keys = self._tags.get(tag)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+
+
+def _fragment_size(value: Any) -> int:
+    """Return the size of a string or a tuple of strings in characters."""
+    if isinstance(value, tuple):
+        return sum(len(str(part)) for part in value)
+    return len(value)
+
+
+def get_cache(name: str) -> Optional[Union[TTLCache, FragmentCache]]:
+    """Return a cache registered on the current application.
+
+    Args:
+        name: Extension name of the cache
+
+    Returns:
+        Optional[Union[TTLCache, FragmentCache]]: The cache, None outside an
+            application context
+    """
+    from flask import current_app
+
+    if not current_app:
+        return None
+    return current_app.extensions.get(name)
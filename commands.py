@@ -0,0 +1,229 @@
+"""Command line interface for PyTracker maintenance tasks.
+
+Commands are registered on the application and run through the Flask CLI,
+e.g. ``flask upgrade-db``.
+"""
+
+import click
+from flask import Flask
+
+
+def register_commands(app: Flask) -> None:
+    """Register maintenance commands on the application CLI.
+
+    Args:
+        app: Flask application instance
+    """
+
+    @app.cli.command("upgrade-db")
+    def upgrade_db() -> None:
+        """Bring an existing database schema up to date."""
+        from migrations import upgrade_schema
+
+        applied = upgrade_schema()
+        for name in applied:
+            click.echo(f"Applied {name}")
+        if not applied:
+            click.echo("Database schema is up to date.")
+
+    @app.cli.command("rebuild-stats")
+    @click.option(
+        "--habit-id", "habit_ids", type=int, multiple=True, help="Habit to rebuild."
+    )
+    @click.option(
+        "--check", is_flag=True, help="Only report outdated statistics, exit 1 if any."
+    )
+    def rebuild_stats_command(habit_ids, check) -> None:
+        """Rebuild materialized habit statistics from progress history."""
+        from db import db
+        from habits.stats import rebuild_stats
+
+        outdated = rebuild_stats(list(habit_ids) or None, dry_run=check)
+        if check:
+            for habit_id in outdated:
+                click.echo(f"Habit {habit_id}: statistics are outdated")
+            if outdated:
+                raise SystemExit(1)
+            click.echo("All habit statistics are consistent.")
+            return
+
+        db.session.commit()
+        click.echo(f"Rebuilt statistics of {len(outdated)} habit(s).")
+
+    @app.cli.command("analytics")
+    @click.option(
+        "--format",
+        "output_format",
+        type=click.Choice(["csv", "json"]),
+        default="csv",
+        help="Output format.",
+    )
+    @click.option(
+        "--output",
+        type=click.File("w"),
+        default="-",
+        help="Output file, stdout by default.",
+    )
+    def analytics_command(output_format, output) -> None:
+        """Report streaks and completion rates of every habit."""
+        import csv
+        import json
+
+        from analytics import habit_report
+
+        report = habit_report()
+        if output_format == "json":
+            json.dump(report, output)
+            output.write("\n")
+            return
+
+        fields = [
+            "habit_id",
+            "user_id",
+            "periodicity",
+            "current_streak",
+            "longest_streak",
+            "weekly_streak",
+            "completed_count",
+            "completion_rate",
+        ]
+        writer = csv.DictWriter(output, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(report)
+
+    @app.cli.command("export")
+    @click.option("--user-id", type=int, help="Export one user, all users if omitted.")
+    @click.option(
+        "--format",
+        "output_format",
+        type=click.Choice(["ndjson", "csv"]),
+        default="ndjson",
+        help="Output format.",
+    )
+    @click.option("--gzip", "compress", is_flag=True, help="Compress the output.")
+    @click.option(
+        "--output",
+        type=click.File("wb"),
+        default="-",
+        help="Output file, stdout by default.",
+    )
+    def export_command(user_id, output_format, compress, output) -> None:
+        """Stream habits and progress history as NDJSON or CSV."""
+        from habits.export import export_stream
+
+        for chunk in export_stream(output_format, user_id, compress):
+            output.write(chunk)
+
+    @app.cli.command("import-progress")
+    @click.argument("source", type=click.File("r", encoding="utf-8"))
+    @click.option(
+        "--format",
+        "input_format",
+        type=click.Choice(["csv", "ndjson"]),
+        help="Input format, taken from the file extension by default.",
+    )
+    @click.option("--user-id", type=int, help="Only import into this user's habits.")
+    @click.option(
+        "--chunk-size", type=int, default=50_000, help="Records per transaction."
+    )
+    def import_progress_command(source, input_format, user_id, chunk_size) -> None:
+        """Bulk import progress history from a CSV or NDJSON file."""
+        from habits.importer import ImportFileError, import_progress, read_records
+
+        input_format = input_format or source.name.rsplit(".", 1)[-1]
+        if input_format not in ("csv", "ndjson"):
+            raise click.UsageError("Cannot tell the input format, use --format.")
+
+        def show_progress(report):
+            click.echo(
+                f"{report.rows} records read, {report.imported} imported, "
+                f"{report.error_count} rejected "
+                f"({report.rows / max(report.seconds, 1e-9):.0f} records/s)"
+            )
+
+        try:
+            report = import_progress(
+                read_records(source, input_format),
+                user_id=user_id,
+                chunk_size=chunk_size,
+                on_chunk=show_progress,
+            )
+        except ImportFileError as error:
+            raise click.ClickException(str(error))
+        for line, message in report.errors:
+            click.echo(f"Line {line}: {message}", err=True)
+        click.echo(
+            f"Imported {report.imported} of {report.rows} records into "
+            f"{len(report.habit_ids)} habit(s) in {report.seconds:.2f}s."
+        )
+        if report.error_count:
+            raise SystemExit(1)
+
+    @app.cli.command("backfill-rollups")
+    @click.option(
+        "--from", "start", type=click.DateTime(["%Y-%m-%d"]), help="First day."
+    )
+    @click.option("--to", "end", type=click.DateTime(["%Y-%m-%d"]), help="Last day.")
+    def backfill_rollups_command(start, end) -> None:
+        """Rebuild the analytics rollups from progress history."""
+        from habits.rollups import progress_date_range, rebuild_rollups
+
+        history = progress_date_range()
+        if history is None:
+            click.echo("No progress to roll up.")
+            return
+        start = start.date() if start else history[0]
+        end = end.date() if end else history[1]
+        written = rebuild_rollups(start, end)
+        click.echo(f"Rebuilt rollups from {start} to {end}: {written} row(s).")
+
+    @app.cli.command("compact-rollups")
+    @click.option(
+        "--days",
+        type=int,
+        default=lambda: app.config.get("ROLLUP_RECONCILE_DAYS", 2),
+        help="Days before today to rebuild.",
+    )
+    def compact_rollups_command(days) -> None:
+        """Rebuild the latest rollups and drop empty rows, e.g. from cron."""
+        from habits.rollups import compact_rollups
+
+        dropped = compact_rollups(days)
+        click.echo(f"Compacted rollups, dropped {dropped} empty row(s).")
+
+    @app.cli.command("worker")
+    @click.option(
+        "--threads",
+        type=int,
+        default=lambda: app.config.get("JOB_WORKER_THREADS") or 2,
+        help="Worker threads.",
+    )
+    @click.option(
+        "--burst", is_flag=True, help="Run the due jobs and exit when none is left."
+    )
+    def worker_command(threads, burst) -> None:
+        """Run queued background jobs."""
+        import time
+
+        from jobs import JobWorker, job_counts, prepare_worker, run_next_job
+
+        requeued = prepare_worker(app)
+        if requeued:
+            click.echo(f"Requeued {requeued} abandoned job(s).")
+        if burst:
+            ran = 0
+            while run_next_job():
+                ran += 1
+            click.echo(f"Ran {ran} job(s); queue: {job_counts()}")
+            return
+
+        worker = JobWorker(
+            app, threads, poll_interval=app.config.get("JOB_POLL_INTERVAL", 1.0)
+        )
+        worker.start()
+        click.echo(f"Worker running with {threads} thread(s), Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            worker.stop()
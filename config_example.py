@@ -17,3 +17,87 @@ class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY") or "insert-your-secret-key"
     SQLALCHEMY_DATABASE_URI = "sqlite:///habits.db"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # SQLite settings applied to every new connection. WAL lets readers run
+    # alongside the writer; NORMAL synchronous is durable across crashes of
+    # the process in WAL mode. Negative cache_size is in KiB.
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,  # milliseconds
+        "cache_size": -65536,
+        "mmap_size": 268435456,
+    }
+    # Start transactions of write requests with BEGIN IMMEDIATE, so writers
+    # wait for each other on busy_timeout instead of failing to upgrade a
+    # read lock
+    SQLITE_IMMEDIATE_WRITES = True
+    # Keep pooled connections for file databases, sized for the worker
+    # threads of one process
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": 8,
+        "max_overflow": 8,
+        "pool_timeout": 10,
+    }
+
+    # Process-local cache of logged in users
+    USER_CACHE_SIZE = 1024
+    USER_CACHE_TTL = 300  # seconds
+
+    # Process-local cache of rendered habit cards and chart payloads
+    FRAGMENT_CACHE_MAX_BYTES = 16_777_216
+
+    # Process-local cache of the streak indexes of daily habits
+    STREAK_CACHE_SIZE = 1024
+    STREAK_CACHE_TTL = 3600  # seconds
+
+    # Password hashing process pool, 0 workers hashes inline
+    HASH_POOL_WORKERS = 2
+    HASH_MAX_PENDING = 32
+    HASH_QUEUE_TIMEOUT = 5.0  # seconds
+
+    # Failed authentication attempts allowed per sliding window
+    LOGIN_ATTEMPT_WINDOW = 300  # seconds
+    LOGIN_MAX_ATTEMPTS_PER_ACCOUNT = 5
+    LOGIN_MAX_ATTEMPTS_PER_IP = 20
+
+    # Asynchronous activity log: 'file', 'sqlite' or 'stream' (stdout)
+    ACTIVITY_LOG_SINK = "file"
+    ACTIVITY_LOG_PATH = "activity.log"
+    ACTIVITY_LOG_MAX_BYTES = 10_485_760  # rotate the file after 10 MB
+    ACTIVITY_LOG_BACKUPS = 5
+    ACTIVITY_LOG_QUEUE_SIZE = 10_000
+    ACTIVITY_LOG_BATCH_SIZE = 500
+    ACTIVITY_LOG_FLUSH_INTERVAL = 1.0  # seconds
+    # Full queue: 'drop_newest', 'drop_oldest' or 'block' (briefly)
+    ACTIVITY_LOG_POLICY = "drop_newest"
+
+    # Buffer mark toggles for this many seconds and store them in batches;
+    # 0 writes every toggle immediately
+    WRITE_COALESCE_WINDOW = 0
+    # Flush early once this many writes are pending
+    WRITE_COALESCE_MAX_PENDING = 1000
+
+    # Habit statistics: 'inline' updates them with every write, 'deferred'
+    # rebuilds them in background jobs
+    STATS_MODE = "inline"
+    # Job worker threads in the web process; 0 leaves jobs to `flask worker`
+    JOB_WORKER_THREADS = 0
+    JOB_POLL_INTERVAL = 1.0  # seconds
+    JOB_RETRY_DELAY = 5.0  # seconds, doubled on every retry
+    JOB_STALE_TIMEOUT = 600  # seconds before a running job is requeued
+
+    # Nightly rebuild of the latest analytics rollups, queued by workers
+    ROLLUP_COMPACT_HOUR = 3  # UTC
+    ROLLUP_RECONCILE_DAYS = 2
+    # Nightly removal of superseded sync change log rows, queued by workers
+    SYNC_COMPACT_HOUR = 3  # UTC
+
+    # Opt-in request instrumentation: Server-Timing headers and Prometheus
+    # metrics at INSTRUMENTATION_METRICS_PATH
+    INSTRUMENTATION_ENABLED = False
+    INSTRUMENTATION_METRICS_PATH = "/metrics"
+    # Keep cProfile dumps of the N slowest sampled requests per route
+    INSTRUMENTATION_PROFILE_SLOWEST = 0
+    INSTRUMENTATION_PROFILE_SAMPLE_RATE = 0.1
+    INSTRUMENTATION_PROFILE_DIR = "profiles"
@@ -1,11 +1,156 @@
 """
 Database initialization and configuration.
+
+SQLite connections are tuned per connection from the ``SQLITE_PRAGMAS``
+setting (WAL journaling, synchronous level, busy timeout, cache and mmap
+sizes). File databases can use a connection pool instead of opening a
+connection per checkout, and transactions of write requests, or of sessions
+that ask for it with ``begin_immediate``, can start with ``BEGIN IMMEDIATE``
+so concurrent writers queue on the busy timeout instead of failing with
+"database is locked" when upgrading a read lock.
+Applications preloaded before worker processes are forked drop the pooled
+connections they hand down to the workers.
 """
 
+import os
+import weakref
+
+from flask import has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
+
+# Request methods whose transactions are expected to write
+WRITE_METHODS = frozenset(("POST", "PUT", "PATCH", "DELETE"))
+# Execution option of connections whose transactions are expected to write
+IMMEDIATE_OPTION = "sqlite_immediate"
+
+
+class TrackerSQLAlchemy(SQLAlchemy):
+    """SQLAlchemy extension applying the SQLite connection settings."""
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        """Use a connection pool for file databases when a pool size is set.
+
+        Flask-SQLAlchemy falls back to ``NullPool`` for SQLite files, which
+        opens a connection, and reapplies the pragmas, on every checkout.
+
+        Args:
+            app (Flask): The Flask application instance.
+            sa_url (URL): Database URL.
+            options (dict): Engine options.
+
+        Returns:
+            tuple: Updated URL and engine options.
+        """
+        pool_size = app.config["SQLALCHEMY_ENGINE_OPTIONS"].get("pool_size")
+        in_memory = sa_url.database in (None, "", ":memory:")
+        sa_url, options = super().apply_driver_hacks(app, sa_url, options)
+        if sa_url.drivername.startswith("sqlite") and pool_size and not in_memory:
+            options["poolclass"] = QueuePool
+            # Pooled connections are handed between worker threads, one
+            # thread at a time
+            options.setdefault("connect_args", {})["check_same_thread"] = False
+        return sa_url, options
+
+    def create_engine(self, sa_url, engine_opts):
+        """Create the engine and register the SQLite connection settings.
+
+        Args:
+            sa_url (URL): Database URL.
+            engine_opts (dict): Engine options.
+
+        Returns:
+            Engine: The created engine.
+        """
+        if engine_opts.get("poolclass") in (NullPool, StaticPool):
+            # In-memory databases and unpooled files take no pool sizing
+            for option in ("pool_size", "max_overflow", "pool_timeout"):
+                engine_opts.pop(option, None)
+        engine = super().create_engine(sa_url, engine_opts)
+        if engine.dialect.name == "sqlite":
+            app = self.get_app()
+            # A shared in-memory connection has no concurrent writers
+            in_memory = sa_url.database in (None, "", ":memory:")
+            configure_sqlite(
+                engine,
+                app.config.get("SQLITE_PRAGMAS", {}),
+                app.config.get("SQLITE_IMMEDIATE_WRITES", False) and not in_memory,
+            )
+        return engine
+
+
+def configure_sqlite(engine, pragmas, immediate_writes=False):
+    """Apply pragmas to every new connection of a SQLite engine.
+
+    Args:
+        engine (Engine): SQLite engine.
+        pragmas (dict): Pragma names and values, e.g. ``{"journal_mode": "WAL"}``.
+        immediate_writes (bool): Start transactions of write requests, and of
+            connections with the ``IMMEDIATE_OPTION`` execution option, with
+            ``BEGIN IMMEDIATE``.
+    """
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+        if immediate_writes:
+            # Let SQLAlchemy emit BEGIN instead of the driver
+            dbapi_connection.isolation_level = None
+
+    if not immediate_writes:
+        return
+
+    @event.listens_for(engine, "begin")
+    def begin(connection):
+        writes = connection.get_execution_options().get(IMMEDIATE_OPTION) or (
+            has_request_context() and request.method in WRITE_METHODS
+        )
+        connection.exec_driver_sql("BEGIN IMMEDIATE" if writes else "BEGIN")
+
 
 # Initialize SQLAlchemy extension
-db = SQLAlchemy()
+db = TrackerSQLAlchemy()
+
+
+def begin_immediate(session=None):
+    """Begin a write transaction on a session unless one is open.
+
+    With ``SQLITE_IMMEDIATE_WRITES`` enabled the transaction starts with
+    ``BEGIN IMMEDIATE`` whatever the request, e.g. for writes from
+    background threads or from read requests.
+
+    Args:
+        session (Session): Session to begin, the current ``db.session`` if None.
+    """
+    session = session if session is not None else db.session()
+    if not session.in_transaction():
+        session.connection(execution_options={IMMEDIATE_OPTION: True})
+
+
+def dispose_after_fork(app):
+    """Drop the pooled connections inherited by forked processes.
+
+    A connection opened before a fork must not be used by two processes.
+    After a fork the child discards the pool it inherited, without closing
+    the parent's connections, and opens its own connections on demand.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    app_ref = weakref.ref(app)
+
+    def dispose():
+        forked_app = app_ref()
+        if forked_app is not None:
+            db.get_engine(forked_app).dispose(close=False)
+
+    os.register_at_fork(after_in_child=dispose)
 
 
 def init_app(app):
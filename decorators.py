@@ -2,11 +2,19 @@
 Custom decorators for application functionality.
 """
 
+import time
 from functools import wraps
 
+from flask import abort, has_request_context
+
+from activity import get_activity_logger
+
 
 def log_activity(func):
-    """Decorator that logs activity when a function is called.
+    """Decorator that records an activity entry when a function is called.
+
+    The entry is queued on the activity logger and written by its background
+    thread, so the wrapped function never waits for log I/O.
 
     Args:
         func (function): The function to be wrapped.
@@ -17,7 +25,49 @@ def log_activity(func):
 
     @wraps(func)
     def wrapper(*args, **kwargs):
-        print(f"Activity: {func.__name__} executed")
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            get_activity_logger().log(
+                {
+                    "ts": time.time(),
+                    "activity": func.__name__,
+                    "user_id": _current_user_id(),
+                    "duration_ms": (time.perf_counter() - start) * 1000,
+                }
+            )
+
+    return wrapper
+
+
+def admin_required(func):
+    """Decorator that rejects requests of users who are not administrators.
+
+    Apply it below ``login_required``.
+
+    Args:
+        func (function): The view function to be wrapped.
+
+    Returns:
+        function: The wrapped view, answering 403 to non-admin users.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        from flask_login import current_user
+
+        if not getattr(current_user, "is_admin", False):
+            abort(403)
         return func(*args, **kwargs)
 
     return wrapper
+
+
+def _current_user_id():
+    """Return the ID of the authenticated user, None outside a request."""
+    if not has_request_context():
+        return None
+    from flask_login import current_user
+
+    return current_user.id if current_user.is_authenticated else None
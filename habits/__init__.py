@@ -1,8 +1,36 @@
 """Blueprint initialization and route registration for the habits module."""
 
+from importlib import import_module
+
 from flask import Blueprint
 
 habits_bp = Blueprint("habits", __name__)
 
-# Register route modules to bind routes to the blueprint
-from .routes import dashboard, add, detail, delete, mark, api
+# Route modules binding their views to the blueprint when imported
+ROUTE_MODULES = (
+    "dashboard",
+    "add",
+    "detail",
+    "delete",
+    "mark",
+    "api",
+    "export",
+    "imports",
+    "rollups",
+    "sync",
+)
+
+
+def load_routes() -> Blueprint:
+    """Import the route modules and return the blueprint.
+
+    Route modules are only imported when an application registers the
+    blueprint, so importing the package for its write helpers or jobs does
+    not load forms and views.
+
+    Returns:
+        Blueprint: The habits blueprint with all its routes
+    """
+    for name in ROUTE_MODULES:
+        import_module(f"{__name__}.routes.{name}")
+    return habits_bp
@@ -0,0 +1,155 @@
+"""Streaming export of habits and their progress history.
+
+Rows are read in chunks from an ordered query with ``yield_per`` and
+serialized as NDJSON or CSV into text chunks of about ``CHUNK_SIZE``
+characters, optionally gzip-compressed. Memory use does not depend on the
+length of the history and the first chunk is ready after the first rows.
+"""
+
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from db import db
+from models import Habit, Progress
+
+# Column order of exported rows
+EXPORT_FIELDS = (
+    "user_id",
+    "habit_id",
+    "habit_name",
+    "periodicity",
+    "target_days",
+    "created_at",
+    "date",
+    "completed",
+)
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+# Approximate number of characters serialized before a chunk is emitted
+CHUNK_SIZE = 65536
+
+
+def export_rows(user_id: Optional[int] = None, batch_size: int = 1000) -> Iterator:
+    """Stream habits joined with their progress, ordered by habit and date.
+
+    Habits without progress appear once with an empty date.
+
+    Args:
+        user_id: Owner of the exported habits, all users if None
+        batch_size: Number of rows fetched per round trip
+
+    Returns:
+        Iterator: Rows with the ``EXPORT_FIELDS`` columns
+    """
+    query = (
+        db.session.query(
+            Habit.user_id,
+            Habit.id.label("habit_id"),
+            Habit.name.label("habit_name"),
+            Habit.periodicity,
+            Habit.target_days,
+            Habit.created_at,
+            Progress.date,
+            Progress.completed,
+        )
+        .outerjoin(Progress, Progress.habit_id == Habit.id)
+        .order_by(Habit.id, Progress.date)
+    )
+    if user_id is not None:
+        query = query.filter(Habit.user_id == user_id)
+    return query.execution_options(stream_results=True).yield_per(batch_size)
+
+
+def _values(row) -> list:
+    """Return the exported values of a row, with dates as ISO strings."""
+    return [
+        value.isoformat() if hasattr(value, "isoformat") else value
+        for value in (getattr(row, field) for field in EXPORT_FIELDS)
+    ]
+
+
+def ndjson_chunks(rows: Iterable) -> Iterator[str]:
+    """Serialize rows as newline-delimited JSON.
+
+    Args:
+        rows: Rows with the ``EXPORT_FIELDS`` columns
+
+    Returns:
+        Iterator[str]: Text chunks
+    """
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(EXPORT_FIELDS, _values(row)))) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(lines)
+            lines = []
+            size = 0
+    if lines:
+        yield "".join(lines)
+
+
+def csv_chunks(rows: Iterable) -> Iterator[str]:
+    """Serialize rows as CSV with a header line.
+
+    Args:
+        rows: Rows with the ``EXPORT_FIELDS`` columns
+
+    Returns:
+        Iterator[str]: Text chunks
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow(_values(row))
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Compress text chunks into a gzip stream.
+
+    Args:
+        chunks: Text chunks
+
+    Returns:
+        Iterator[bytes]: Compressed chunks
+    """
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode("utf-8"))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_stream(
+    output_format: str, user_id: Optional[int] = None, compress: bool = False
+) -> Iterator[bytes]:
+    """Stream an export of habits and progress.
+
+    Args:
+        output_format: 'ndjson' or 'csv'
+        user_id: Owner of the exported habits, all users if None
+        compress: Compress the export with gzip
+
+    Returns:
+        Iterator[bytes]: Export chunks
+    """
+    serialize = ndjson_chunks if output_format == "ndjson" else csv_chunks
+    chunks = serialize(export_rows(user_id))
+    if compress:
+        return gzip_chunks(chunks)
+    return (chunk.encode("utf-8") for chunk in chunks)
@@ -3,7 +3,7 @@
 Provides a centralized way to create Habit objects with consistent initialization.
 """
 
-from models import Habit
+from models import Habit, HabitStats
 
 
 class HabitFactory:
@@ -20,8 +20,12 @@ class HabitFactory:
             target_days: Target duration in days
 
         Returns:
-            Habit: Newly created Habit instance
+            Habit: Newly created Habit instance with empty statistics
         """
         return Habit(
-            name=name, periodicity=periodicity, user_id=user_id, target_days=target_days
+            name=name,
+            periodicity=periodicity,
+            user_id=user_id,
+            target_days=target_days,
+            stats=HabitStats(),
         )
@@ -0,0 +1,51 @@
+"""Cached rendered fragments of habit pages.
+
+Rendered dashboard cards and serialized chart payloads are stored in the
+application's fragment cache under ``(kind, habit id, habit version, day)``.
+A write bumps the habit's version, so its fragments are never served again,
+and they are dropped right away by ``invalidate_fragments``.
+"""
+
+from datetime import date
+from typing import Any, Callable, Iterable
+
+from cache import get_cache
+from models import Habit
+
+
+def cached_fragment(
+    kind: str, habit: Habit, day: date, render: Callable[[], Any]
+) -> Any:
+    """Return a habit fragment from the cache, rendering it on a miss.
+
+    Args:
+        kind: Fragment kind, e.g. 'card' or 'chart'
+        habit: Habit the fragment is rendered from
+        day: Day the fragment is valid for
+        render: Function rendering the fragment
+
+    Returns:
+        Any: Rendered fragment
+    """
+    fragments = get_cache("fragment_cache")
+    if fragments is None:
+        return render()
+    key = (kind, habit.id, habit.version, day)
+    fragment = fragments.get(key)
+    if fragment is None:
+        fragment = render()
+        fragments.set(key, fragment, tag=habit.id)
+    return fragment
+
+
+def invalidate_fragments(habit_ids: Iterable[int]) -> None:
+    """Drop the cached fragments of habits.
+
+    Args:
+        habit_ids: Written or deleted habits
+    """
+    fragments = get_cache("fragment_cache")
+    if fragments is None:
+        return
+    for habit_id in habit_ids:
+        fragments.invalidate_tag(habit_id)
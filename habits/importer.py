@@ -0,0 +1,456 @@
+"""Bulk import of historical progress from CSV or NDJSON.
+
+Records need ``habit_id``, ``date`` (ISO format) and ``completed`` fields,
+so files written by the export can be imported again; other fields are
+ignored, and the export's rows of habits without progress, which have no
+date and completion state, are skipped. Records are validated against each
+habit's ``created_at`` / ``target_days`` window with the habits loaded
+once, and valid records are written in chunks of executemany upserts, one
+transaction per chunk. Invalid records are reported with their line number
+and skipped. Habits whose stored progress a chunk overwrites get their
+analytics rollups updated with the chunk. At the end the statistics and
+version stamps of the affected habits are updated once, the other records
+are added to the rollups as new entries and all written records are added
+to the sync change log, with one version range per owner; this also happens
+for the chunks committed before an import fails.
+"""
+
+import csv
+import json
+import time
+from collections import defaultdict
+from datetime import date as date_type, timedelta
+from itertools import islice
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+)
+
+from sqlalchemy.engine import Row
+
+from db import db
+from habits.progress import refresh_affected_stats, upsert_progress_many
+from habits.rollups import HABIT_BATCH_SIZE, add_habit_totals, update_rollups
+from habits.sync import PROGRESS, reserve_versions
+from habits.versions import bump_versions
+from models import ChangeLog, Habit, Progress
+
+IMPORT_FORMATS = ("csv", "ndjson")
+TRUE_VALUES = frozenset(("1", "true", "t", "yes", "y"))
+FALSE_VALUES = frozenset(("0", "false", "f", "no", "n"))
+
+
+class ImportFileError(Exception):
+    """Raised when an import file cannot be read at all."""
+
+
+class ImportReport:
+    """Outcome of an import.
+
+    Attributes:
+        rows: Number of records read
+        imported: Number of records written
+        skipped: Number of records of habits without progress, which the
+            export writes without a date and completion state
+        error_count: Number of rejected records
+        errors: Line number and message of the first ``max_errors`` rejections
+        habit_ids: IDs of the habits that received progress
+        seconds: Duration of the import
+    """
+
+    def __init__(self, max_errors: int = 100) -> None:
+        """Create an empty report.
+
+        Args:
+            max_errors: Number of rejections kept with their message
+        """
+        self.max_errors = max_errors
+        self.rows = 0
+        self.imported = 0
+        self.skipped = 0
+        self.error_count = 0
+        self.errors: List[Tuple[int, str]] = []
+        self.habit_ids = set()
+        self.seconds = 0.0
+
+    def reject(self, line: int, message: str) -> None:
+        """Record a rejected record.
+
+        Args:
+            line: Line number of the record
+            message: Reason of the rejection
+        """
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, message))
+
+    def as_dict(self) -> Dict:
+        """Return the report as a JSON-serializable dict.
+
+        Returns:
+            Dict: Report fields
+        """
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "skipped": self.skipped,
+            "error_count": self.error_count,
+            "errors": [
+                {"line": line, "error": message} for line, message in self.errors
+            ],
+            "habit_ids": sorted(self.habit_ids),
+            "seconds": round(self.seconds, 3),
+        }
+
+
+def read_records(stream: TextIO, input_format: str) -> Iterator[Tuple[int, tuple]]:
+    """Read ``(habit_id, date, completed)`` records from a text stream.
+
+    Args:
+        stream: CSV with a header line, or NDJSON
+        input_format: 'csv' or 'ndjson'
+
+    Returns:
+        Iterator[Tuple[int, tuple]]: Line numbers and raw field values
+
+    Raises:
+        ImportFileError: If a CSV file lacks a required column
+    """
+    if input_format == "csv":
+        reader = csv.reader(stream)
+        header = next(reader, [])
+        try:
+            columns = [header.index(name) for name in ("habit_id", "date", "completed")]
+        except ValueError:
+            raise ImportFileError(
+                "CSV header needs habit_id, date and completed columns"
+            )
+        habit_column, date_column, completed_column = columns
+        width = max(columns)
+        for line, row in enumerate(reader, start=2):
+            if len(row) <= width:
+                yield line, (None, None, None)
+                continue
+            yield line, (row[habit_column], row[date_column], row[completed_column])
+        return
+
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+            yield line, (record["habit_id"], record["date"], record["completed"])
+        except (ValueError, KeyError, TypeError):
+            yield line, (None, None, None)
+
+
+def _importable_habits(user_id: Optional[int]) -> Dict[int, Row]:
+    """Load the habits progress can be imported into."""
+    query = db.session.query(
+        Habit.id, Habit.user_id, Habit.periodicity, Habit.target_days, Habit.created_at
+    )
+    if user_id is not None:
+        query = query.filter(Habit.user_id == user_id)
+    return {habit.id: habit for habit in query}
+
+
+def _habit_windows(habits: Dict[int, Row]) -> Dict[int, Tuple[date_type, date_type]]:
+    """Return the first and last trackable day of every habit."""
+    return {
+        habit_id: (
+            habit.created_at.date(),
+            habit.created_at.date() + timedelta(days=(habit.target_days or 1) - 1),
+        )
+        for habit_id, habit in habits.items()
+    }
+
+
+def _parse_completed(value) -> Optional[bool]:
+    """Parse a completion flag, None if it is not a boolean."""
+    if isinstance(value, str):
+        if value in TRUE_VALUES:
+            return True
+        if value in FALSE_VALUES:
+            return False
+    elif isinstance(value, bool):
+        return value
+    elif isinstance(value, int):
+        return bool(value) if value in (0, 1) else None
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    return None
+
+
+def validate_records(
+    records: Iterable[Tuple[int, tuple]],
+    windows: Dict[int, Tuple[date_type, date_type]],
+    report: ImportReport,
+) -> List[Tuple[int, str, bool]]:
+    """Validate records against the habit windows.
+
+    Args:
+        records: Line numbers and raw ``(habit_id, date, completed)`` values
+        windows: First and last trackable day per importable habit
+        report: Report receiving the rejections
+
+    Returns:
+        List[Tuple[int, str, bool]]: Valid ``(habit_id, ISO date, completed)``
+    """
+    valid = []
+    for line, (raw_habit, raw_date, raw_completed) in records:
+        report.rows += 1
+        try:
+            habit_id = int(raw_habit)
+            day = date_type.fromisoformat(raw_date)
+        except (TypeError, ValueError):
+            # The export lists habits without progress with no date and state
+            habit_only = raw_habit not in (None, "") and not raw_date
+            if habit_only and raw_completed in (None, ""):
+                report.skipped += 1
+            else:
+                report.reject(line, "Malformed record")
+            continue
+        window = windows.get(habit_id)
+        if window is None:
+            report.reject(line, f"Unknown habit {habit_id}")
+            continue
+        if not window[0] <= day <= window[1]:
+            report.reject(line, f"Date {day} outside habit period")
+            continue
+        completed = _parse_completed(raw_completed)
+        if completed is None:
+            report.reject(line, f"Invalid completed value {raw_completed!r}")
+            continue
+        valid.append((habit_id, day.isoformat(), completed))
+    return valid
+
+
+def _stored_habits(ranges: Dict[int, Tuple[str, str]]) -> Set[int]:
+    """Return the habits with stored progress within their day range.
+
+    Args:
+        ranges: First and last ISO date per habit
+
+    Returns:
+        Set[int]: IDs of the habits whose range already has progress
+    """
+    habit_ids = sorted(ranges)
+    start = min(first for first, _ in ranges.values())
+    end = max(last for _, last in ranges.values())
+    candidates = set()
+    for offset in range(0, len(habit_ids), HABIT_BATCH_SIZE):
+        candidates.update(
+            habit_id
+            for (habit_id,) in db.session.query(Progress.habit_id)
+            .filter(
+                Progress.habit_id.in_(habit_ids[offset : offset + HABIT_BATCH_SIZE]),
+                Progress.date.between(
+                    date_type.fromisoformat(start), date_type.fromisoformat(end)
+                ),
+            )
+            .distinct()
+        )
+    return {
+        habit_id
+        for habit_id in candidates
+        if db.session.query(Progress.id)
+        .filter(
+            Progress.habit_id == habit_id,
+            Progress.date.between(
+                date_type.fromisoformat(ranges[habit_id][0]),
+                date_type.fromisoformat(ranges[habit_id][1]),
+            ),
+        )
+        .first()
+        is not None
+    }
+
+
+def _write_chunk(rows: List[Tuple[int, str, bool]]) -> None:
+    """Upsert a chunk of validated rows in the current transaction.
+
+    SQLite receives the rows through one DB-API ``executemany`` with the
+    dates already in their stored ISO format; other backends go through
+    the SQLAlchemy upsert.
+    """
+    if db.engine.dialect.name == "sqlite":
+        table = Progress.__table__.name
+        db.session.connection().exec_driver_sql(
+            f"INSERT INTO {table} (habit_id, date, completed) VALUES (?, ?, ?) "
+            "ON CONFLICT (habit_id, date) DO UPDATE SET completed = excluded.completed",
+            rows,
+        )
+        return
+    upsert_progress_many(
+        [
+            {
+                "habit_id": habit_id,
+                "date": date_type.fromisoformat(day),
+                "completed": completed,
+            }
+            for habit_id, day, completed in rows
+        ]
+    )
+
+
+def _log_records(records: Dict[Tuple[int, str], bool], habits: Dict[int, Row]) -> None:
+    """Add written records to the sync change log in the current transaction.
+
+    The versions of every owner are reserved as one range. SQLite receives
+    the rows through one DB-API ``executemany``, like ``_write_chunk``.
+
+    Args:
+        records: Completion state per ``(habit_id, ISO date)``
+        habits: Importable habits by ID
+    """
+    by_owner: Dict[int, List[Tuple[int, str, bool]]] = defaultdict(list)
+    for (habit_id, day), completed in records.items():
+        by_owner[habits[habit_id].user_id].append((habit_id, day, completed))
+    connection = db.session.connection()
+    rows = []
+    for user_id in sorted(by_owner):
+        entries = by_owner[user_id]
+        first = reserve_versions(connection, user_id, len(entries))
+        rows.extend(
+            (user_id, version, habit_id, day, completed)
+            for version, (habit_id, day, completed) in enumerate(entries, start=first)
+        )
+
+    if db.engine.dialect.name == "sqlite":
+        table = ChangeLog.__table__.name
+        connection.exec_driver_sql(
+            f"INSERT INTO {table} "
+            "(user_id, version, entity, habit_id, day, completed, deleted) "
+            f"VALUES (?, ?, '{PROGRESS}', ?, ?, ?, 0)",
+            rows,
+        )
+        return
+    db.session.execute(
+        ChangeLog.__table__.insert(),
+        [
+            {
+                "user_id": user_id,
+                "version": version,
+                "entity": PROGRESS,
+                "habit_id": habit_id,
+                "day": date_type.fromisoformat(day),
+                "completed": completed,
+                "deleted": False,
+            }
+            for user_id, version, habit_id, day, completed in rows
+        ],
+    )
+
+
+def _finalise_records(
+    chunks: List[Tuple[List[Tuple[int, str, bool]], Set[int]]],
+    habits: Dict[int, Row],
+) -> None:
+    """Roll up and log the records of committed chunks.
+
+    Within a chunk, and across chunks, the last record of a habit and day
+    is the one stored. Records of habits without stored progress in their
+    chunk's range are added to the rollups as new entries; the overwritten
+    habits applied their totals with the chunk.
+
+    Args:
+        chunks: Validated rows of every committed chunk and the habits
+            whose stored progress it overwrote
+        habits: Importable habits by ID
+    """
+    records: Dict[Tuple[int, str], bool] = {}
+    for rows, overwritten in chunks:
+        stored = {(habit_id, day): completed for habit_id, day, completed in rows}
+        update_rollups(
+            (habits[habit_id], date_type.fromisoformat(day), None, completed)
+            for (habit_id, day), completed in stored.items()
+            if habit_id not in overwritten
+        )
+        records.update(stored)
+    _log_records(records, habits)
+
+
+def import_progress(
+    records: Iterable[Tuple[int, tuple]],
+    user_id: Optional[int] = None,
+    chunk_size: int = 50_000,
+    max_errors: int = 100,
+    on_chunk: Optional[Callable[[ImportReport], None]] = None,
+) -> ImportReport:
+    """Validate and write progress records in chunked transactions.
+
+    Every chunk is committed on its own; for records repeating a habit and
+    day the last one wins. If the import fails, the chunks committed so far
+    are kept and still finalised.
+
+    Args:
+        records: Line numbers and raw values from ``read_records``
+        user_id: Only import into this user's habits, any habit if None
+        chunk_size: Number of records validated and written per transaction
+        max_errors: Number of rejections kept with their message
+        on_chunk: Called with the report after every committed chunk
+
+    Returns:
+        ImportReport: Counts and rejections of the import
+    """
+    started = time.perf_counter()
+    report = ImportReport(max_errors)
+    habits = _importable_habits(user_id)
+    windows = _habit_windows(habits)
+    records = iter(records)
+    # Committed chunks and the habits whose stored progress they overwrote
+    written: List[Tuple[List[Tuple[int, str, bool]], Set[int]]] = []
+
+    try:
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            rows = validate_records(chunk, windows, report)
+            if rows:
+                # ISO dates sort like the days they encode
+                ranges: Dict[int, Tuple[str, str]] = {}
+                for habit_id, day, _ in rows:
+                    first, last = ranges.get(habit_id, (day, day))
+                    ranges[habit_id] = (min(first, day), max(last, day))
+                overwritten = _stored_habits(ranges)
+                if overwritten:
+                    region = (
+                        sorted(overwritten),
+                        date_type.fromisoformat(min(ranges[h][0] for h in overwritten)),
+                        date_type.fromisoformat(max(ranges[h][1] for h in overwritten)),
+                    )
+                    add_habit_totals(*region, sign=-1)
+                _write_chunk(rows)
+                if overwritten:
+                    add_habit_totals(*region)
+                db.session.commit()
+                written.append((rows, overwritten))
+                report.imported += len(rows)
+                report.habit_ids.update(ranges)
+            report.seconds = time.perf_counter() - started
+            if on_chunk is not None:
+                on_chunk(report)
+    except BaseException:
+        db.session.rollback()
+        raise
+    finally:
+        # Committed chunks are finalised even if a later one failed
+        if report.habit_ids:
+            habit_ids = sorted(report.habit_ids)
+            bump_versions(habit_ids)
+            refresh_affected_stats(habit_ids)
+            _finalise_records(written, habits)
+            db.session.commit()
+    report.seconds = time.perf_counter() - started
+    return report
@@ -0,0 +1,198 @@
+"""Keyset pagination and JSON serialization for the read API.
+
+Pages are ordered by a ``(date, id)`` key and the next page starts after
+the last key of the previous one, so every page is a range scan on a
+composite index no matter how deep the client has paged. The key is handed
+to clients as an opaque cursor. Responses are serialized with ``orjson``
+when it is installed.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# Number of items per page when the client does not ask for a limit
+DEFAULT_PAGE_SIZE = 50
+# Largest number of items a client may request per page
+MAX_PAGE_SIZE = 500
+
+
+class PaginationError(ValueError):
+    """Raised when pagination, filter or field parameters are invalid."""
+
+
+def encode_cursor(key: Tuple[Any, int]) -> str:
+    """Encode a ``(date, id)`` key as an opaque cursor.
+
+    Args:
+        key: Date or datetime and ID of the last item of a page
+
+    Returns:
+        str: URL-safe cursor
+    """
+    raw = json.dumps([key[0].isoformat(), key[1]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, key_type: type) -> Tuple[Any, int]:
+    """Decode a cursor created by ``encode_cursor``.
+
+    Args:
+        cursor: Cursor from the client
+        key_type: ``date`` or ``datetime``, the type of the date part
+
+    Returns:
+        Tuple[Any, int]: Date and ID of the last item of the previous page
+
+    Raises:
+        PaginationError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, item_id = json.loads(raw)
+        return key_type.fromisoformat(value), int(item_id)
+    except (ValueError, TypeError):
+        raise PaginationError("Invalid cursor")
+
+
+def int_param(name: str, default: int) -> int:
+    """Read an integer query parameter.
+
+    Args:
+        name: Parameter name
+        default: Value if the parameter is not given
+
+    Returns:
+        int: The value
+
+    Raises:
+        PaginationError: If the value is not an integer
+    """
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise PaginationError(f"{name} must be an integer")
+
+
+def page_size() -> int:
+    """Read the ``limit`` query parameter.
+
+    Returns:
+        int: Number of items per page
+
+    Raises:
+        PaginationError: If the limit is not an integer between 1 and
+            ``MAX_PAGE_SIZE``
+    """
+    limit = int_param("limit", DEFAULT_PAGE_SIZE)
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise PaginationError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def date_filter(name: str) -> Optional[date]:
+    """Read an ISO date query parameter.
+
+    Args:
+        name: Parameter name
+
+    Returns:
+        Optional[date]: The date, None if not given
+
+    Raises:
+        PaginationError: If the value is not an ISO date
+    """
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise PaginationError(f"{name} must be a date in YYYY-MM-DD format")
+
+
+def selected_fields(available: Sequence[str]) -> List[str]:
+    """Read the comma-separated ``fields`` query parameter.
+
+    Args:
+        available: Fields the endpoint can return, in output order
+
+    Returns:
+        List[str]: Requested fields in output order, all if none requested
+
+    Raises:
+        PaginationError: If an unknown field is requested
+    """
+    value = request.args.get("fields")
+    if not value:
+        return list(available)
+    requested = {field.strip() for field in value.split(",") if field.strip()}
+    unknown = requested.difference(available)
+    if unknown:
+        raise PaginationError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [field for field in available if field in requested]
+
+
+def page(
+    rows: Iterable, fields: Sequence[str], limit: int, key: str, item_id: str
+) -> Dict[str, Any]:
+    """Build a page from rows fetched with ``limit + 1``.
+
+    Args:
+        rows: Rows in key order, at most one more than ``limit``
+        fields: Fields returned per item
+        limit: Number of items per page
+        key: Row attribute holding the date part of the key
+        item_id: Row attribute holding the ID part of the key
+
+    Returns:
+        Dict[str, Any]: ``items`` and the ``next_cursor``, None on the last
+            page
+    """
+    rows = list(rows)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor((getattr(last, key), getattr(last, item_id)))
+    return {
+        "items": [
+            {field: _plain(getattr(row, field)) for field in fields} for row in rows
+        ],
+        "next_cursor": next_cursor,
+    }
+
+
+def _plain(value: Any) -> Any:
+    """Convert dates to ISO strings for the fallback JSON encoder."""
+    if orjson is None and isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def json_response(payload: Any, status: int = 200) -> Response:
+    """Serialize a payload into a compact JSON response.
+
+    Args:
+        payload: JSON-serializable payload
+        status: HTTP status code
+
+    Returns:
+        Response: JSON response
+    """
+    if orjson is not None:
+        body = orjson.dumps(payload)
+    else:
+        body = json.dumps(payload, separators=(",", ":"))
+    return Response(body, status=status, mimetype="application/json")
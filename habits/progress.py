@@ -0,0 +1,253 @@
+"""Write helpers for habit progress entries.
+
+All progress writes go through this module so that a day's entry is stored
+with a single atomic upsert keyed on the ``(habit_id, date)`` unique index,
+and the habit statistics, analytics rollups and sync change log are updated
+in the same transaction. With ``STATS_MODE`` set to 'deferred' the
+statistics are rebuilt by background jobs queued in that transaction
+instead.
+"""
+
+from datetime import date as date_type
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+from flask import current_app
+
+from sqlalchemy import tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm.exc import StaleDataError
+
+from db import db
+from models import Habit, HabitStats, Progress
+from habits.rollups import update_rollups
+from habits.sync import log_progress_changes
+from habits.stats import rebuild_stats, refresh_stats_later, update_stats
+from habits.versions import bump_versions
+from streaks import update_cached_streaks
+
+# Attempts of a progress write that lost a race on a statistics row
+STALE_RETRIES = 3
+
+T = TypeVar("T")
+
+# Dialects whose INSERT supports ``ON CONFLICT ... DO UPDATE``
+_UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def upsert_progress(habit_id: int, date: date_type, completed: bool) -> None:
+    """Insert or update the progress entry of a habit for one day.
+
+    Runs as a single ``INSERT ... ON CONFLICT DO UPDATE`` statement in the
+    current session transaction; the caller is responsible for committing.
+    Backends without upsert support fall back to SELECT-then-INSERT.
+
+    Args:
+        habit_id: ID of the habit
+        date: Day of the entry
+        completed: Whether the habit was completed that day
+    """
+    insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+
+    if insert is None:
+        progress = Progress.query.filter_by(habit_id=habit_id, date=date).first()
+        if not progress:
+            db.session.add(Progress(habit_id=habit_id, date=date, completed=completed))
+        else:
+            progress.completed = completed
+        return
+
+    stmt = _upsert_statement(insert).values(
+        habit_id=habit_id, date=date, completed=completed
+    )
+    db.session.execute(stmt)
+
+
+def upsert_progress_many(entries: List[Dict]) -> None:
+    """Insert or update many progress entries with one executemany upsert.
+
+    The caller is responsible for committing.
+
+    Args:
+        entries: Dicts with ``habit_id``, ``date`` and ``completed`` keys,
+            at most one per habit and day
+    """
+    if not entries:
+        return
+
+    insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+    if insert is None:
+        for entry in entries:
+            upsert_progress(entry["habit_id"], entry["date"], entry["completed"])
+        return
+
+    db.session.execute(_upsert_statement(insert), entries)
+
+
+def _upsert_statement(insert):
+    """Build the ``(habit_id, date)`` upsert statement for a dialect.
+
+    Args:
+        insert: Dialect specific ``insert`` construct
+
+    Returns:
+        Insert: Statement updating ``completed`` on conflict
+    """
+    stmt = insert(Progress.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=["habit_id", "date"],
+        set_={"completed": stmt.excluded.completed},
+    )
+
+
+def _previous_states(entries: List[Dict]) -> Dict[Tuple[int, date_type], bool]:
+    """Load the stored completion state of the entries about to be written.
+
+    Args:
+        entries: Dicts with ``habit_id`` and ``date`` keys
+
+    Returns:
+        Dict[Tuple[int, date_type], bool]: Completion state per existing
+            ``(habit_id, date)``
+    """
+    if not entries:
+        return {}
+    rows = db.session.query(
+        Progress.habit_id, Progress.date, Progress.completed
+    ).filter(
+        tuple_(Progress.habit_id, Progress.date).in_(
+            [(entry["habit_id"], entry["date"]) for entry in entries]
+        )
+    )
+    return {(habit_id, day): completed for habit_id, day, completed in rows}
+
+
+def stats_deferred() -> bool:
+    """Return whether statistics are rebuilt by background jobs.
+
+    Returns:
+        bool: True if ``STATS_MODE`` is 'deferred'
+    """
+    return current_app.config.get("STATS_MODE", "inline") == "deferred"
+
+
+def refresh_affected_stats(habit_ids: Iterable[int]) -> None:
+    """Rebuild the statistics of written habits, or queue the rebuilds.
+
+    The caller is responsible for committing.
+
+    Args:
+        habit_ids: Habits whose progress was written
+    """
+    if stats_deferred():
+        refresh_stats_later(habit_ids)
+    else:
+        rebuild_stats(list(habit_ids))
+
+
+def record_progress(
+    habit: Habit, date: date_type, completed: bool
+) -> Optional[HabitStats]:
+    """Store a habit's progress for one day and update its statistics.
+
+    The habit's version stamp is bumped, the analytics rollups and the
+    cached streak index are updated and the change is logged along with the
+    write. In deferred mode a statistics rebuild is queued and the
+    statistics are returned unchanged.
+
+    The caller is responsible for committing.
+
+    Args:
+        habit: Habit to record progress for
+        date: Day of the entry
+        completed: Whether the habit was completed that day
+
+    Returns:
+        Optional[HabitStats]: Statistics of the habit
+    """
+    previous = (
+        db.session.query(Progress.completed)
+        .filter_by(habit_id=habit.id, date=date)
+        .scalar()
+    )
+    upsert_progress(habit.id, date, completed)
+    bump_versions([habit.id])
+    update_rollups([(habit, date, previous, completed)])
+    log_progress_changes([(habit.id, date, completed)], {habit.id: habit.user_id})
+    update_cached_streaks(habit.id, date, completed)
+    if stats_deferred():
+        refresh_stats_later([habit.id])
+        return habit.stats
+    return update_stats(habit, date, previous, completed)
+
+
+def record_progress_many(entries: List[Dict]) -> List[int]:
+    """Store many progress entries and refresh the affected habits' statistics.
+
+    Entries are written with one upsert, the version stamps of the affected
+    habits are bumped, the analytics rollups are updated, the changes are
+    logged and the habits' statistics are rebuilt once, or queued for
+    rebuilding in deferred mode. The caller is responsible for committing.
+
+    Args:
+        entries: Dicts with ``habit_id``, ``date`` and ``completed`` keys,
+            at most one per habit and day
+
+    Returns:
+        List[int]: IDs of the affected habits
+    """
+    habit_ids = sorted({entry["habit_id"] for entry in entries})
+    previous = _previous_states(entries)
+    upsert_progress_many(entries)
+    bump_versions(habit_ids)
+    habits = {
+        row.id: row
+        for row in db.session.query(
+            Habit.id, Habit.user_id, Habit.periodicity, Habit.target_days
+        ).filter(Habit.id.in_(habit_ids))
+    }
+    update_rollups(
+        (
+            habits[entry["habit_id"]],
+            entry["date"],
+            previous.get((entry["habit_id"], entry["date"])),
+            entry["completed"],
+        )
+        for entry in entries
+    )
+    log_progress_changes(
+        ((entry["habit_id"], entry["date"], entry["completed"]) for entry in entries),
+        {habit_id: habit.user_id for habit_id, habit in habits.items()},
+    )
+    refresh_affected_stats(habit_ids)
+    return habit_ids
+
+
+def commit_progress(write: Callable[[], T]) -> T:
+    """Run a progress write and commit it, retrying lost statistics races.
+
+    ``HabitStats`` rows are version checked, so a concurrent write to the
+    same habit's statistics makes the flush raise ``StaleDataError``. The
+    transaction is then rolled back and the write is run again on freshly
+    loaded statistics, up to ``STALE_RETRIES`` times.
+
+    Args:
+        write: Callable recording the progress in the current session
+
+    Returns:
+        The return value of ``write``
+
+    Raises:
+        StaleDataError: If every attempt lost the race
+    """
+    for attempt in range(STALE_RETRIES):
+        try:
+            result = write()
+            db.session.commit()
+            return result
+        except StaleDataError:
+            db.session.rollback()
+            if attempt == STALE_RETRIES - 1:
+                raise
@@ -0,0 +1,473 @@
+"""Per-day rollups of progress for cross-user analytics.
+
+Admin analytics read two small tables instead of scanning the progress
+history: ``DailyRollup`` counts the entries and completions of every day per
+habit periodicity and ``target_days`` bucket, and ``DailyActiveUser`` holds
+the users who recorded progress on a day. Single and batch progress writes
+apply their deltas to the rollups in the same transaction. Import chunks
+overwriting stored progress subtract the totals of their habits and days
+before the write and add them back after it, aggregated in SQL; the backfill
+rebuilds whole day ranges from the ``progress`` table over its ``date``
+index. A nightly compaction job rebuilds the latest days to repair any drift
+and drops rows emptied by deleted habits.
+"""
+
+from collections import defaultdict
+from datetime import date as date_type, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from db import db
+from jobs import enqueue_daily, job_handler, on_worker_start
+from models import DailyActiveUser, DailyRollup, Habit, Progress
+
+# Upper bounds and labels of the ``target_days`` buckets
+TARGET_BUCKETS = ((7, "1-7"), (21, "8-21"), (66, "22-66"))
+# Label of the habits above the last bucket
+OPEN_BUCKET = "67+"
+# Columns the breakdown can group by
+BREAKDOWNS = ("periodicity", "target_bucket")
+# Days rebuilt per transaction
+REBUILD_CHUNK_DAYS = 31
+# Habits aggregated per statement when rolling up a set of habits
+HABIT_BATCH_SIZE = 500
+
+# Dialects whose INSERT supports ``ON CONFLICT``
+_UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+# Rollup key and ``[entries, completions]`` deltas
+Counters = Dict[Tuple[date_type, str, str], List[int]]
+
+
+def target_bucket(target_days: Optional[int]) -> str:
+    """Return the label of the bucket a habit's target falls into.
+
+    Args:
+        target_days: Goal duration of the habit in days
+
+    Returns:
+        str: Bucket label such as '8-21'
+    """
+    for bound, label in TARGET_BUCKETS:
+        if (target_days or 0) <= bound:
+            return label
+    return OPEN_BUCKET
+
+
+def _rollup_key(habit, day: date_type) -> Tuple[date_type, str, str]:
+    """Return the rollup key of a habit's entry."""
+    return (day, habit.periodicity or "daily", target_bucket(habit.target_days))
+
+
+def update_rollups(writes: Iterable[Tuple]) -> None:
+    """Apply progress writes to the rollups.
+
+    The caller is responsible for committing.
+
+    Args:
+        writes: ``(habit, day, previous, completed)`` tuples, where habit has
+            ``id``, ``user_id``, ``periodicity`` and ``target_days`` and
+            previous is the completion state before the write, None for a new
+            entry
+    """
+    counters: Counters = defaultdict(lambda: [0, 0])
+    active = set()
+    # Periodicity and bucket per habit ID, the same for all of its entries
+    labels: Dict[int, Tuple[str, str]] = {}
+    for habit, day, previous, completed in writes:
+        label = labels.get(habit.id)
+        if label is None:
+            label = labels[habit.id] = _rollup_key(habit, day)[1:]
+        counts = counters[(day,) + label]
+        counts[0] += previous is None
+        counts[1] += bool(completed) - bool(previous)
+        active.add((day, habit.user_id))
+    _add_counters(counters)
+    _add_active_users(active)
+
+
+def remove_habit_rollups(habit: Habit) -> None:
+    """Subtract the progress of a habit about to be deleted.
+
+    The habit's owner stays counted as active on its days. The caller is
+    responsible for committing.
+
+    Args:
+        habit: Habit whose progress is removed
+    """
+    counters: Counters = defaultdict(lambda: [0, 0])
+    rows = db.session.query(Progress.date, Progress.completed).filter(
+        Progress.habit_id == habit.id
+    )
+    for day, completed in rows:
+        counts = counters[_rollup_key(habit, day)]
+        counts[0] -= 1
+        counts[1] -= bool(completed)
+    _add_counters(counters)
+
+
+def _add_counters(counters: Counters) -> None:
+    """Add entry and completion deltas to the rollup rows."""
+    rows = [
+        {
+            "day": day,
+            "periodicity": periodicity,
+            "target_bucket": bucket,
+            "entries": entries,
+            "completions": completions,
+        }
+        for (day, periodicity, bucket), (entries, completions) in sorted(
+            counters.items()
+        )
+        if entries or completions
+    ]
+    if not rows:
+        return
+
+    insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+    if insert is None:
+        for row in rows:
+            rollup = db.session.get(
+                DailyRollup, (row["day"], row["periodicity"], row["target_bucket"])
+            )
+            if rollup is None:
+                db.session.add(DailyRollup(**row))
+            else:
+                rollup.entries += row["entries"]
+                rollup.completions += row["completions"]
+        return
+
+    table = DailyRollup.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "periodicity", "target_bucket"],
+        set_={
+            "entries": table.c.entries + stmt.excluded.entries,
+            "completions": table.c.completions + stmt.excluded.completions,
+        },
+    )
+    db.session.execute(stmt, rows)
+
+
+def _add_active_users(active: Iterable[Tuple[date_type, int]]) -> None:
+    """Mark users as active on days."""
+    rows = [{"day": day, "user_id": user_id} for day, user_id in sorted(active)]
+    if not rows:
+        return
+
+    insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+    if insert is None:
+        for row in rows:
+            if db.session.get(DailyActiveUser, (row["day"], row["user_id"])) is None:
+                db.session.add(DailyActiveUser(**row))
+        return
+
+    db.session.execute(insert(DailyActiveUser.__table__).on_conflict_do_nothing(), rows)
+
+
+def rebuild_rollups(start: date_type, end: date_type) -> int:
+    """Recompute the rollups of a day range from the progress table.
+
+    Every chunk of ``REBUILD_CHUNK_DAYS`` days is rebuilt and committed in
+    its own transaction.
+
+    Args:
+        start: First day to rebuild
+        end: Last day to rebuild
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    written = 0
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=REBUILD_CHUNK_DAYS - 1), end)
+        written += _rebuild_chunk(chunk_start, chunk_end)
+        db.session.commit()
+        chunk_start = chunk_end + timedelta(days=1)
+    return written
+
+
+def _rebuild_chunk(start: date_type, end: date_type) -> int:
+    """Replace the rollups of a day range in the current transaction."""
+    in_range = Progress.date.between(start, end)
+    db.session.query(DailyRollup).filter(DailyRollup.day.between(start, end)).delete(
+        synchronize_session=False
+    )
+    db.session.query(DailyActiveUser).filter(
+        DailyActiveUser.day.between(start, end)
+    ).delete(synchronize_session=False)
+
+    counters: Counters = defaultdict(lambda: [0, 0])
+    _count_progress(counters, in_range)
+    _add_counters(counters)
+    _add_active_users(_active_users(in_range))
+    return len(counters)
+
+
+def _count_progress(counters: Counters, *criteria) -> None:
+    """Add the entries and completions of matching progress per rollup key."""
+    groups = (
+        db.session.query(
+            Progress.date,
+            Habit.periodicity,
+            Habit.target_days,
+            func.count(),
+            func.sum(case((Progress.completed.is_(True), 1), else_=0)),
+        )
+        .join(Habit, Habit.id == Progress.habit_id)
+        .filter(*criteria)
+        .group_by(Progress.date, Habit.periodicity, Habit.target_days)
+    )
+    for day, periodicity, target_days, entries, completions in groups:
+        counts = counters[(day, periodicity or "daily", target_bucket(target_days))]
+        counts[0] += entries
+        counts[1] += completions or 0
+
+
+def _active_users(*criteria):
+    """Query the distinct ``(day, user_id)`` pairs of matching progress."""
+    return (
+        db.session.query(Progress.date, Habit.user_id)
+        .join(Habit, Habit.id == Progress.habit_id)
+        .filter(*criteria)
+        .distinct()
+    )
+
+
+def _bucket_expression():
+    """Return the SQL expression of a habit's ``target_days`` bucket."""
+    target_days = func.coalesce(Habit.target_days, 0)
+    return case(
+        *((target_days <= bound, label) for bound, label in TARGET_BUCKETS),
+        else_=OPEN_BUCKET,
+    )
+
+
+def add_habit_totals(
+    habit_ids: List[int], start: date_type, end: date_type, sign: int = 1
+) -> None:
+    """Add the progress of habits within a day range to the rollups.
+
+    The totals are aggregated and upserted by the database, one statement
+    per batch of habits. Subtracting the totals (``sign=-1``) before a bulk
+    write and adding them after it applies exactly the written entries,
+    since the entries that were not written cancel out. Adding also marks
+    the owners active. The caller is responsible for committing.
+
+    Args:
+        habit_ids: Habits whose progress is counted
+        start: First day
+        end: Last day
+        sign: 1 to add the totals, -1 to subtract them
+    """
+    insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+    table = DailyRollup.__table__
+    for first in range(0, len(habit_ids), HABIT_BATCH_SIZE):
+        criteria = (
+            Progress.habit_id.in_(habit_ids[first : first + HABIT_BATCH_SIZE]),
+            Progress.date.between(start, end),
+        )
+        if insert is None:
+            counters: Counters = defaultdict(lambda: [0, 0])
+            _count_progress(counters, *criteria)
+            for counts in counters.values():
+                counts[0] *= sign
+                counts[1] *= sign
+            _add_counters(counters)
+            if sign > 0:
+                _add_active_users(_active_users(*criteria))
+            continue
+
+        periodicity = func.coalesce(Habit.periodicity, "daily")
+        bucket = _bucket_expression()
+        completed = case((Progress.completed.is_(True), 1), else_=0)
+        totals = (
+            select(
+                Progress.date,
+                periodicity,
+                bucket,
+                sign * func.count(),
+                sign * func.sum(completed),
+            )
+            .join(Habit, Habit.id == Progress.habit_id)
+            .where(*criteria)
+            .group_by(Progress.date, periodicity, bucket)
+        )
+        stmt = insert(table).from_select(
+            ["day", "periodicity", "target_bucket", "entries", "completions"], totals
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["day", "periodicity", "target_bucket"],
+            set_={
+                "entries": table.c.entries + stmt.excluded.entries,
+                "completions": table.c.completions + stmt.excluded.completions,
+            },
+        )
+        db.session.execute(stmt)
+        if sign > 0:
+            active = (
+                select(Progress.date, Habit.user_id)
+                .join(Habit, Habit.id == Progress.habit_id)
+                .where(*criteria)
+                .distinct()
+            )
+            db.session.execute(
+                insert(DailyActiveUser.__table__)
+                .from_select(["day", "user_id"], active)
+                .on_conflict_do_nothing()
+            )
+
+
+def progress_date_range() -> Optional[Tuple[date_type, date_type]]:
+    """Return the first and last day with progress.
+
+    Returns:
+        Optional[Tuple[date_type, date_type]]: Day range, None without progress
+    """
+    first, last = db.session.query(
+        func.min(Progress.date), func.max(Progress.date)
+    ).one()
+    if first is None:
+        return None
+    return first, last
+
+
+def compact_rollups(days: int = 2) -> int:
+    """Rebuild the latest days and drop empty rollup rows.
+
+    Args:
+        days: Number of days before today to rebuild
+
+    Returns:
+        int: Number of empty rows dropped
+    """
+    today = datetime.utcnow().date()
+    if days > 0:
+        rebuild_rollups(today - timedelta(days=days), today - timedelta(days=1))
+    dropped = (
+        db.session.query(DailyRollup)
+        .filter(DailyRollup.entries <= 0, DailyRollup.completions <= 0)
+        .delete(synchronize_session=False)
+    )
+    db.session.commit()
+    return dropped
+
+
+@on_worker_start
+def schedule_compaction() -> None:
+    """Queue the next nightly compaction at ``ROLLUP_COMPACT_HOUR`` (UTC).
+
+    The caller is responsible for committing.
+    """
+    enqueue_daily("compact_rollups", current_app.config.get("ROLLUP_COMPACT_HOUR", 3))
+
+
+@job_handler("compact_rollups")
+def compact_rollups_job(payload: Dict) -> None:
+    """Run the nightly compaction and queue the next one.
+
+    Args:
+        payload: Unused
+    """
+    compact_rollups(current_app.config.get("ROLLUP_RECONCILE_DAYS", 2))
+    schedule_compaction()
+    db.session.commit()
+
+
+def _rate(entries: int, completions: int) -> float:
+    """Return completions as a percentage of entries, 0.0 without entries."""
+    return round(completions * 100 / entries, 1) if entries > 0 else 0.0
+
+
+def daily_totals(start: date_type, end: date_type) -> List[Dict]:
+    """Read the per-day totals of a day range from the rollups.
+
+    Args:
+        start: First day
+        end: Last day
+
+    Returns:
+        List[Dict]: ``day``, ``active_users``, ``entries``, ``completions``
+            and ``completion_rate`` of every day with progress
+    """
+    totals: Dict[date_type, Dict] = {}
+
+    def total(day: date_type) -> Dict:
+        return totals.setdefault(
+            day, {"day": day, "active_users": 0, "entries": 0, "completions": 0}
+        )
+
+    counters = (
+        db.session.query(
+            DailyRollup.day,
+            func.sum(DailyRollup.entries),
+            func.sum(DailyRollup.completions),
+        )
+        .filter(DailyRollup.day.between(start, end))
+        .group_by(DailyRollup.day)
+    )
+    for day, entries, completions in counters:
+        total(day).update(entries=entries, completions=completions)
+    active = (
+        db.session.query(DailyActiveUser.day, func.count())
+        .filter(DailyActiveUser.day.between(start, end))
+        .group_by(DailyActiveUser.day)
+    )
+    for day, users in active:
+        total(day)["active_users"] = users
+
+    rows = [totals[day] for day in sorted(totals)]
+    for row in rows:
+        row["completion_rate"] = _rate(row["entries"], row["completions"])
+    return rows
+
+
+def rollup_breakdown(start: date_type, end: date_type, by: str) -> List[Dict]:
+    """Read the totals of a day range per periodicity or target bucket.
+
+    Args:
+        start: First day
+        end: Last day
+        by: 'periodicity' or 'target_bucket'
+
+    Returns:
+        List[Dict]: The group value under ``by``, ``entries``,
+            ``completions`` and ``completion_rate`` of every group
+
+    Raises:
+        ValueError: If ``by`` is not one of ``BREAKDOWNS``
+    """
+    if by not in BREAKDOWNS:
+        raise ValueError(f"by must be one of {', '.join(BREAKDOWNS)}")
+    column = getattr(DailyRollup, by)
+    groups = (
+        db.session.query(
+            column,
+            func.sum(DailyRollup.entries),
+            func.sum(DailyRollup.completions),
+        )
+        .filter(DailyRollup.day.between(start, end))
+        .group_by(column)
+    )
+    if by == "target_bucket":
+        # Buckets in ascending target order rather than alphabetically
+        order = [label for _, label in TARGET_BUCKETS] + [OPEN_BUCKET]
+        groups = sorted(groups, key=lambda group: order.index(group[0]))
+    else:
+        groups = sorted(groups)
+    return [
+        {
+            by: value,
+            "entries": entries,
+            "completions": completions,
+            "completion_rate": _rate(entries, completions),
+        }
+        for value, entries, completions in groups
+    ]
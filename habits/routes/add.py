@@ -11,11 +11,14 @@ from typing import Union, Tuple
 from habits import habits_bp
 from forms import HabitForm
 from db import db
+from decorators import log_activity
 from habits.factory import HabitFactory
+from habits.versions import bump_versions
 
 
 @habits_bp.route("/add", methods=["GET", "POST"])
 @login_required
+@log_activity
 def add_habit() -> Union[str, Tuple[str, int]]:
     """Handle adding a new habit.
 
@@ -39,6 +42,7 @@ def add_habit() -> Union[str, Tuple[str, int]]:
                 form.target_days.data,
             )
             db.session.add(habit)
+            bump_versions(user_ids=[current_user.id])
             db.session.commit()
             flash("Habit added successfully!", "success")
             return redirect(url_for("habits.dashboard"))
@@ -1,20 +1,139 @@
-"""API endpoint to update progress from the frontend asynchronously."""
+"""API endpoints to read habits and progress and to update progress from
+the frontend asynchronously."""
 
 from flask import request, jsonify
 from flask_login import login_required, current_user
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import joinedload
 
 from db import db
-from models import Habit, Progress
+from decorators import log_activity
+from models import Habit, HabitStats, Progress
 from habits import habits_bp
+from habits.pagination import (
+    PaginationError,
+    date_filter,
+    decode_cursor,
+    json_response,
+    page,
+    page_size,
+    selected_fields,
+)
+from habits.progress import (
+    commit_progress,
+    record_progress,
+    record_progress_many,
+    stats_deferred,
+)
+
+# Maximum number of updates accepted by the batch endpoint
+MAX_BATCH_SIZE = 1000
+# Columns selectable with the ``fields`` parameter of the read endpoints
+HABIT_FIELDS = {
+    "id": Habit.id,
+    "name": Habit.name,
+    "periodicity": Habit.periodicity,
+    "target_days": Habit.target_days,
+    "created_at": Habit.created_at,
+    "version": Habit.version,
+    "current_streak": HabitStats.current_streak,
+    "longest_streak": HabitStats.longest_streak,
+    "completed_count": HabitStats.completed_count,
+    "last_entry_date": HabitStats.last_entry_date,
+}
+PROGRESS_FIELDS = {
+    "id": Progress.id,
+    "date": Progress.date,
+    "completed": Progress.completed,
+}
+
+
+@habits_bp.route("/api/habits")
+@login_required
+def list_habits():
+    """List the current user's habits, oldest first.
+
+    Accepts ``limit``, ``cursor`` and ``fields`` parameters and pages on
+    ``(created_at, id)`` over the ``(user_id, created_at)`` index. The
+    statistics are only joined when a statistics field is selected.
+
+    Returns JSON with the ``items`` of the page and the ``next_cursor``.
+    """
+    try:
+        limit = page_size()
+        fields = selected_fields(list(HABIT_FIELDS))
+        cursor = request.args.get("cursor")
+        after = decode_cursor(cursor, datetime) if cursor else None
+    except PaginationError as error:
+        return json_response({"success": False, "error": str(error)}, 400)
+
+    columns = [HABIT_FIELDS[field].label(field) for field in fields]
+    query = select(*columns, Habit.id.label("_id"), Habit.created_at.label("_key"))
+    if any(HABIT_FIELDS[field].class_ is HabitStats for field in fields):
+        query = query.outerjoin(HabitStats, HabitStats.habit_id == Habit.id)
+    query = query.where(Habit.user_id == current_user.id)
+    if after is not None:
+        query = query.where(tuple_(Habit.created_at, Habit.id) > after)
+    query = query.order_by(Habit.created_at, Habit.id).limit(limit + 1)
+
+    rows = db.session.execute(query).all()
+    return json_response(page(rows, fields, limit, "_key", "_id"))
+
+
+@habits_bp.route("/api/habits/<int:habit_id>/progress")
+@login_required
+def list_progress(habit_id):
+    """List the progress of a habit in date order.
+
+    Accepts ``limit``, ``cursor``, ``fields``, ``from`` and ``to``
+    parameters; the date range and the ``(date, id)`` keyset are served by
+    the ``(habit_id, date)`` index.
+
+    Returns JSON with the ``items`` of the page and the ``next_cursor``.
+    """
+    owner = db.session.execute(
+        select(Habit.user_id).where(Habit.id == habit_id)
+    ).scalar_one_or_none()
+    if owner is None:
+        return json_response({"success": False, "error": "Habit not found"}, 404)
+    if owner != current_user.id:
+        return json_response({"success": False, "error": "Permission denied"}, 403)
+
+    try:
+        limit = page_size()
+        fields = selected_fields(list(PROGRESS_FIELDS))
+        start = date_filter("from")
+        end = date_filter("to")
+        cursor = request.args.get("cursor")
+        after = decode_cursor(cursor, date) if cursor else None
+    except PaginationError as error:
+        return json_response({"success": False, "error": str(error)}, 400)
+
+    columns = [PROGRESS_FIELDS[field].label(field) for field in fields]
+    query = select(
+        *columns, Progress.id.label("_id"), Progress.date.label("_key")
+    ).where(Progress.habit_id == habit_id)
+    if start is not None:
+        query = query.where(Progress.date >= start)
+    if end is not None:
+        query = query.where(Progress.date <= end)
+    if after is not None:
+        query = query.where(tuple_(Progress.date, Progress.id) > after)
+    query = query.order_by(Progress.date, Progress.id).limit(limit + 1)
+
+    rows = db.session.execute(query).all()
+    return json_response(page(rows, fields, limit, "_key", "_id"))
 
 
 @habits_bp.route("/api/progress", methods=["POST"])
 @login_required
+@log_activity
 def update_progress():
     """Receive progress updates for a habit via AJAX.
 
-    Returns JSON indicating updated streak and completion stats.
+    Returns JSON indicating updated streak and completion stats, or only
+    that they are pending when statistics are rebuilt in the background.
     """
     data = request.get_json()
     habit = Habit.query.get_or_404(data["habit_id"])
@@ -29,16 +148,10 @@ def update_progress():
     if date < start_date or date > end_date:
         return jsonify({"success": False, "error": "Date outside habit period"}), 400
 
-    progress = Progress.query.filter_by(habit_id=habit.id, date=date).first()
-
-    if not progress:
-        progress = Progress(habit_id=habit.id, date=date, completed=data["completed"])
-        db.session.add(progress)
-    else:
-        progress.completed = data["completed"]
-
-    db.session.commit()
+    commit_progress(lambda: record_progress(habit, date, bool(data["completed"])))
 
+    if stats_deferred():
+        return jsonify({"success": True, "stats_pending": True})
     return jsonify(
         {
             "success": True,
@@ -46,3 +159,119 @@ def update_progress():
             "completion_rate": habit.completion_rate(),
         }
     )
+
+
+@habits_bp.route("/api/progress/batch", methods=["POST"])
+@login_required
+@log_activity
+def update_progress_batch():
+    """Receive many progress updates across habits in one request.
+
+    Expects ``{"updates": [{"habit_id", "date", "completed"}, ...]}``. All
+    updates are validated before anything is written, then stored in a
+    single transaction. Later updates for the same habit and day win.
+
+    Returns JSON with the updated streak and completion stats of every
+    affected habit (only their IDs when statistics are rebuilt in the
+    background), or the per-update errors if validation failed.
+    """
+    data = request.get_json(silent=True) or {}
+    updates = data.get("updates")
+    if not isinstance(updates, list) or not updates:
+        return jsonify({"success": False, "error": "No updates given"}), 400
+    if len(updates) > MAX_BATCH_SIZE:
+        return (
+            jsonify(
+                {"success": False, "error": f"At most {MAX_BATCH_SIZE} updates allowed"}
+            ),
+            400,
+        )
+
+    habit_ids = {
+        update["habit_id"]
+        for update in updates
+        if isinstance(update, dict) and _is_habit_id(update.get("habit_id"))
+    }
+    habits = {
+        habit.id: habit
+        for habit in Habit.query.options(joinedload(Habit.stats))
+        .filter(Habit.id.in_(habit_ids))
+        .all()
+    }
+
+    entries = {}
+    errors = []
+    for index, update in enumerate(updates):
+        error, entry = _validate_update(update, habits)
+        if error:
+            errors.append({"index": index, "error": error})
+        else:
+            entries[(entry["habit_id"], entry["date"])] = entry
+
+    if errors:
+        return jsonify({"success": False, "errors": errors}), 400
+
+    def record():
+        affected = record_progress_many(list(entries.values()))
+        if stats_deferred():
+            return affected, None
+        # Read the refreshed stats before the commit expires them
+        results = [
+            {
+                "habit_id": habit_id,
+                "streak": habits[habit_id].current_streak(),
+                "completion_rate": habits[habit_id].completion_rate(),
+            }
+            for habit_id in affected
+        ]
+        return affected, results
+
+    affected, results = commit_progress(record)
+    if results is None:
+        return jsonify({"success": True, "habit_ids": affected, "stats_pending": True})
+    return jsonify({"success": True, "habits": results})
+
+
+def _is_habit_id(value):
+    """Return whether a JSON value can be a habit ID.
+
+    Booleans are integers in Python, but not IDs.
+    """
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _validate_update(update, habits):
+    """Validate one update of a batch against the preloaded habits.
+
+    Args:
+        update: Update payload from the request
+        habits (dict): Habits referenced by the batch, keyed by ID
+
+    Returns:
+        tuple: Error message or None, and the progress entry if valid
+    """
+    if not isinstance(update, dict):
+        return "Invalid update", None
+
+    habit_id = update.get("habit_id")
+    habit = habits.get(habit_id) if _is_habit_id(habit_id) else None
+    if habit is None:
+        return "Habit not found", None
+    if habit.user_id != current_user.id:
+        return "Permission denied", None
+
+    try:
+        date = datetime.strptime(update["date"], "%Y-%m-%d").date()
+    except (KeyError, TypeError, ValueError):
+        return "Invalid date", None
+
+    start_date = habit.created_at.date()
+    end_date = start_date + timedelta(days=habit.target_days - 1)
+    if date < start_date or date > end_date:
+        return "Date outside habit period", None
+
+    completed = update.get("completed")
+    if not isinstance(completed, bool):
+        return "Invalid completed", None
+
+    return None, {"habit_id": habit.id, "date": date, "completed": completed}
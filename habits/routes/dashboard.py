@@ -1,17 +1,93 @@
 """Route to render the user's dashboard showing all habits."""
 
-from flask import render_template
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from flask import make_response, render_template
+from markupsafe import Markup
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
+
 from habits import habits_bp
+from habits.fragments import cached_fragment
+from habits.versions import dashboard_validators, not_modified, set_validators
+from habits.write_buffer import get_write_buffer, overlay_stats
+from models import Habit, completion_percentage
+
+
+def load_dashboard_habits(user_id: int) -> List[Habit]:
+    """Load all habits of a user together with their statistics.
+
+    The materialized statistics are joined into the habits query, so the
+    dashboard costs a constant number of queries no matter how many habits
+    the user has.
+
+    Args:
+        user_id: ID of the owning user
+
+    Returns:
+        List[Habit]: User's habits ordered by creation
+    """
+    return (
+        Habit.query.filter_by(user_id=user_id)
+        .options(joinedload(Habit.stats))
+        .order_by(Habit.id)
+        .all()
+    )
+
+
+def render_habit_card(habit: Habit, stats: Optional[Dict] = None) -> str:
+    """Render the dashboard card of a habit.
+
+    Args:
+        habit: Habit with its statistics loaded
+        stats: Statistics to show instead of the stored ones, e.g. with
+            pending writes applied
+
+    Returns:
+        str: Card HTML
+    """
+    # Precompute values for display in template
+    if stats is None:
+        habit.current_streak_value = habit.current_streak()
+        habit.completion_rate_value = habit.completion_rate()
+    else:
+        habit.current_streak_value = stats["current_streak"]
+        habit.completion_rate_value = completion_percentage(
+            stats["completed_count"], habit.created_at, habit.target_days
+        )
+    return render_template("_habit_card.html", habit=habit)
 
 
 @habits_bp.route("/")
 @login_required
 def dashboard():
-    """Render dashboard with all habits and their statistics."""
-    habits = current_user.habits
-    for habit in habits:
-        # Precompute values for display in template
-        habit.current_streak_value = habit.current_streak()
-        habit.completion_rate_value = habit.completion_rate()
-    return render_template("dashboard.html", habits=habits)
+    """Render dashboard with all habits and their statistics.
+
+    Answers ``304 Not Modified`` when the user's habits did not change since
+    the cached copy. Otherwise only the cards of habits written since they
+    were last rendered are rendered again. Cards of habits with buffered
+    writes show the writes and are neither cached nor validated.
+    """
+    buffer = get_write_buffer()
+    writes = buffer.pending(current_user.id) if buffer is not None else {}
+    validators = dashboard_validators(current_user.id)
+    if not writes:
+        cached = not_modified(validators)
+        if cached is not None:
+            return cached
+
+    today = datetime.utcnow().date()
+    cards = []
+    for habit in load_dashboard_habits(current_user.id):
+        if habit.id in writes:
+            card = render_habit_card(habit, overlay_stats(habit, writes[habit.id]))
+        else:
+            card = cached_fragment(
+                "card", habit, today, lambda: render_habit_card(habit)
+            )
+        cards.append(Markup(card))
+    response = make_response(render_template("dashboard.html", cards=cards))
+    if writes:
+        return response
+    return set_validators(response, validators)
@@ -3,12 +3,17 @@
 from flask import redirect, url_for, flash, abort, current_app
 from flask_login import login_required, current_user
 from db import db
+from decorators import log_activity
 from models import Habit
 from habits import habits_bp
+from habits.fragments import invalidate_fragments
+from habits.rollups import remove_habit_rollups
+from habits.versions import bump_versions
 
 
 @habits_bp.route("/<int:habit_id>/delete", methods=["POST"])
 @login_required
+@log_activity
 def delete_habit(habit_id):
     """Allow user to delete one of their habits.
 
@@ -23,7 +28,10 @@ def delete_habit(habit_id):
         abort(403)
 
     try:
+        remove_habit_rollups(habit)
         db.session.delete(habit)
+        bump_versions(user_ids=[current_user.id])
+        invalidate_fragments([habit_id])
         db.session.commit()
         flash("Habit deleted successfully.", "success")
     except Exception as e:
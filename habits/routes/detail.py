@@ -1,12 +1,147 @@
 """Detailed route to visualize habit progress including a graph."""
 
-from flask import render_template
+from flask import abort, make_response, render_template
+from markupsafe import Markup
 from flask_login import login_required
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Sequence, Tuple
 import json
 
+from sqlalchemy.orm import joinedload
+
+from bitmap import ProgressBitmap
+from db import db
 from habits import habits_bp
+from habits.fragments import cached_fragment
+from habits.versions import habit_validators, not_modified, set_validators
 from models import Habit, Progress
+from streaks import StreakIndex, cached_streak_index
+
+# Number of latest streaks listed on the detail page
+STREAK_HISTORY_LENGTH = 5
+
+
+def build_chart_series(
+    start_date: date, total_days: int, progress_data: Sequence[Progress]
+) -> Tuple[List[str], List[int], int]:
+    """Build the daily chart series in a single pass over sorted progress.
+
+    Args:
+        start_date: First day of the chart
+        total_days: Number of days to chart
+        progress_data: Progress entries within the range, sorted by date
+
+    Returns:
+        Tuple[List[str], List[int], int]: Day labels, 1/0 completion values
+            and the number of completed days
+    """
+    labels = []
+    data = []
+    completed_count = 0
+    entries = iter(progress_data)
+    entry = next(entries, None)
+
+    for day_offset in range(total_days):
+        current_date = start_date + timedelta(days=day_offset)
+        labels.append(current_date.isoformat())
+
+        # Skip entries that fall before the current day
+        while entry is not None and entry.date < current_date:
+            entry = next(entries, None)
+
+        if entry is not None and entry.date == current_date and entry.completed:
+            data.append(1)
+            completed_count += 1
+        else:
+            data.append(0)
+
+    return labels, data, completed_count
+
+
+def build_bitmap_series(
+    bitmap: ProgressBitmap, start_date: date, total_days: int
+) -> Tuple[List[str], List[int], int]:
+    """Build the daily chart series from a progress bitmap.
+
+    Args:
+        bitmap: Progress history as bit arrays
+        start_date: First day of the chart
+        total_days: Number of days to chart
+
+    Returns:
+        Tuple[List[str], List[int], int]: Day labels, 1/0 completion values
+            and the number of completed days
+    """
+    labels = [
+        (start_date + timedelta(days=day_offset)).isoformat()
+        for day_offset in range(total_days)
+    ]
+    data = bitmap.series(start_date, total_days)
+    end_date = start_date + timedelta(days=total_days - 1)
+    return labels, data, bitmap.count(start_date, end_date)
+
+
+def build_chart_payload(
+    habit: Habit, start_date: date, total_days: int
+) -> Tuple[str, str, int]:
+    """Build the serialized chart series of a habit.
+
+    Reads the stored progress bitmap, or the progress table for habits
+    without one.
+
+    Args:
+        habit: Habit with its statistics loaded
+        start_date: First day of the chart
+        total_days: Number of days to chart
+
+    Returns:
+        Tuple[str, str, int]: JSON day labels, JSON 1/0 completion values
+            and the number of completed days
+    """
+    end_date = start_date + timedelta(days=total_days - 1)
+    bitmap = habit.stats.bitmap() if habit.stats is not None else None
+    if bitmap is not None:
+        chart_labels, chart_data, completed_count = build_bitmap_series(
+            bitmap, start_date, total_days
+        )
+    else:
+        progress_data = (
+            Progress.query.filter(
+                Progress.habit_id == habit.id,
+                Progress.date >= start_date,
+                Progress.date <= end_date,
+            )
+            .order_by(Progress.date)
+            .all()
+        )
+        chart_labels, chart_data, completed_count = build_chart_series(
+            start_date, total_days, progress_data
+        )
+    return json.dumps(chart_labels), json.dumps(chart_data), completed_count
+
+
+def build_streak_summary(habit: Habit) -> Dict:
+    """Build the streak statistics of a daily habit.
+
+    The cached streak index of the stored progress bitmap is used, or built
+    in one pass over the bitmap; without a stored bitmap the index is built
+    from the habit's progress rows.
+
+    Args:
+        habit: Habit with its statistics loaded
+
+    Returns:
+        Dict: Streak statistics and latest streaks
+    """
+    bitmap = habit.stats.bitmap() if habit.stats is not None else None
+    if bitmap is not None:
+        index = cached_streak_index(habit.id, bitmap)
+    else:
+        rows = db.session.query(Progress.date, Progress.completed).filter(
+            Progress.habit_id == habit.id
+        )
+        index = StreakIndex.from_entries(habit.created_at.date(), rows)
+    return index.summary(STREAK_HISTORY_LENGTH)
 
 
 @habits_bp.route("/<int:habit_id>")
@@ -14,44 +149,56 @@ from models import Habit, Progress
 def habit_detail(habit_id):
     """Show detailed view of a habit including calendar progress.
 
-    Returns a chart of streaks and completion values.
+    Returns a chart of streaks and completion values, or ``304 Not
+    Modified`` when the habit did not change since the cached copy.
     """
-    habit = Habit.query.get_or_404(habit_id)
+    validators = habit_validators(habit_id)
+    if validators is None:
+        abort(404)
+    cached = not_modified(validators)
+    if cached is not None:
+        return cached
+
+    habit = Habit.query.options(joinedload(Habit.stats)).get_or_404(habit_id)
     today = datetime.utcnow().date()
     start_date = habit.created_at.date()
     end_date = min(today, start_date + timedelta(days=habit.target_days - 1))
     total_days = (end_date - start_date).days + 1
 
-    progress_data = (
-        Progress.query.filter(
-            Progress.habit_id == habit_id,
-            Progress.date >= start_date,
-            Progress.date <= end_date,
-        )
-        .order_by(Progress.date)
-        .all()
+    chart_labels, chart_data, completed_count = cached_fragment(
+        "chart",
+        habit,
+        today,
+        lambda: build_chart_payload(habit, start_date, total_days),
     )
 
-    chart_labels = []
-    chart_data = []
-    for day_offset in range(total_days):
-        current_date = start_date + timedelta(days=day_offset)
-        chart_labels.append(current_date.strftime("%Y-%m-%d"))
-        progress = next((p for p in progress_data if p.date == current_date), None)
-        chart_data.append(1 if progress and progress.completed else 0)
+    streak_history = None
+    if habit.periodicity == "daily":
+        streak_history = Markup(
+            cached_fragment(
+                "streaks",
+                habit,
+                today,
+                lambda: render_template(
+                    "_streak_history.html", streaks=build_streak_summary(habit)
+                ),
+            )
+        )
 
     current_day = (today - start_date).days + 1
-    completion_rate = round(
-        (len([p for p in progress_data if p.completed]) / total_days) * 100
-    )
+    completion_rate = round((completed_count / total_days) * 100)
 
-    return render_template(
-        "habit_detail.html",
-        habit=habit,
-        chart_labels=json.dumps(chart_labels),
-        chart_data=json.dumps(chart_data),
-        today=today,
-        current_day=current_day,
-        completion_rate=completion_rate,
-        total_days=total_days,
+    response = make_response(
+        render_template(
+            "habit_detail.html",
+            habit=habit,
+            chart_labels=chart_labels,
+            chart_data=chart_data,
+            today=today,
+            current_day=current_day,
+            completion_rate=completion_rate,
+            total_days=total_days,
+            streak_history=streak_history,
+        )
     )
+    return set_validators(response, validators)
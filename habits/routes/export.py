@@ -0,0 +1,55 @@
+"""Routes streaming habit and progress exports."""
+
+from typing import Optional
+
+from flask import Response, abort, request, stream_with_context
+from flask_login import login_required, current_user
+
+from decorators import admin_required
+from habits import habits_bp
+from habits.export import EXPORT_FORMATS, export_stream
+
+
+def _export_response(user_id: Optional[int], name: str) -> Response:
+    """Build a streamed export download from the request arguments.
+
+    Args:
+        user_id: Owner of the exported habits, all users if None
+        name: Base name of the downloaded file
+
+    Returns:
+        Response: Streamed export
+    """
+    output_format = request.args.get("format", "ndjson")
+    if output_format not in EXPORT_FORMATS:
+        abort(400)
+    compress = request.args.get("gzip", "0").lower() in ("1", "true")
+
+    filename = f"{name}.{output_format}"
+    mimetype = EXPORT_FORMATS[output_format]
+    if compress:
+        filename += ".gz"
+        mimetype = "application/gzip"
+    return Response(
+        stream_with_context(export_stream(output_format, user_id, compress)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@habits_bp.route("/export")
+@login_required
+def export_habits():
+    """Stream the current user's habits and progress history.
+
+    Query args: ``format`` ('ndjson' or 'csv') and ``gzip`` ('1' to compress).
+    """
+    return _export_response(current_user.id, "habits")
+
+
+@habits_bp.route("/admin/export")
+@login_required
+@admin_required
+def export_all_habits():
+    """Stream the habits and progress history of all users."""
+    return _export_response(None, "habits-all")
@@ -0,0 +1,49 @@
+"""Route for uploading a progress history to import."""
+
+import gzip
+import io
+
+from flask import jsonify, request
+from flask_login import login_required, current_user
+
+from decorators import log_activity
+from habits import habits_bp
+from habits.importer import (
+    IMPORT_FORMATS,
+    ImportFileError,
+    import_progress,
+    read_records,
+)
+
+
+@habits_bp.route("/import", methods=["POST"])
+@login_required
+@log_activity
+def import_progress_upload():
+    """Import an uploaded CSV or NDJSON progress file into the user's habits.
+
+    The file is sent as the ``file`` form field; its format is taken from
+    the ``format`` field or the file extension, and ``.gz`` files are
+    decompressed. Returns the import report as JSON.
+    """
+    upload = request.files.get("file")
+    if upload is None:
+        return jsonify({"success": False, "error": "No file uploaded"}), 400
+
+    filename = (upload.filename or "").lower()
+    compressed = filename.endswith(".gz")
+    if compressed:
+        filename = filename[:-3]
+    input_format = request.form.get("format") or filename.rsplit(".", 1)[-1]
+    if input_format not in IMPORT_FORMATS:
+        return jsonify({"success": False, "error": "Unsupported file format"}), 400
+
+    raw = gzip.GzipFile(fileobj=upload.stream) if compressed else upload.stream
+    stream = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    try:
+        report = import_progress(
+            read_records(stream, input_format), user_id=current_user.id
+        )
+    except (ImportFileError, OSError, EOFError, UnicodeDecodeError) as error:
+        return jsonify({"success": False, "error": str(error)}), 400
+    return jsonify({"success": True, **report.as_dict()})
@@ -3,16 +3,22 @@
 from flask import redirect, url_for, flash, abort
 from flask_login import login_required, current_user
 from datetime import datetime
-from db import db
-from models import Habit, Progress
+from decorators import log_activity
+from models import Habit
 from habits import habits_bp
+from habits.progress import commit_progress, record_progress
+from habits.write_buffer import get_write_buffer
 
 
 @habits_bp.route("/<int:habit_id>/mark/<completed>", methods=["POST"])
 @login_required
+@log_activity
 def mark_habit(habit_id, completed):
     """Mark or unmark the habit for today as complete.
 
+    With write coalescing enabled the write is buffered and stored by the
+    flusher, so rapid toggles of the same day collapse into one write.
+
     Args:
         habit_id (int): Habit to update.
         completed (str): 'true' or 'false' string from URL.
@@ -25,16 +31,10 @@ def mark_habit(habit_id, completed):
         abort(403)
 
     today = datetime.utcnow().date()
-    progress = Progress.query.filter_by(habit_id=habit.id, date=today).first()
-
-    is_completed = completed == "true"
-
-    if not progress:
-        progress = Progress(habit_id=habit.id, date=today, completed=is_completed)
-        db.session.add(progress)
+    buffer = get_write_buffer()
+    if buffer is not None:
+        buffer.add(habit.id, habit.user_id, today, completed == "true")
     else:
-        progress.completed = is_completed
-
-    db.session.commit()
+        commit_progress(lambda: record_progress(habit, today, completed == "true"))
     flash("Habit status updated!", "success")
     return redirect(url_for("habits.dashboard"))
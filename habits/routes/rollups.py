@@ -0,0 +1,81 @@
+"""Admin analytics endpoints answered from the daily rollups."""
+
+from datetime import datetime, timedelta
+
+from flask import request
+from flask_login import login_required
+
+from decorators import admin_required
+from habits import habits_bp
+from habits.pagination import PaginationError, date_filter, json_response
+from habits.rollups import BREAKDOWNS, daily_totals, rollup_breakdown
+
+# Days covered when the client gives no ``from`` date
+DEFAULT_RANGE_DAYS = 30
+# Longest day range a client may request
+MAX_RANGE_DAYS = 3660
+
+
+def _day_range():
+    """Read the ``from`` and ``to`` query parameters.
+
+    Returns:
+        tuple: First and last day, the last ``DEFAULT_RANGE_DAYS`` days by
+            default
+
+    Raises:
+        PaginationError: If a date is malformed or the range is invalid
+    """
+    end = date_filter("to") or datetime.utcnow().date()
+    start = date_filter("from") or end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start > end:
+        raise PaginationError("from must not be after to")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise PaginationError(f"The range must not exceed {MAX_RANGE_DAYS} days")
+    return start, end
+
+
+@habits_bp.route("/admin/analytics/daily")
+@login_required
+@admin_required
+def rollup_daily():
+    """Report active users, entries, completions and completion rate per day.
+
+    Accepts ``from`` and ``to`` dates; returns JSON with the ``days``.
+    """
+    try:
+        start, end = _day_range()
+    except PaginationError as error:
+        return json_response({"success": False, "error": str(error)}, 400)
+    days = daily_totals(start, end)
+    for day in days:
+        day["day"] = day["day"].isoformat()
+    return json_response(
+        {"from": start.isoformat(), "to": end.isoformat(), "days": days}
+    )
+
+
+@habits_bp.route("/admin/analytics/breakdown")
+@login_required
+@admin_required
+def rollup_breakdown_view():
+    """Report completion rates per periodicity or ``target_days`` bucket.
+
+    Accepts ``from`` and ``to`` dates and ``by`` ('periodicity' or
+    'target_bucket'); returns JSON with the ``groups``.
+    """
+    by = request.args.get("by", "periodicity")
+    try:
+        if by not in BREAKDOWNS:
+            raise PaginationError(f"by must be one of {', '.join(BREAKDOWNS)}")
+        start, end = _day_range()
+    except PaginationError as error:
+        return json_response({"success": False, "error": str(error)}, 400)
+    return json_response(
+        {
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "by": by,
+            "groups": rollup_breakdown(start, end, by),
+        }
+    )
@@ -0,0 +1,31 @@
+"""Delta sync endpoint for offline clients."""
+
+from flask_login import current_user, login_required
+
+from habits import habits_bp
+from habits.pagination import PaginationError, int_param, json_response
+from habits.sync import DEFAULT_SYNC_LIMIT, MAX_SYNC_LIMIT, sync_changes, sync_snapshot
+
+
+@habits_bp.route("/api/sync")
+@login_required
+def sync():
+    """Return the current user's changes after the client's version.
+
+    Accepts ``since``, the version returned by the previous sync, and
+    ``limit``, the number of changes read per page. Without ``since`` or
+    with ``since=0`` all habits and progress are returned. Clients repeat
+    the request with the returned ``version`` while ``more`` is true.
+    """
+    try:
+        since = int_param("since", 0)
+        limit = int_param("limit", DEFAULT_SYNC_LIMIT)
+        if since < 0:
+            raise PaginationError("since must be a non-negative version")
+        if not 1 <= limit <= MAX_SYNC_LIMIT:
+            raise PaginationError(f"limit must be between 1 and {MAX_SYNC_LIMIT}")
+    except PaginationError as error:
+        return json_response({"success": False, "error": str(error)}, 400)
+    if not since:
+        return json_response(sync_snapshot(current_user.id))
+    return json_response(sync_changes(current_user.id, since, limit))
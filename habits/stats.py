@@ -0,0 +1,286 @@
+"""Maintenance of the materialized habit statistics.
+
+``HabitStats`` rows are updated incrementally whenever a progress entry is
+written, or rebuilt by a background job when ``STATS_MODE`` is 'deferred',
+and can be rebuilt from the full progress history for backfills and
+consistency checks. Alongside the counters every row stores the habit's
+progress bitmap, from which the statistics are derived with bit operations.
+"""
+
+from datetime import date as date_type, timedelta
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import joinedload
+
+from bitmap import ProgressBitmap
+from db import db
+from habits.versions import bump_versions
+from jobs import enqueue, job_handler
+from models import (
+    Habit,
+    HabitStats,
+    Progress,
+    streak_calculator,
+    week_index,
+    week_monday,
+)
+
+
+def _completed_weeks_before(bitmap: ProgressBitmap, week: int) -> int:
+    """Count the consecutive completed weeks ending just before a week."""
+    count = 0
+    monday = week_monday(week - 1)
+    while bitmap.count(monday, monday + timedelta(days=6)):
+        count += 1
+        monday -= timedelta(weeks=1)
+    return count
+
+
+def bitmap_stats(periodicity: str, bitmap: ProgressBitmap) -> Dict:
+    """Compute habit statistics from a progress bitmap.
+
+    Args:
+        periodicity: 'daily' or 'weekly'
+        bitmap: Progress history as bit arrays
+
+    Returns:
+        Dict: HabitStats column values derived from the history
+    """
+    calculator = streak_calculator(periodicity)
+    recorded_bits, completed_bits = bitmap.to_bytes()
+    last_entry_date = bitmap.last_entry_date()
+    weeks_before_latest = None
+    if periodicity == "weekly" and last_entry_date is not None:
+        weeks_before_latest = _completed_weeks_before(
+            bitmap, week_index(last_entry_date)
+        )
+    return {
+        "current_streak": calculator.calculate_bitmap(bitmap),
+        "longest_streak": calculator.longest_bitmap(bitmap),
+        "completed_count": bitmap.count(),
+        "last_completed_date": bitmap.last_completed_date(),
+        "last_entry_date": last_entry_date,
+        "weeks_before_latest": weeks_before_latest,
+        "bits_origin": bitmap.origin,
+        "recorded_bits": recorded_bits,
+        "completed_bits": completed_bits,
+    }
+
+
+def compute_stats(habit: Habit, entries: Iterable[Progress]) -> Dict:
+    """Compute habit statistics from its progress entries.
+
+    Args:
+        habit: Habit the entries belong to
+        entries: Progress entries (or rows with ``date`` and ``completed``)
+
+    Returns:
+        Dict: HabitStats column values derived from the history
+    """
+    bitmap = ProgressBitmap.from_entries(habit.created_at.date(), entries)
+    return bitmap_stats(habit.periodicity, bitmap)
+
+
+def _assign(habit: Habit, values: Dict) -> HabitStats:
+    """Store computed statistics on a habit, creating the row if needed.
+
+    Args:
+        habit: Habit to update
+        values: HabitStats column values
+
+    Returns:
+        HabitStats: Updated statistics
+    """
+    if habit.stats is None:
+        habit.stats = HabitStats(**values)
+    else:
+        for field, value in values.items():
+            setattr(habit.stats, field, value)
+    return habit.stats
+
+
+def refresh_stats(habit: Habit) -> HabitStats:
+    """Recompute the statistics of a habit from its stored progress.
+
+    Only the ``date`` and ``completed`` columns are loaded, without building
+    Progress objects.
+
+    Args:
+        habit: Habit to refresh
+
+    Returns:
+        HabitStats: Updated statistics
+    """
+    rows = (
+        db.session.query(Progress.date, Progress.completed)
+        .filter(Progress.habit_id == habit.id)
+        .all()
+    )
+    return _assign(habit, compute_stats(habit, rows))
+
+
+def _appended_weekly_streak(
+    stats: HabitStats, bitmap: ProgressBitmap, date: date_type, completed: bool
+) -> Tuple[int, int]:
+    """Return the weekly streak and the weeks before it after a new latest entry.
+
+    The stored streak is the run of completed weeks ending at the week of
+    the previous latest entry, and ``weeks_before_latest`` the run ending
+    just before that week, so both follow in O(1). The first completion of
+    an already recorded latest week joins that week to the run before it.
+    Statistics stored without ``weeks_before_latest`` count that run on the
+    bitmap instead.
+
+    Args:
+        stats: Statistics before the write
+        bitmap: Progress bitmap including the write
+        date: Day of the new entry
+        completed: Whether the habit was completed that day
+
+    Returns:
+        Tuple[int, int]: Current weekly streak and completed weeks before
+            the week of the entry
+    """
+    week = week_index(date)
+    latest = week_index(stats.last_entry_date) if stats.last_entry_date else None
+    if latest == week:
+        before = stats.weeks_before_latest
+        if before is None:
+            before = _completed_weeks_before(bitmap, week)
+        if stats.current_streak or not completed:
+            return stats.current_streak, before
+        return 1 + before, before
+    before = stats.current_streak if latest == week - 1 else 0
+    return before + 1 if completed else 0, before
+
+
+def update_stats(
+    habit: Habit,
+    date: date_type,
+    previous: Optional[bool],
+    completed: bool,
+) -> HabitStats:
+    """Apply a single progress write to the statistics of a habit.
+
+    The write is applied to the stored progress bitmap. Appending a new
+    latest entry updates the counters in O(1); other writes, such as
+    backdated entries or toggling an existing day, recompute them from the
+    bitmap. Statistics without a stored bitmap are refreshed from
+    the progress table.
+
+    Args:
+        habit: Habit whose progress was written
+        date: Day of the written entry
+        previous: Completion state before the write, None for a new entry
+        completed: Completion state after the write
+
+    Returns:
+        HabitStats: Updated statistics
+    """
+    stats = habit.stats
+    if stats is None:
+        return refresh_stats(habit)
+    if previous is not None and previous == completed:
+        return stats
+
+    bitmap = stats.bitmap()
+    if bitmap is None:
+        if stats.last_entry_date is not None:
+            return refresh_stats(habit)
+        bitmap = ProgressBitmap(habit.created_at.date())
+    bitmap.set(date, completed)
+
+    appends = previous is None and (
+        stats.last_entry_date is None or date > stats.last_entry_date
+    )
+    if not appends:
+        return _assign(habit, bitmap_stats(habit.periodicity, bitmap))
+
+    stats.store_bitmap(bitmap)
+    if habit.periodicity == "daily":
+        stats.current_streak = stats.current_streak + 1 if completed else 0
+    else:
+        stats.current_streak, stats.weeks_before_latest = _appended_weekly_streak(
+            stats, bitmap, date, completed
+        )
+    stats.longest_streak = max(stats.longest_streak, stats.current_streak)
+    stats.last_entry_date = date
+    if completed:
+        stats.completed_count += 1
+        stats.last_completed_date = date
+    return stats
+
+
+def rebuild_stats(
+    habit_ids: Optional[List[int]] = None, dry_run: bool = False
+) -> List[int]:
+    """Rebuild the statistics of habits from their full progress history.
+
+    Progress is streamed in a single ordered query and grouped per habit.
+    The caller is responsible for committing.
+
+    Args:
+        habit_ids: Habits to rebuild, all habits if None
+        dry_run: Only report habits with outdated statistics
+
+    Returns:
+        List[int]: IDs of habits whose statistics were missing or outdated
+    """
+    habits_query = Habit.query.options(joinedload(Habit.stats)).order_by(Habit.id)
+    progress_query = db.session.query(
+        Progress.habit_id, Progress.date, Progress.completed
+    ).order_by(Progress.habit_id, Progress.date)
+    if habit_ids is not None:
+        habits_query = habits_query.filter(Habit.id.in_(habit_ids))
+        progress_query = progress_query.filter(Progress.habit_id.in_(habit_ids))
+
+    groups = groupby(progress_query.yield_per(1000), key=lambda row: row.habit_id)
+    group = next(groups, None)
+
+    outdated = []
+    for habit in habits_query.all():
+        # Both queries are ordered by habit, so walk them side by side
+        while group is not None and group[0] < habit.id:
+            group = next(groups, None)
+        rows = list(group[1]) if group is not None and group[0] == habit.id else []
+
+        values = compute_stats(habit, rows)
+        stats = habit.stats
+        if stats is not None and all(
+            getattr(stats, field) == value for field, value in values.items()
+        ):
+            continue
+
+        outdated.append(habit.id)
+        if not dry_run:
+            _assign(habit, values)
+    return outdated
+
+
+def refresh_stats_later(habit_ids: Iterable[int]) -> None:
+    """Queue statistics rebuilds of habits, one deduplicated job per habit.
+
+    The caller is responsible for committing.
+
+    Args:
+        habit_ids: Habits whose progress was written
+    """
+    for habit_id in habit_ids:
+        enqueue("refresh_stats", {"habit_id": habit_id}, dedup_key=f"stats:{habit_id}")
+
+
+@job_handler("refresh_stats")
+def refresh_stats_job(payload: Dict) -> None:
+    """Rebuild the statistics of a habit queued by ``refresh_stats_later``.
+
+    The habit's version is bumped again, so pages rendered from the
+    outdated statistics are not served from caches.
+
+    Args:
+        payload: ``habit_id`` of the habit
+    """
+    habit_ids = [payload["habit_id"]]
+    rebuild_stats(habit_ids)
+    bump_versions(habit_ids)
+    db.session.commit()
@@ -0,0 +1,306 @@
+"""Change log and delta sync for offline clients.
+
+Every insert, update and delete of a habit and every progress write appends
+a ``ChangeLog`` row owned by the habit's user. Habit changes are logged by
+mapper events, so no write path can miss them; progress is written with
+Core upserts and logged by the progress write helpers and the importer.
+Deleting a habit logs one tombstone that stands for the habit and all its
+progress.
+
+Changes are versioned per user from a ``SyncVersion`` counter row that the
+logging transaction advances and keeps locked until it commits. Writers to
+the same user's records therefore commit their versions in order, and a
+client never skips a change that commits after a later version was read.
+
+A client first downloads a snapshot with ``since=0`` and then asks for the
+changes after the version it has applied. Changes to the same record are
+collapsed to the latest one, and a nightly job deletes log rows that later
+changes have superseded, so the log grows with the number of records
+rather than the number of writes.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import event, exists, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import aliased
+
+from db import db
+from jobs import enqueue_daily, job_handler, on_worker_start
+from models import ChangeLog, Habit, Progress, SyncVersion
+
+HABIT = "habit"
+PROGRESS = "progress"
+# Habit columns sent to clients, in their order in the payload
+SYNC_HABIT_COLUMNS = ("id", "name", "periodicity", "target_days", "created_at")
+# Number of changes read per page when the client does not ask for a limit
+DEFAULT_SYNC_LIMIT = 1000
+# Largest number of changes a client may request per page
+MAX_SYNC_LIMIT = 5000
+
+# Dialects whose INSERT supports ``ON CONFLICT ... DO UPDATE``
+_UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def reserve_versions(connection, user_id: int, count: int) -> int:
+    """Advance a user's change version by a number of changes.
+
+    The user's ``SyncVersion`` row stays locked until the transaction ends.
+
+    Args:
+        connection: Connection of the logging transaction
+        user_id: Owner of the changed records
+        count: Number of changes to number
+
+    Returns:
+        int: First of the ``count`` reserved versions
+    """
+    table = SyncVersion.__table__
+    insert = _UPSERT_INSERTS.get(connection.dialect.name)
+    if insert is not None:
+        stmt = insert(table).values(user_id=user_id, version=count)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={"version": table.c.version + stmt.excluded.version},
+        )
+        connection.execute(stmt)
+    else:
+        updated = connection.execute(
+            table.update()
+            .where(table.c.user_id == user_id)
+            .values(version=table.c.version + count)
+        ).rowcount
+        if not updated:
+            connection.execute(table.insert().values(user_id=user_id, version=count))
+    latest = connection.execute(
+        select(table.c.version).where(table.c.user_id == user_id)
+    ).scalar()
+    return latest - count + 1
+
+
+def log_progress_changes(
+    writes: Iterable[Tuple], owners: Optional[Dict[int, int]] = None
+) -> None:
+    """Log progress writes.
+
+    The caller is responsible for committing.
+
+    Args:
+        writes: ``(habit_id, day, completed)`` tuples
+        owners: Owner per habit ID, loaded if not given
+    """
+    rows = [
+        {"entity": PROGRESS, "habit_id": habit_id, "day": day, "completed": completed}
+        for habit_id, day, completed in writes
+    ]
+    if not rows:
+        return
+    if owners is None:
+        habit_ids = {row["habit_id"] for row in rows}
+        owners = dict(
+            db.session.query(Habit.id, Habit.user_id).filter(Habit.id.in_(habit_ids))
+        )
+    by_user: Dict[int, List[Dict]] = {}
+    for row in rows:
+        row["user_id"] = owners[row["habit_id"]]
+        by_user.setdefault(row["user_id"], []).append(row)
+    connection = db.session.connection()
+    # Counter rows are locked in user order, so writers cannot deadlock
+    for user_id in sorted(by_user):
+        first = reserve_versions(connection, user_id, len(by_user[user_id]))
+        for version, row in enumerate(by_user[user_id], start=first):
+            row["version"] = version
+    db.session.execute(ChangeLog.__table__.insert(), rows)
+
+
+def _log_habit(connection, habit: Habit, deleted: bool = False) -> None:
+    """Log a habit change within a flush."""
+    connection.execute(
+        ChangeLog.__table__.insert().values(
+            user_id=habit.user_id,
+            version=reserve_versions(connection, habit.user_id, 1),
+            entity=HABIT,
+            habit_id=habit.id,
+            deleted=deleted,
+        )
+    )
+
+
+@event.listens_for(Habit, "after_insert")
+def _habit_inserted(mapper, connection, target: Habit) -> None:
+    """Log a created habit."""
+    _log_habit(connection, target)
+
+
+@event.listens_for(Habit, "after_update")
+def _habit_updated(mapper, connection, target: Habit) -> None:
+    """Log a habit whose synced columns changed."""
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in SYNC_HABIT_COLUMNS):
+        _log_habit(connection, target)
+
+
+@event.listens_for(Habit, "after_delete")
+def _habit_deleted(mapper, connection, target: Habit) -> None:
+    """Log the tombstone of a deleted habit."""
+    _log_habit(connection, target, deleted=True)
+
+
+def _habit_rows(user_id: int, habit_ids: Optional[Iterable[int]] = None) -> List:
+    """Encode a user's habits as rows of ``SYNC_HABIT_COLUMNS``."""
+    query = db.session.query(
+        *(getattr(Habit, name) for name in SYNC_HABIT_COLUMNS)
+    ).filter(Habit.user_id == user_id)
+    if habit_ids is not None:
+        query = query.filter(Habit.id.in_(list(habit_ids)))
+    return [
+        [row.id, row.name, row.periodicity, row.target_days, row.created_at.isoformat()]
+        for row in query.order_by(Habit.id)
+    ]
+
+
+def sync_snapshot(user_id: int) -> Dict:
+    """Encode all of a user's habits and progress.
+
+    Args:
+        user_id: Owner of the habits
+
+    Returns:
+        Dict: ``version``, ``habits`` and ``progress``; see ``sync_changes``
+    """
+    version = db.session.query(SyncVersion.version).filter_by(user_id=user_id).scalar()
+    progress = (
+        db.session.query(Progress.habit_id, Progress.date, Progress.completed)
+        .join(Habit, Habit.id == Progress.habit_id)
+        .filter(Habit.user_id == user_id)
+        .order_by(Progress.habit_id, Progress.date)
+    )
+    return {
+        "version": version or 0,
+        "more": False,
+        "deleted": [],
+        "habits": _habit_rows(user_id),
+        "progress": [
+            [habit_id, day.isoformat(), int(bool(completed))]
+            for habit_id, day, completed in progress
+        ],
+    }
+
+
+def sync_changes(user_id: int, since: int, limit: int = DEFAULT_SYNC_LIMIT) -> Dict:
+    """Encode the changes to a user's records after a version.
+
+    Up to ``limit`` log rows are read over the ``(user_id, version)`` index and
+    collapsed to the latest change per record. Clients drop the habits in
+    ``deleted`` with their progress first and then store ``habits`` and
+    ``progress``.
+
+    Args:
+        user_id: Owner of the habits
+        since: Latest version the client has applied
+        limit: Number of log rows read
+
+    Returns:
+        Dict: ``version`` to ask from next, ``more`` if further changes are
+            waiting, IDs of ``deleted`` habits, ``habits`` as rows of
+            ``SYNC_HABIT_COLUMNS`` and ``progress`` as
+            ``[habit_id, ISO date, 0 or 1]`` rows
+    """
+    changes = (
+        db.session.query(ChangeLog)
+        .filter(ChangeLog.user_id == user_id, ChangeLog.version > since)
+        .order_by(ChangeLog.version)
+        .limit(limit + 1)
+        .all()
+    )
+    more = len(changes) > limit
+    changes = changes[:limit]
+
+    deleted: Dict[int, int] = {}
+    habits: Dict[int, int] = {}
+    progress: Dict[Tuple[int, object], Tuple[int, bool]] = {}
+    for change in changes:
+        if change.entity == HABIT and change.deleted:
+            deleted[change.habit_id] = change.version
+        elif change.entity == HABIT:
+            habits[change.habit_id] = change.version
+        else:
+            progress[(change.habit_id, change.day)] = (change.version, change.completed)
+
+    def current(habit_id: int, version: int) -> bool:
+        # Changes logged before the habit's latest deletion are void
+        return version > deleted.get(habit_id, 0)
+
+    upserted = [
+        habit_id for habit_id, version in habits.items() if current(habit_id, version)
+    ]
+    return {
+        "version": changes[-1].version if changes else since,
+        "more": more,
+        "deleted": sorted(deleted),
+        "habits": _habit_rows(user_id, upserted) if upserted else [],
+        "progress": [
+            [habit_id, day.isoformat(), int(bool(completed))]
+            for (habit_id, day), (version, completed) in sorted(progress.items())
+            if current(habit_id, version)
+        ],
+    }
+
+
+def compact_change_log() -> int:
+    """Delete log rows superseded by a later change to the same record.
+
+    Progress changes are superseded by a later change to the same day or by
+    the deletion of their habit. Tombstones are only superseded by a later
+    tombstone: SQLite reuses the ID of the latest deleted habit, and a
+    client that missed the deletion has to drop the old habit's progress
+    before storing the new habit.
+
+    Returns:
+        int: Number of deleted rows
+    """
+    table = ChangeLog.__table__
+    later = aliased(ChangeLog)
+    superseded = exists().where(
+        later.user_id == ChangeLog.user_id,
+        later.habit_id == ChangeLog.habit_id,
+        later.version > ChangeLog.version,
+        later.deleted
+        | (
+            ~ChangeLog.deleted
+            & (
+                (later.day.is_(None) & ChangeLog.day.is_(None))
+                | (later.day == ChangeLog.day)
+            )
+        ),
+    )
+    deleted = db.session.execute(
+        table.delete().where(table.c.id.in_(select(ChangeLog.id).where(superseded)))
+    ).rowcount
+    db.session.commit()
+    return deleted
+
+
+@on_worker_start
+def schedule_log_compaction() -> None:
+    """Queue the next nightly compaction at ``SYNC_COMPACT_HOUR`` (UTC).
+
+    The caller is responsible for committing.
+    """
+    enqueue_daily("compact_change_log", current_app.config.get("SYNC_COMPACT_HOUR", 3))
+
+
+@job_handler("compact_change_log")
+def compact_change_log_job(payload: Dict) -> None:
+    """Run the nightly log compaction and queue the next one.
+
+    Args:
+        payload: Unused
+    """
+    compact_change_log()
+    schedule_log_compaction()
+    db.session.commit()
@@ -0,0 +1,152 @@
+"""Version stamps and conditional GET support for habit pages.
+
+Every write to a habit or its progress bumps the habit's ``version`` and its
+owner's ``data_version``. The dashboard and detail pages derive their ETag
+from these counters with a single-row query, so unchanged pages are answered
+with ``304 Not Modified`` before any habit, statistics or progress is loaded
+and before rendering.
+"""
+
+from datetime import datetime, time, timezone
+from typing import Iterable, Optional, Tuple
+
+from flask import Response, request, session
+from sqlalchemy import or_, select, update
+
+from db import db
+from habits.fragments import invalidate_fragments
+from models import Habit, User
+
+# ETag and Last-Modified of a page
+Validators = Tuple[str, Optional[datetime]]
+
+
+def bump_versions(habit_ids: Iterable[int] = (), user_ids: Iterable[int] = ()) -> None:
+    """Mark habits, their owners and users as modified.
+
+    The counters are incremented in the database, without loading rows, and
+    the cached fragments of the habits are dropped. The caller is
+    responsible for committing.
+
+    Args:
+        habit_ids: Written habits; their owners are bumped as well
+        user_ids: Users whose set of habits changed
+    """
+    habit_ids = list(habit_ids)
+    user_ids = list(user_ids)
+    now = datetime.utcnow()
+    if habit_ids:
+        invalidate_fragments(habit_ids)
+        db.session.execute(
+            update(Habit)
+            .where(Habit.id.in_(habit_ids))
+            .values(version=Habit.version + 1, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+    owners = [User.id.in_(user_ids)] if user_ids else []
+    if habit_ids:
+        owners.append(
+            User.id.in_(select(Habit.user_id).where(Habit.id.in_(habit_ids)))
+        )
+    if owners:
+        db.session.execute(
+            update(User)
+            .where(or_(*owners))
+            .values(data_version=User.data_version + 1, data_updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _validators(
+    prefix: str, key: int, version: int, updated_at: Optional[datetime]
+) -> Validators:
+    """Build the validators of a page that also depends on the current day.
+
+    Streaks and completion rates change with the day, so the day is part of
+    the ETag and Last-Modified is never earlier than its start.
+    """
+    today = datetime.utcnow().date()
+    start_of_day = datetime.combine(today, time.min)
+    last_modified = max(updated_at or start_of_day, start_of_day)
+    etag = f"{prefix}-{key}-{version}-{today.isoformat()}"
+    return etag, last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def dashboard_validators(user_id: int) -> Validators:
+    """Return the validators of a user's dashboard.
+
+    Args:
+        user_id: Dashboard owner
+
+    Returns:
+        Validators: ETag and Last-Modified
+    """
+    version, updated_at = db.session.execute(
+        select(User.data_version, User.data_updated_at).where(User.id == user_id)
+    ).one()
+    return _validators("dashboard", user_id, version, updated_at)
+
+
+def habit_validators(habit_id: int) -> Optional[Validators]:
+    """Return the validators of a habit detail page.
+
+    Args:
+        habit_id: Displayed habit
+
+    Returns:
+        Optional[Validators]: ETag and Last-Modified, None if the habit
+            does not exist
+    """
+    row = db.session.execute(
+        select(Habit.version, Habit.updated_at).where(Habit.id == habit_id)
+    ).one_or_none()
+    if row is None:
+        return None
+    return _validators("habit", habit_id, row.version, row.updated_at)
+
+
+def not_modified(validators: Validators) -> Optional[Response]:
+    """Answer a conditional request whose cached page is still fresh.
+
+    Pages with pending flash messages are always rendered, so the messages
+    are shown.
+
+    Args:
+        validators: ETag and Last-Modified of the page
+
+    Returns:
+        Optional[Response]: ``304 Not Modified``, None if the page must be
+            rendered
+    """
+    if session.get("_flashes"):
+        return None
+    etag, last_modified = validators
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    else:
+        since = request.if_modified_since
+        fresh = since is not None and last_modified is not None and (
+            last_modified <= since
+        )
+    if not fresh:
+        return None
+    return set_validators(Response(status=304), validators)
+
+
+def set_validators(response: Response, validators: Validators) -> Response:
+    """Add the validators and revalidation headers to a page response.
+
+    Args:
+        response: Page response
+        validators: ETag and Last-Modified of the page
+
+    Returns:
+        Response: The response
+    """
+    etag, last_modified = validators
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
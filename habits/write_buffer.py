@@ -0,0 +1,326 @@
+"""Write-behind buffer for progress toggles.
+
+With ``WRITE_COALESCE_WINDOW`` set, the mark route puts progress writes in
+an in-memory buffer instead of committing them. Writes to the same habit
+and day collapse, and a background flusher stores the buffer every window
+in one transaction. The dashboard renders the cards of habits with pending
+writes from their statistics with the writes applied; every other request
+of a user flushes that user's pending writes before it runs, so it reads
+and writes the user's habits in order. Writes of other users are left to
+the flusher. The buffer is flushed when the process exits.
+
+The buffer is process-local: pending writes are only visible to the
+process that received them until they are flushed.
+"""
+
+import atexit
+import threading
+from datetime import date as date_type
+from typing import Dict, Optional, Tuple
+
+from flask import Flask, abort, current_app, has_app_context, request
+from flask_login import current_user
+from sqlalchemy.orm import joinedload
+
+from bitmap import ProgressBitmap
+from db import begin_immediate, db
+from habits.progress import commit_progress, record_progress
+from habits.stats import bitmap_stats
+from models import Habit, Progress
+
+# Endpoints served with pending writes still buffered
+BUFFERED_ENDPOINTS = frozenset(("habits.mark_habit", "habits.dashboard", "static"))
+
+
+class ProgressWriteBuffer:
+    """Coalesces progress writes and flushes them in batches.
+
+    Attributes:
+        app: Application whose database receives the writes
+        window: Seconds between flushes
+        max_pending: Number of pending writes that triggers an early flush
+    """
+
+    def __init__(self, app: Flask, window: float, max_pending: int = 1000) -> None:
+        """Create the buffer; the flusher thread starts with the first write.
+
+        Args:
+            app: Application whose database receives the writes
+            window: Seconds between flushes
+            max_pending: Number of pending writes that triggers an early flush
+        """
+        self.app = app
+        self.window = window
+        self.max_pending = max_pending
+        self.added = 0
+        self.coalesced = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.errors = 0
+        # Latest owner and state per (habit_id, date), and the writes of the
+        # flush in progress, which stay visible until they are committed
+        self._pending: Dict[Tuple[int, date_type], Tuple[int, bool]] = {}
+        self._flushing: Dict[Tuple[int, date_type], Tuple[int, bool]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def add(self, habit_id: int, user_id: int, day: date_type, completed: bool) -> None:
+        """Buffer the progress of a habit for one day.
+
+        Args:
+            habit_id: ID of the habit
+            user_id: ID of the habit's owner
+            day: Day of the entry
+            completed: Whether the habit was completed that day
+        """
+        with self._lock:
+            key = (habit_id, day)
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = (user_id, completed)
+            self.added += 1
+            full = len(self._pending) >= self.max_pending
+        if self._closed:
+            self.flush()
+            return
+        self._ensure_started()
+        if full:
+            self._wake.set()
+
+    def pending(self, user_id: int) -> Dict[int, Dict[date_type, bool]]:
+        """Return the unflushed writes to a user's habits.
+
+        Args:
+            user_id: Owner of the habits
+
+        Returns:
+            Dict[int, Dict[date_type, bool]]: Completion state per day, per
+                habit ID
+        """
+        writes: Dict[int, Dict[date_type, bool]] = {}
+        with self._lock:
+            for source in (self._flushing, self._pending):
+                for (habit_id, day), (owner, completed) in source.items():
+                    if owner == user_id:
+                        writes.setdefault(habit_id, {})[day] = completed
+        return writes
+
+    def __len__(self) -> int:
+        """Return the number of unflushed writes."""
+        with self._lock:
+            return len(self._pending) + len(self._flushing)
+
+    def flush(self, user_id: Optional[int] = None) -> int:
+        """Store the pending writes in one transaction.
+
+        Inside an application context the writes are committed with the
+        current session, otherwise in a new application context.
+
+        Args:
+            user_id: Only store the writes to this user's habits
+
+        Returns:
+            int: Number of writes stored
+        """
+        with self._flush_lock:
+            with self._lock:
+                if user_id is None:
+                    self._flushing, self._pending = self._pending, {}
+                else:
+                    self._flushing = {
+                        key: write
+                        for key, write in self._pending.items()
+                        if write[0] == user_id
+                    }
+                    for key in self._flushing:
+                        del self._pending[key]
+                if not self._flushing:
+                    return 0
+            try:
+                in_app = has_app_context() and (
+                    current_app._get_current_object() is self.app
+                )
+                if in_app:
+                    self._write(self._flushing)
+                else:
+                    with self.app.app_context():
+                        self._write(self._flushing)
+            except Exception:
+                self.errors += 1
+                with self._lock:
+                    # Keep the writes that were not superseded meanwhile
+                    for key, value in self._flushing.items():
+                        self._pending.setdefault(key, value)
+                    self._flushing = {}
+                raise
+            with self._lock:
+                written = len(self._flushing)
+                self._flushing = {}
+            self.flushed += written
+            self.flushes += 1
+            return written
+
+    def _write(self, writes: Dict[Tuple[int, date_type], Tuple[int, bool]]) -> None:
+        """Record and commit writes with the current session.
+
+        A transaction the session has open, e.g. the reads of the request
+        that triggered the flush, is committed first, so every attempt runs
+        in its own transaction started by ``begin_immediate``.
+        """
+        if db.session().in_transaction():
+            db.session.commit()
+        begin_immediate()
+        habit_ids = {habit_id for habit_id, _ in writes}
+        habits = {
+            habit.id: habit
+            for habit in Habit.query.options(joinedload(Habit.stats))
+            .filter(Habit.id.in_(habit_ids))
+            .all()
+        }
+
+        def record() -> None:
+            # Retries after a lost statistics race begin a new transaction
+            begin_immediate()
+            for (habit_id, day), (_, completed) in sorted(writes.items()):
+                # Habits deleted after the write was buffered are skipped
+                if habit_id in habits:
+                    record_progress(habits[habit_id], day, completed)
+
+        try:
+            commit_progress(record)
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop the flusher and store the remaining writes.
+
+        Args:
+            timeout: Maximum seconds to wait for the flusher
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the buffer counters.
+
+        Returns:
+            Dict[str, int]: ``pending``, ``added``, ``coalesced``, ``flushed``,
+                ``flushes`` and ``errors``
+        """
+        return {
+            "pending": len(self),
+            "added": self.added,
+            "coalesced": self.coalesced,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "errors": self.errors,
+        }
+
+    def _ensure_started(self) -> None:
+        """Start the flusher thread if it is not running."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="progress-flusher", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self) -> None:
+        """Flusher loop: store the buffer every window until closed."""
+        while not self._closed:
+            self._wake.wait(self.window)
+            self._wake.clear()
+            if self._closed:
+                return
+            try:
+                self.flush()
+            except Exception:
+                # Counted in flush; the writes are retried next window
+                pass
+
+
+def get_write_buffer() -> Optional[ProgressWriteBuffer]:
+    """Return the write buffer of the current application.
+
+    Returns:
+        Optional[ProgressWriteBuffer]: The buffer, None if coalescing is
+            disabled
+    """
+    return current_app.extensions.get("write_buffer")
+
+
+def settle_pending_writes() -> None:
+    """Flush the user's buffered writes before requests reading the database.
+
+    A failed flush is logged and the request is answered with ``503 Service
+    Unavailable`` instead of reading data without the user's writes; the
+    writes stay buffered and are retried by the flusher.
+    """
+    buffer = get_write_buffer()
+    if buffer is None or request.endpoint in BUFFERED_ENDPOINTS:
+        return
+    if not len(buffer) or not current_user.is_authenticated:
+        return
+    try:
+        buffer.flush(current_user.id)
+    except Exception as e:
+        current_app.logger.error(f"Error flushing pending writes: {str(e)}")
+        abort(503)
+
+
+def overlay_stats(habit: Habit, writes: Dict[date_type, bool]) -> Dict:
+    """Compute the statistics of a habit with pending writes applied.
+
+    Nothing is written to the habit or its statistics.
+
+    Args:
+        habit: Habit with its statistics loaded
+        writes: Pending completion state per day
+
+    Returns:
+        Dict: HabitStats column values including the writes
+    """
+    bitmap = habit.stats.bitmap() if habit.stats is not None else None
+    if bitmap is None:
+        rows = db.session.query(Progress.date, Progress.completed).filter(
+            Progress.habit_id == habit.id
+        )
+        bitmap = ProgressBitmap.from_entries(habit.created_at.date(), rows)
+    for day, completed in writes.items():
+        bitmap.set(day, completed)
+    return bitmap_stats(habit.periodicity, bitmap)
+
+
+def init_write_buffer(app: Flask) -> Optional[ProgressWriteBuffer]:
+    """Enable write coalescing if ``WRITE_COALESCE_WINDOW`` is set.
+
+    The hook flushing pending writes before other requests is registered
+    either way, so a buffer can also be installed later.
+
+    Args:
+        app: Flask application instance
+
+    Returns:
+        Optional[ProgressWriteBuffer]: The buffer, None if disabled
+    """
+    app.before_request(settle_pending_writes)
+    window = app.config.get("WRITE_COALESCE_WINDOW", 0)
+    if not window:
+        return None
+    buffer = ProgressWriteBuffer(
+        app, window, max_pending=app.config.get("WRITE_COALESCE_MAX_PENDING", 1000)
+    )
+    app.extensions["write_buffer"] = buffer
+    return buffer
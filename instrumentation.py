@@ -0,0 +1,359 @@
+"""Opt-in per-request instrumentation.
+
+When ``INSTRUMENTATION_ENABLED`` is set, every request records its wall
+time, the number and total time of SQL statements, the number of rows
+loaded into ORM objects and the template render time. The values are sent
+as a ``Server-Timing`` response header and aggregated per route, and the
+aggregate is served in the Prometheus text format at
+``INSTRUMENTATION_METRICS_PATH`` together with the process-local caches,
+hashing pool, activity log and write buffer counters. The metrics endpoint
+is restricted to administrators.
+
+With ``INSTRUMENTATION_PROFILE_SLOWEST`` set, a sample of requests runs
+under cProfile and the profiles of the slowest N requests per route are
+kept as ``.prof`` files in ``INSTRUMENTATION_PROFILE_DIR``.
+"""
+
+import cProfile
+import heapq
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from flask import Flask, Response, current_app, g, has_app_context, request
+from flask_login import login_required
+from jinja2 import Template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from db import db
+from decorators import admin_required
+
+# Upper bounds of the request duration histogram, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class RequestMetrics:
+    """Measurements of a single request.
+
+    Attributes:
+        sql_count: Number of executed SQL statements
+        sql_seconds: Time spent executing SQL statements
+        orm_rows: Number of rows loaded into ORM objects
+        template_seconds: Time spent rendering templates
+    """
+
+    def __init__(self) -> None:
+        """Start measuring a request."""
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.orm_rows = 0
+        self.template_seconds = 0.0
+        self.profiler: Optional[cProfile.Profile] = None
+
+    def server_timing(self, seconds: float) -> str:
+        """Format the measurements as a ``Server-Timing`` header value.
+
+        Args:
+            seconds: Wall time of the request
+
+        Returns:
+            str: Header value
+        """
+        return ", ".join(
+            (
+                f"app;dur={seconds * 1000:.2f}",
+                f'db;desc="{self.sql_count} queries";dur={self.sql_seconds * 1000:.2f}',
+                f'orm;desc="{self.orm_rows} rows"',
+                f"tpl;dur={self.template_seconds * 1000:.2f}",
+            )
+        )
+
+
+class TimedTemplate(Template):
+    """Jinja template that adds its render time to the request metrics."""
+
+    def render(self, *args, **kwargs) -> str:
+        """Render the template, timing it when a request is measured."""
+        metrics = _current_metrics()
+        if metrics is None:
+            return super().render(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            metrics.template_seconds += time.perf_counter() - start
+
+
+class RouteStats:
+    """Aggregated measurements of one route."""
+
+    def __init__(self) -> None:
+        """Create empty counters."""
+        self.count = 0
+        self.seconds = 0.0
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.orm_rows = 0
+        self.template_seconds = 0.0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+
+    def add(self, metrics: RequestMetrics, seconds: float) -> None:
+        """Add the measurements of a finished request.
+
+        Args:
+            metrics: Request measurements
+            seconds: Wall time of the request
+        """
+        self.count += 1
+        self.seconds += seconds
+        self.sql_count += metrics.sql_count
+        self.sql_seconds += metrics.sql_seconds
+        self.orm_rows += metrics.orm_rows
+        self.template_seconds += metrics.template_seconds
+        index = bisect_left(DURATION_BUCKETS, seconds)
+        if index < len(self.buckets):
+            self.buckets[index] += 1
+
+
+class Instrumentation:
+    """Collects request measurements of an application.
+
+    Attributes:
+        profile_slowest: Number of profiles kept per route, 0 disables profiling
+        profile_sample_rate: Fraction of requests that are profiled
+        profile_dir: Directory of the kept ``.prof`` files
+    """
+
+    def __init__(self, app: Flask) -> None:
+        """Register the request hooks, events and metrics endpoint.
+
+        Args:
+            app: Flask application instance
+        """
+        self.profile_slowest = app.config.get("INSTRUMENTATION_PROFILE_SLOWEST", 0)
+        self.profile_sample_rate = app.config.get(
+            "INSTRUMENTATION_PROFILE_SAMPLE_RATE", 0.1
+        )
+        self.profile_dir = app.config.get("INSTRUMENTATION_PROFILE_DIR", "profiles")
+        self._routes: Dict[Tuple[str, str], RouteStats] = defaultdict(RouteStats)
+        self._profiles: Dict[str, List[Tuple[float, str]]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+        app.extensions["instrumentation"] = self
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.jinja_env.template_class = TimedTemplate
+        app.add_url_rule(
+            app.config.get("INSTRUMENTATION_METRICS_PATH", "/metrics"),
+            "metrics",
+            login_required(admin_required(self.metrics_view)),
+        )
+        _register_events()
+
+    def _before_request(self) -> None:
+        """Start measuring the request, under cProfile if sampled."""
+        metrics = g._request_metrics = RequestMetrics()
+        if self.profile_slowest and random.random() < self.profile_sample_rate:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is active in this thread
+                return
+            metrics.profiler = profiler
+
+    def _after_request(self, response: Response) -> Response:
+        """Record the measurements and add the ``Server-Timing`` header."""
+        metrics = g.pop("_request_metrics", None)
+        if metrics is None:
+            return response
+        if metrics.profiler is not None:
+            metrics.profiler.disable()
+        seconds = time.perf_counter() - metrics.start
+
+        endpoint = request.endpoint or "unmatched"
+        with self._lock:
+            self._routes[(endpoint, request.method)].add(metrics, seconds)
+        if metrics.profiler is not None:
+            self._keep_profile(endpoint, metrics.profiler, seconds)
+
+        response.headers["Server-Timing"] = metrics.server_timing(seconds)
+        return response
+
+    def _keep_profile(
+        self, endpoint: str, profiler: cProfile.Profile, seconds: float
+    ) -> None:
+        """Keep a profile if it is among the slowest of its route.
+
+        Args:
+            endpoint: Route endpoint
+            profiler: Finished profiler of the request
+            seconds: Wall time of the request
+        """
+        with self._lock:
+            kept = self._profiles[endpoint]
+            if len(kept) >= self.profile_slowest and seconds <= kept[0][0]:
+                return
+            os.makedirs(self.profile_dir, exist_ok=True)
+            path = os.path.join(
+                self.profile_dir,
+                f"{endpoint}-{seconds * 1000:.0f}ms-{time.time_ns()}.prof",
+            )
+            profiler.dump_stats(path)
+            if len(kept) < self.profile_slowest:
+                heapq.heappush(kept, (seconds, path))
+                return
+            _, evicted = heapq.heapreplace(kept, (seconds, path))
+        try:
+            os.remove(evicted)
+        except OSError:
+            pass
+
+    def profiles(self) -> Dict[str, List[Tuple[float, str]]]:
+        """Return the kept profiles per route, slowest first.
+
+        Returns:
+            Dict[str, List[Tuple[float, str]]]: Durations and file paths
+        """
+        with self._lock:
+            return {
+                endpoint: sorted(kept, reverse=True)
+                for endpoint, kept in self._profiles.items()
+            }
+
+    def metrics_view(self) -> Response:
+        """Serve the aggregated metrics in the Prometheus text format."""
+        return Response(
+            self.render_metrics(), mimetype="text/plain; version=0.0.4"
+        )
+
+    def render_metrics(self) -> str:
+        """Render the route aggregates and process counters.
+
+        Returns:
+            str: Metrics in the Prometheus text exposition format
+        """
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = []
+            for name, kind, help_text, field in (
+                ("requests_total", "counter", "Requests", "count"),
+                ("sql_queries_total", "counter", "SQL statements", "sql_count"),
+                ("sql_seconds_total", "counter", "SQL time", "sql_seconds"),
+                ("orm_rows_total", "counter", "ORM rows loaded", "orm_rows"),
+                (
+                    "template_seconds_total",
+                    "counter",
+                    "Template time",
+                    "template_seconds",
+                ),
+            ):
+                lines.append(f"# HELP pytracker_{name} {help_text} per route.")
+                lines.append(f"# TYPE pytracker_{name} {kind}")
+                for (endpoint, method), stats in routes:
+                    labels = f'endpoint="{endpoint}",method="{method}"'
+                    lines.append(
+                        f"pytracker_{name}{{{labels}}} {getattr(stats, field)}"
+                    )
+
+            lines.append("# HELP pytracker_request_duration_seconds Request wall time.")
+            lines.append("# TYPE pytracker_request_duration_seconds histogram")
+            for (endpoint, method), stats in routes:
+                labels = f'endpoint="{endpoint}",method="{method}"'
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                    cumulative += count
+                    lines.append(
+                        f"pytracker_request_duration_seconds_bucket"
+                        f'{{{labels},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f"pytracker_request_duration_seconds_bucket"
+                    f'{{{labels},le="+Inf"}} {stats.count}'
+                )
+                lines.append(
+                    f"pytracker_request_duration_seconds_sum{{{labels}}}"
+                    f" {stats.seconds}"
+                )
+                lines.append(
+                    f"pytracker_request_duration_seconds_count{{{labels}}}"
+                    f" {stats.count}"
+                )
+
+        for extension, prefix in (
+            ("user_cache", "user_cache"),
+            ("fragment_cache", "fragment_cache"),
+            ("hashing_pool", "hashing"),
+            ("activity_logger", "activity_log"),
+            ("write_buffer", "write_buffer"),
+        ):
+            component = current_app.extensions.get(extension)
+            if component is None:
+                continue
+            values = (
+                component.metrics()
+                if hasattr(component, "metrics")
+                else component.stats()
+            )
+            for key, value in values.items():
+                lines.append(f"# TYPE pytracker_{prefix}_{key} gauge")
+                lines.append(f"pytracker_{prefix}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _current_metrics() -> Optional[RequestMetrics]:
+    """Return the metrics of the request being measured, if any."""
+    if not has_app_context():
+        return None
+    return g.get("_request_metrics")
+
+
+_events_registered = False
+
+
+def _register_events() -> None:
+    """Listen for SQL executions and ORM loads once per process."""
+    global _events_registered
+    if _events_registered:
+        return
+    _events_registered = True
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        if _current_metrics() is not None:
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        metrics = _current_metrics()
+        starts = conn.info.get("query_start")
+        if metrics is None or not starts:
+            return
+        metrics.sql_count += 1
+        metrics.sql_seconds += time.perf_counter() - starts.pop()
+
+    @event.listens_for(db.Model, "load", propagate=True)
+    def load(target, context):
+        metrics = _current_metrics()
+        if metrics is not None:
+            metrics.orm_rows += 1
+
+
+def init_instrumentation(app: Flask) -> Optional[Instrumentation]:
+    """Enable the instrumentation if ``INSTRUMENTATION_ENABLED`` is set.
+
+    Args:
+        app: Flask application instance
+
+    Returns:
+        Optional[Instrumentation]: The instrumentation, None if disabled
+    """
+    if not app.config.get("INSTRUMENTATION_ENABLED", False):
+        return None
+    return Instrumentation(app)
@@ -0,0 +1,399 @@
+"""Background jobs queued in the database.
+
+Work that does not have to finish before a response, such as recomputing
+habit statistics, is queued as a ``Job`` row in the same transaction as the
+write that needs it, and run by worker threads, either inside the web
+process (``JOB_WORKER_THREADS``) or in a separate ``flask worker`` process.
+Jobs with a ``dedup_key`` are deduplicated while pending, failed runs are
+retried with exponential backoff, and jobs left running by a crashed worker
+are queued again.
+"""
+
+import json
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from flask import Flask, current_app
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from db import db
+from models import Job
+
+PENDING = "pending"
+RUNNING = "running"
+FAILED = "failed"
+
+# Handlers by job kind, registered with ``job_handler``
+JOB_HANDLERS: Dict[str, Callable[[Dict], None]] = {}
+
+# Functions run when a worker starts, registered with ``on_worker_start``
+WORKER_STARTUP: List[Callable[[], None]] = []
+
+# Dialects whose INSERT supports ``ON CONFLICT DO NOTHING``
+_UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def job_handler(kind: str) -> Callable:
+    """Register a function as the handler of a job kind.
+
+    Args:
+        kind: Job kind passed to ``enqueue``
+
+    Returns:
+        Callable: Decorator registering a function taking the payload
+    """
+
+    def register(handler: Callable[[Dict], None]) -> Callable[[Dict], None]:
+        JOB_HANDLERS[kind] = handler
+        return handler
+
+    return register
+
+
+def on_worker_start(func: Callable[[], None]) -> Callable[[], None]:
+    """Register a function run when a worker starts, e.g. to seed a
+    recurring job.
+
+    Args:
+        func: Function run in an application context; the worker commits
+
+    Returns:
+        Callable[[], None]: The function
+    """
+    WORKER_STARTUP.append(func)
+    return func
+
+
+def enqueue(
+    kind: str,
+    payload: Optional[Dict] = None,
+    dedup_key: Optional[str] = None,
+    delay: float = 0,
+    max_attempts: int = 3,
+) -> None:
+    """Queue a job in the current transaction.
+
+    A job whose ``dedup_key`` matches a pending job is dropped. The caller
+    is responsible for committing, so the job is only visible to workers
+    together with the write that queued it.
+
+    Args:
+        kind: Job kind of a registered handler
+        payload: JSON-serializable handler arguments
+        dedup_key: Key shared by interchangeable jobs
+        delay: Seconds before the job may run
+        max_attempts: Runs allowed before the job fails
+    """
+    now = datetime.utcnow()
+    values = {
+        "kind": kind,
+        "payload": json.dumps(payload or {}),
+        "dedup_key": dedup_key,
+        "status": PENDING,
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "run_at": now + timedelta(seconds=delay),
+        "created_at": now,
+    }
+    insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+    if insert is not None:
+        stmt = insert(Job.__table__).values(**values)
+        if dedup_key is not None:
+            stmt = stmt.on_conflict_do_nothing(
+                index_elements=["dedup_key"], index_where=Job.status == PENDING
+            )
+        db.session.execute(stmt)
+    elif not _has_pending_twin(dedup_key):
+        db.session.add(Job(**values))
+
+    worker = current_app.extensions.get("job_worker")
+    if worker is not None:
+        worker.start()
+
+
+def enqueue_daily(kind: str, hour: int) -> None:
+    """Queue a job for the next time the UTC clock reaches an hour.
+
+    At most one such job is pending per kind; handlers of recurring jobs
+    call this again to queue their next run.
+
+    Args:
+        kind: Job kind of a registered handler
+        hour: Hour of the day (UTC) the job runs at
+    """
+    now = datetime.utcnow()
+    run_at = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    enqueue(kind, delay=(run_at - now).total_seconds(), dedup_key=f"daily:{kind}")
+
+
+def claim_next_job() -> Optional[Job]:
+    """Claim the oldest due pending job for the current worker.
+
+    The claim is a conditional UPDATE, so concurrent workers never run the
+    same job. The claim is committed before the job runs.
+
+    Returns:
+        Optional[Job]: The claimed job, None if no job is due
+    """
+    now = datetime.utcnow()
+    while True:
+        job_id = db.session.execute(
+            select(Job.id)
+            .where(Job.status == PENDING, Job.run_at <= now)
+            .order_by(Job.run_at, Job.id)
+            .limit(1)
+        ).scalar()
+        if job_id is None:
+            db.session.commit()
+            return None
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == PENDING)
+            .values(status=RUNNING, attempts=Job.attempts + 1, started_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job_id)
+
+
+def run_job(job: Job) -> bool:
+    """Run a claimed job and record its outcome.
+
+    Successful jobs are deleted. A failed run is retried after
+    ``JOB_RETRY_DELAY * 2 ** (attempts - 1)`` seconds until the job runs
+    out of attempts.
+
+    Args:
+        job: Job claimed with ``claim_next_job``
+
+    Returns:
+        bool: True if the job succeeded
+    """
+    job_id, attempts, max_attempts = job.id, job.attempts, job.max_attempts
+    dedup_key = job.dedup_key
+    try:
+        handler = JOB_HANDLERS[job.kind]
+        handler(json.loads(job.payload))
+        db.session.execute(
+            Job.__table__.delete().where(Job.__table__.c.id == job_id)
+        )
+        db.session.commit()
+        return True
+    except Exception:
+        db.session.rollback()
+        error = traceback.format_exc(limit=5)
+
+    now = datetime.utcnow()
+    if attempts < max_attempts and _has_pending_twin(dedup_key):
+        # A job queued meanwhile does the same work
+        db.session.execute(
+            Job.__table__.delete().where(Job.__table__.c.id == job_id)
+        )
+        db.session.commit()
+        return False
+    if attempts < max_attempts:
+        delay = current_app.config.get("JOB_RETRY_DELAY", 5.0) * 2 ** (attempts - 1)
+        values = {
+            "status": PENDING,
+            "run_at": now + timedelta(seconds=delay),
+            "last_error": error,
+        }
+    else:
+        values = {"status": FAILED, "finished_at": now, "last_error": error}
+    db.session.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return False
+
+
+def run_next_job() -> bool:
+    """Claim and run the next due job.
+
+    Returns:
+        bool: True if a job was run
+    """
+    job = claim_next_job()
+    if job is None:
+        return False
+    run_job(job)
+    return True
+
+
+def requeue_stale_jobs(timeout: float) -> int:
+    """Queue again the jobs left running by a stopped worker.
+
+    Args:
+        timeout: Seconds after which a running job counts as abandoned
+
+    Returns:
+        int: Number of requeued jobs
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout)
+    stale = (Job.status == RUNNING, Job.started_at < cutoff)
+    # Abandoned jobs with a pending twin are dropped instead
+    pending_keys = select(Job.dedup_key).where(
+        Job.status == PENDING, Job.dedup_key.isnot(None)
+    )
+    db.session.execute(
+        Job.__table__.delete().where(
+            *stale, Job.__table__.c.dedup_key.in_(pending_keys.scalar_subquery())
+        )
+    )
+    requeued = db.session.execute(
+        update(Job)
+        .where(*stale)
+        .values(status=PENDING, run_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return requeued
+
+
+def prepare_worker(app: Flask) -> int:
+    """Requeue abandoned jobs and run the ``on_worker_start`` functions.
+
+    Args:
+        app: Application whose jobs are run
+
+    Returns:
+        int: Number of requeued jobs
+    """
+    requeued = requeue_stale_jobs(app.config.get("JOB_STALE_TIMEOUT", 600))
+    for func in WORKER_STARTUP:
+        func()
+    db.session.commit()
+    return requeued
+
+
+def _has_pending_twin(dedup_key: Optional[str]) -> bool:
+    """Return whether a pending job shares a deduplication key."""
+    if dedup_key is None:
+        return False
+    return db.session.query(
+        Job.query.filter_by(dedup_key=dedup_key, status=PENDING).exists()
+    ).scalar()
+
+
+def job_counts() -> Dict[str, int]:
+    """Count queued jobs by status.
+
+    Returns:
+        Dict[str, int]: Number of jobs per status
+    """
+    return dict(
+        db.session.execute(select(Job.status, func.count()).group_by(Job.status)).all()
+    )
+
+
+class JobWorker:
+    """Threads running queued jobs of an application.
+
+    Attributes:
+        app: Application whose jobs are run
+        threads: Number of worker threads
+        poll_interval: Seconds an idle thread waits before polling again
+    """
+
+    def __init__(
+        self, app: Flask, threads: int = 2, poll_interval: float = 1.0
+    ) -> None:
+        """Create the worker; threads start with ``start``.
+
+        Args:
+            app: Application whose jobs are run
+            threads: Number of worker threads
+            poll_interval: Seconds an idle thread waits before polling again
+        """
+        self.app = app
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.ran = 0
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the threads if they are not running."""
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for number in range(self.threads):
+                thread = threading.Thread(
+                    target=self._run,
+                    args=(number == 0,),
+                    name=f"job-worker-{number}",
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop the threads after their current job.
+
+        Args:
+            timeout: Maximum seconds to wait per thread
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self, requeue: bool) -> None:
+        """Thread loop: run due jobs, poll while idle.
+
+        Args:
+            requeue: Run ``prepare_worker`` before the first poll
+        """
+        if requeue:
+            with self.app.app_context():
+                prepare_worker(self.app)
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    ran = run_next_job()
+                except Exception:
+                    ran = False
+                    db.session.rollback()
+            if ran:
+                self.ran += 1
+            else:
+                self._stop.wait(self.poll_interval)
+
+
+def init_jobs(app: Flask) -> Optional[JobWorker]:
+    """Run jobs in the web process if ``JOB_WORKER_THREADS`` is set.
+
+    The threads start with the first request or queued job, whichever comes
+    first, so jobs left pending by an earlier process and the recurring
+    jobs seeded by ``on_worker_start`` run without waiting for a new job.
+
+    Args:
+        app: Flask application instance
+
+    Returns:
+        Optional[JobWorker]: The in-process worker, None if jobs are left
+            to ``flask worker``
+    """
+    threads = app.config.get("JOB_WORKER_THREADS", 0)
+    if not threads:
+        return None
+    worker = JobWorker(
+        app, threads, poll_interval=app.config.get("JOB_POLL_INTERVAL", 1.0)
+    )
+    app.extensions["job_worker"] = worker
+    app.before_request(worker.start)
+    return worker
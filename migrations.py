@@ -0,0 +1,223 @@
+"""Schema upgrades for existing PyTracker databases.
+
+``db.create_all()`` only creates missing tables, so databases created by an
+older version of the application keep their old table definitions. The steps
+in this module bring such databases up to date. Every step is idempotent and
+reports whether it changed anything.
+"""
+
+from typing import Callable, List
+
+from sqlalchemy import func, inspect, or_, text
+
+from db import db
+from models import ChangeLog, DailyRollup, Habit, HabitStats, Progress, SyncVersion
+
+
+def add_missing_columns() -> bool:
+    """Add model columns that are missing from existing tables.
+
+    New columns are added as nullable or with their server default, so
+    existing rows stay valid.
+
+    Returns:
+        bool: True if any column was added
+    """
+    engine = db.get_engine()
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    statements = []
+
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = (
+                f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} "
+                f"{column.type.compile(dialect=engine.dialect)}"
+            )
+            if column.server_default is not None:
+                default = column.server_default.arg
+                ddl += f" DEFAULT {getattr(default, 'text', default)}"
+            statements.append(ddl)
+
+    with engine.begin() as connection:
+        for ddl in statements:
+            connection.execute(text(ddl))
+    return bool(statements)
+
+
+def add_progress_habit_date_index() -> bool:
+    """Create the unique ``(habit_id, date)`` index on the progress table.
+
+    Duplicate entries for the same habit and day are removed first, keeping
+    the most recently inserted row of each group.
+
+    Returns:
+        bool: True if the index was created, False if it already existed
+    """
+    engine = db.get_engine()
+    existing = {index["name"] for index in inspect(engine).get_indexes("progress")}
+    if "ix_progress_habit_date" in existing:
+        return False
+
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "DELETE FROM progress WHERE id NOT IN "
+                "(SELECT MAX(id) FROM progress GROUP BY habit_id, date)"
+            )
+        )
+        for index in Progress.__table__.indexes:
+            index.create(connection, checkfirst=True)
+    return True
+
+
+def add_missing_indexes() -> bool:
+    """Create model indexes that are missing from existing tables.
+
+    Returns:
+        bool: True if any index was created
+    """
+    engine = db.get_engine()
+    inspector = inspect(engine)
+    created = False
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(connection)
+                    created = True
+    return created
+
+
+def backfill_habit_stats() -> bool:
+    """Build the materialized statistics of habits that have none.
+
+    Statistics of habits with progress that were stored before progress
+    bitmaps were introduced are rebuilt as well.
+
+    Returns:
+        bool: True if statistics were built for any habit
+    """
+    from habits.stats import rebuild_stats
+
+    missing = [
+        habit_id
+        for (habit_id,) in db.session.query(Habit.id)
+        .outerjoin(HabitStats)
+        .filter(
+            or_(
+                HabitStats.habit_id.is_(None),
+                HabitStats.bits_origin.is_(None)
+                & HabitStats.last_entry_date.isnot(None),
+            )
+        )
+    ]
+    if not missing:
+        return False
+
+    rebuild_stats(missing)
+    db.session.commit()
+    return True
+
+
+def rebuild_weekly_stats() -> bool:
+    """Rebuild the statistics of weekly habits stored with old streaks.
+
+    Weekly streaks used to count distinct ISO week numbers, and statistics
+    were stored without ``weeks_before_latest``; only statistics that differ
+    from the rebuilt ones are written.
+
+    Returns:
+        bool: True if the statistics of any weekly habit were rebuilt
+    """
+    from habits.stats import rebuild_stats
+
+    weekly = [
+        habit_id
+        for (habit_id,) in db.session.query(Habit.id).filter(
+            Habit.periodicity == "weekly"
+        )
+    ]
+    if not weekly:
+        return False
+
+    rebuilt = rebuild_stats(weekly)
+    db.session.commit()
+    return bool(rebuilt)
+
+
+def backfill_rollups() -> bool:
+    """Build the analytics rollups of databases that have none.
+
+    Returns:
+        bool: True if any rollup was built from the progress history
+    """
+    from habits.rollups import progress_date_range, rebuild_rollups
+
+    if db.session.query(DailyRollup.query.exists()).scalar():
+        return False
+    history = progress_date_range()
+    if history is None:
+        return False
+    return bool(rebuild_rollups(*history))
+
+
+def backfill_change_versions() -> bool:
+    """Version the sync changes logged before changes were versioned per user.
+
+    Such changes keep their ID as their version, which is what clients
+    received for them, and every user's ``SyncVersion`` continues from the
+    user's latest change.
+
+    Returns:
+        bool: True if any change was versioned
+    """
+    versioned = (
+        db.session.query(ChangeLog)
+        .filter(ChangeLog.version.is_(None))
+        .update({ChangeLog.version: ChangeLog.id}, synchronize_session=False)
+    )
+    if not versioned:
+        return False
+
+    latest = db.session.query(ChangeLog.user_id, func.max(ChangeLog.version)).group_by(
+        ChangeLog.user_id
+    )
+    for user_id, version in latest:
+        counter = db.session.get(SyncVersion, user_id)
+        if counter is None:
+            db.session.add(SyncVersion(user_id=user_id, version=version))
+        else:
+            counter.version = max(counter.version, version)
+    db.session.commit()
+    return True
+
+
+# Upgrade steps in the order they have to be applied
+STEPS: List[Callable[[], bool]] = [
+    add_missing_columns,
+    add_progress_habit_date_index,
+    add_missing_indexes,
+    backfill_habit_stats,
+    rebuild_weekly_stats,
+    backfill_rollups,
+    backfill_change_versions,
+]
+
+
+def upgrade_schema() -> List[str]:
+    """Create missing tables and apply all pending upgrade steps.
+
+    Returns:
+        List[str]: Names of the steps that changed the schema
+    """
+    db.create_all()
+    return [step.__name__ for step in STEPS if step()]
@@ -4,13 +4,18 @@ This module defines all database models including:
 - User authentication model
 - Habit tracking model
 - Progress tracking model
+- Materialized habit statistics model
+- Background job model
 - Streak calculation strategies
 """
 
-from datetime import datetime, timedelta, timezone
-from typing import List, Set, Optional
+from datetime import date, datetime, timezone
+from typing import List, Set, Optional, Tuple
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+from sqlalchemy import event
+from bitmap import ProgressBitmap, popcount
+from cache import get_cache
 from db import db
 
 
@@ -34,6 +39,48 @@ class StreakCalculator:
         """
         raise NotImplementedError
 
+    def longest(self, progress_entries: List["Progress"]) -> int:
+        """Calculate the longest streak ever reached.
+
+        Args:
+            progress_entries: List of Progress objects
+
+        Returns:
+            int: Longest streak count
+
+        Raises:
+            NotImplementedError: Must be implemented by subclasses
+        """
+        raise NotImplementedError
+
+    def calculate_bitmap(self, bitmap: ProgressBitmap) -> int:
+        """Calculate streak from a progress bitmap.
+
+        Args:
+            bitmap: Progress history as bit arrays
+
+        Returns:
+            int: Current streak count
+
+        Raises:
+            NotImplementedError: Must be implemented by subclasses
+        """
+        raise NotImplementedError
+
+    def longest_bitmap(self, bitmap: ProgressBitmap) -> int:
+        """Calculate the longest streak from a progress bitmap.
+
+        Args:
+            bitmap: Progress history as bit arrays
+
+        Returns:
+            int: Longest streak count
+
+        Raises:
+            NotImplementedError: Must be implemented by subclasses
+        """
+        raise NotImplementedError
+
 
 class DailyStreakCalculator(StreakCalculator):
     """Calculator for daily streaks.
@@ -59,13 +106,163 @@ class DailyStreakCalculator(StreakCalculator):
                 break
         return streak
 
+    def longest(self, progress_entries: List["Progress"]) -> int:
+        """Calculate the longest daily streak.
+
+        Args:
+            progress_entries: List of Progress objects
+
+        Returns:
+            int: Longest run of completed entries in days
+        """
+        longest = streak = 0
+        for entry in sorted(progress_entries, key=lambda x: x.date):
+            streak = streak + 1 if entry.completed else 0
+            longest = max(longest, streak)
+        return longest
+
+    def calculate_bitmap(self, bitmap: ProgressBitmap) -> int:
+        """Calculate daily streak from a progress bitmap.
+
+        Counts the completed days after the latest missed entry.
+
+        Args:
+            bitmap: Progress history as bit arrays
+
+        Returns:
+            int: Current streak in days
+        """
+        missed = bitmap.recorded & ~bitmap.completed
+        return popcount(bitmap.completed >> missed.bit_length())
+
+    def longest_bitmap(self, bitmap: ProgressBitmap) -> int:
+        """Calculate the longest daily streak from a progress bitmap.
+
+        Args:
+            bitmap: Progress history as bit arrays
+
+        Returns:
+            int: Longest run of completed entries in days
+        """
+        missed = bitmap.recorded & ~bitmap.completed
+        longest = 0
+        low = 0
+        # Count the completed days between consecutive missed entries
+        while missed:
+            lowest = missed & -missed
+            position = lowest.bit_length() - 1
+            run = (bitmap.completed >> low) & ((1 << (position - low)) - 1)
+            longest = max(longest, popcount(run))
+            low = position + 1
+            missed ^= lowest
+        return max(longest, popcount(bitmap.completed >> low))
+
+
+def week_index(day: date) -> int:
+    """Return the consecutive index of the ISO week containing a day.
+
+    Weeks are counted from Monday 0001-01-01, so an index identifies one
+    ``(iso_year, iso_week)`` pair and consecutive weeks have consecutive
+    indexes, also across year boundaries.
+
+    Args:
+        day: Date within the week
+
+    Returns:
+        int: Week index
+    """
+    return (day.toordinal() - 1) // 7
+
+
+def week_key(index: int) -> Tuple[int, int]:
+    """Return the ISO year and week number of a week index.
+
+    Args:
+        index: Week index from ``week_index``
+
+    Returns:
+        Tuple[int, int]: ``(iso_year, iso_week)``
+    """
+    iso_year, iso_week, _ = date.fromordinal(index * 7 + 1).isocalendar()
+    return iso_year, iso_week
+
+
+def week_monday(index: int) -> date:
+    """Return the Monday of a week index.
+
+    Args:
+        index: Week index from ``week_index``
+
+    Returns:
+        date: First day of the week
+    """
+    return date.fromordinal(index * 7 + 1)
+
+
+def weekly_streaks(
+    completed_weeks: Set[int], latest_week: Optional[int]
+) -> Tuple[int, int]:
+    """Compute weekly streaks from the set of completed weeks.
+
+    Args:
+        completed_weeks: Indexes of weeks with at least one completed day
+        latest_week: Index of the week of the latest entry
+
+    Returns:
+        Tuple[int, int]: Run of completed weeks ending at the latest week
+            (0 if that week has no completion) and longest run
+    """
+    longest = 0
+    for week in completed_weeks:
+        if week - 1 in completed_weeks:
+            continue
+        end = week
+        while end + 1 in completed_weeks:
+            end += 1
+        longest = max(longest, end - week + 1)
+
+    current = 0
+    week = latest_week
+    while week in completed_weeks:
+        current += 1
+        week -= 1
+    return current, longest
+
 
 class WeeklyStreakCalculator(StreakCalculator):
     """Calculator for weekly streaks.
 
-    Counts number of unique weeks where the habit was completed.
+    A week is completed when the habit was completed on at least one of its
+    days. Counts consecutive completed ISO weeks, keyed by ISO year and
+    week so weeks of different years never collide.
     """
 
+    def _entry_weeks(
+        self, progress_entries: List["Progress"]
+    ) -> Tuple[Set[int], Optional[int]]:
+        """Return the completed weeks and the latest week of entries."""
+        completed_weeks = {
+            week_index(entry.date) for entry in progress_entries if entry.completed
+        }
+        latest = max((entry.date for entry in progress_entries), default=None)
+        return completed_weeks, week_index(latest) if latest else None
+
+    def _bitmap_weeks(
+        self, bitmap: ProgressBitmap
+    ) -> Tuple[Set[int], Optional[int]]:
+        """Return the completed weeks and the latest week of a bitmap."""
+        # Align bit 0 to the Monday of the origin's week
+        week = week_index(bitmap.origin)
+        bits = bitmap.completed << bitmap.origin.weekday()
+        completed_weeks: Set[int] = set()
+        while bits:
+            if bits & 0x7F:
+                completed_weeks.add(week)
+            bits >>= 7
+            week += 1
+        latest = bitmap.last_entry_date()
+        return completed_weeks, week_index(latest) if latest else None
+
     def calculate(self, progress_entries: List["Progress"]) -> int:
         """Calculate weekly streak.
 
@@ -73,14 +270,76 @@ class WeeklyStreakCalculator(StreakCalculator):
             progress_entries: List of Progress objects
 
         Returns:
-            int: Number of unique weeks with completions
+            int: Consecutive completed weeks up to the week of the latest entry
         """
-        completed_weeks: Set[int] = set()
-        for entry in progress_entries:
-            if entry.completed:
-                week_num = entry.date.isocalendar()[1]  # Get ISO week number
-                completed_weeks.add(week_num)
-        return len(completed_weeks)
+        return weekly_streaks(*self._entry_weeks(progress_entries))[0]
+
+    def longest(self, progress_entries: List["Progress"]) -> int:
+        """Calculate the longest weekly streak.
+
+        Args:
+            progress_entries: List of Progress objects
+
+        Returns:
+            int: Longest run of consecutive completed weeks
+        """
+        return weekly_streaks(*self._entry_weeks(progress_entries))[1]
+
+    def calculate_bitmap(self, bitmap: ProgressBitmap) -> int:
+        """Calculate weekly streak from a progress bitmap.
+
+        Args:
+            bitmap: Progress history as bit arrays
+
+        Returns:
+            int: Consecutive completed weeks up to the week of the latest entry
+        """
+        return weekly_streaks(*self._bitmap_weeks(bitmap))[0]
+
+    def longest_bitmap(self, bitmap: ProgressBitmap) -> int:
+        """Calculate the longest weekly streak from a progress bitmap.
+
+        Args:
+            bitmap: Progress history as bit arrays
+
+        Returns:
+            int: Longest run of consecutive completed weeks
+        """
+        return weekly_streaks(*self._bitmap_weeks(bitmap))[1]
+
+
+def streak_calculator(periodicity: str) -> StreakCalculator:
+    """Return the streak calculator for a habit periodicity.
+
+    Args:
+        periodicity: 'daily' or 'weekly'
+
+    Returns:
+        StreakCalculator: Calculator matching the periodicity
+    """
+    return (
+        DailyStreakCalculator() if periodicity == "daily" else WeeklyStreakCalculator()
+    )
+
+
+def completion_percentage(
+    completed: int, created_at: datetime, target_days: int
+) -> int:
+    """Calculate the completion rate of a habit from its completed day count.
+
+    Args:
+        completed: Number of completed days
+        created_at: When the habit was created
+        target_days: Goal duration in days
+
+    Returns:
+        int: Percentage of days completed (0-100)
+    """
+    total_days = min(
+        (datetime.now(timezone.utc).date() - created_at.date()).days + 1,
+        target_days,
+    )
+    return round((completed / total_days) * 100) if total_days > 0 else 0
 
 
 class User(db.Model, UserMixin):
@@ -91,6 +350,9 @@ class User(db.Model, UserMixin):
         username: Unique username
         email: Unique email address
         password: Hashed password
+        is_admin: Whether the user may access data of all users
+        data_version: Counter bumped on every write to the user's habits
+        data_updated_at: Time of the last write to the user's habits
         habits: Relationship to user's habits
     """
 
@@ -98,6 +360,11 @@ class User(db.Model, UserMixin):
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(256), nullable=False)
+    is_admin = db.Column(
+        db.Boolean, nullable=False, default=False, server_default=db.text("false")
+    )
+    data_version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    data_updated_at = db.Column(db.DateTime)
     habits = db.relationship("Habit", backref="user", lazy=True)
 
     def set_password(self, password: str) -> None:
@@ -120,6 +387,21 @@ class User(db.Model, UserMixin):
         return check_password_hash(self.password, password)
 
 
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidate_cached_user(mapper, connection, target: User) -> None:
+    """Drop a modified or deleted user from the user cache.
+
+    Args:
+        mapper: Mapper of the User model
+        connection: Connection executing the flush
+        target: The modified or deleted user
+    """
+    user_cache = get_cache("user_cache")
+    if user_cache is not None:
+        user_cache.invalidate(target.id)
+
+
 class Habit(db.Model):
     """Habit model for tracking user habits.
 
@@ -130,10 +412,19 @@ class Habit(db.Model):
         target_days: Goal duration in days
         created_at: When the habit was created
         user_id: Foreign key to owning user
+        version: Counter bumped on every write to the habit or its progress
+        updated_at: Time of the last write to the habit or its progress
         progress: Relationship to progress entries
+        stats: Relationship to the materialized statistics
+
+    Habits are listed per user in creation order through the composite
+    ``(user_id, created_at)`` index.
     """
 
     __tablename__ = "habit"
+    __table_args__ = (
+        db.Index("ix_habit_user_created", "user_id", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -141,24 +432,41 @@ class Habit(db.Model):
     target_days = db.Column(db.Integer, default=21)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    updated_at = db.Column(db.DateTime)
     progress = db.relationship(
         "Progress", backref="habit", lazy=True, cascade="all, delete-orphan"
     )
+    stats = db.relationship(
+        "HabitStats",
+        backref="habit",
+        lazy=True,
+        uselist=False,
+        cascade="all, delete-orphan",
+    )
 
     def current_streak(self) -> int:
         """Calculate current streak for the habit.
 
-        Uses appropriate calculator based on periodicity.
+        Reads the materialized statistics when present, otherwise uses
+        appropriate calculator based on periodicity.
 
         Returns:
             int: Current streak count
         """
-        calculator = (
-            DailyStreakCalculator()
-            if self.periodicity == "daily"
-            else WeeklyStreakCalculator()
-        )
-        return calculator.calculate(self.progress)
+        if self.stats is not None:
+            return self.stats.current_streak
+        return streak_calculator(self.periodicity).calculate(self.progress)
+
+    def longest_streak(self) -> int:
+        """Calculate longest streak for the habit.
+
+        Returns:
+            int: Longest streak count
+        """
+        if self.stats is not None:
+            return self.stats.longest_streak
+        return streak_calculator(self.periodicity).longest(self.progress)
 
     def completion_rate(self) -> int:
         """Calculate completion rate percentage.
@@ -166,12 +474,11 @@ class Habit(db.Model):
         Returns:
             int: Percentage of days completed (0-100)
         """
-        completed = len([p for p in self.progress if p.completed])
-        total_days = min(
-            (datetime.now(timezone.utc).date() - self.created_at.date()).days + 1,
-            self.target_days,
-        )
-        return round((completed / total_days) * 100) if total_days > 0 else 0
+        if self.stats is not None:
+            completed = self.stats.completed_count
+        else:
+            completed = len([p for p in self.progress if p.completed])
+        return completion_percentage(completed, self.created_at, self.target_days)
 
 
 class Progress(db.Model):
@@ -182,9 +489,220 @@ class Progress(db.Model):
         habit_id: Foreign key to parent habit
         date: Date of progress entry
         completed: Whether habit was completed
+
+    A habit has at most one entry per day, enforced by a unique composite
+    index on ``(habit_id, date)`` that also serves per-habit date lookups.
+    The ``date`` index serves the day range scans of the analytics rollups.
     """
 
+    __table_args__ = (
+        db.Index("ix_progress_habit_date", "habit_id", "date", unique=True),
+        db.Index("ix_progress_date", "date"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     habit_id = db.Column(db.Integer, db.ForeignKey("habit.id"), nullable=False)
     date = db.Column(db.Date, nullable=False, default=datetime.utcnow)
     completed = db.Column(db.Boolean, default=False)
+
+
+class HabitStats(db.Model):
+    """Materialized statistics of a habit.
+
+    Updated in the same transaction as every progress write, so reads do not
+    have to load the progress history.
+
+    Attributes:
+        habit_id: Primary key and foreign key to the habit
+        current_streak: Current streak count
+        longest_streak: Longest streak count
+        completed_count: Number of completed entries
+        last_completed_date: Date of the latest completed entry
+        last_entry_date: Date of the latest entry
+        weeks_before_latest: Consecutive completed weeks ending just before the
+            week of the latest entry, for weekly habits
+        bits_origin: Date of bit 0 of the progress bitmap
+        recorded_bits: Encoded bits of days with a progress entry
+        completed_bits: Encoded bits of completed days
+        version: Row version, incremented on every update
+    """
+
+    __tablename__ = "habit_stats"
+
+    habit_id = db.Column(db.Integer, db.ForeignKey("habit.id"), primary_key=True)
+    current_streak = db.Column(db.Integer, nullable=False, default=0)
+    longest_streak = db.Column(db.Integer, nullable=False, default=0)
+    completed_count = db.Column(db.Integer, nullable=False, default=0)
+    last_completed_date = db.Column(db.Date)
+    last_entry_date = db.Column(db.Date)
+    weeks_before_latest = db.Column(db.Integer)
+    bits_origin = db.Column(db.Date)
+    recorded_bits = db.Column(db.LargeBinary)
+    completed_bits = db.Column(db.LargeBinary)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    __mapper_args__ = {"version_id_col": version}
+
+    def __init__(self, **kwargs) -> None:
+        """Create statistics, defaulting all counters to zero.
+
+        Args:
+            **kwargs: Column values
+        """
+        kwargs.setdefault("current_streak", 0)
+        kwargs.setdefault("longest_streak", 0)
+        kwargs.setdefault("completed_count", 0)
+        super().__init__(**kwargs)
+
+    def bitmap(self) -> Optional[ProgressBitmap]:
+        """Decode the stored progress bitmap.
+
+        Returns:
+            Optional[ProgressBitmap]: Progress bitmap, None if not stored yet
+        """
+        if self.bits_origin is None:
+            return None
+        return ProgressBitmap.from_bytes(
+            self.bits_origin, self.recorded_bits or b"", self.completed_bits or b""
+        )
+
+    def store_bitmap(self, bitmap: ProgressBitmap) -> None:
+        """Encode and store a progress bitmap.
+
+        Args:
+            bitmap: Progress bitmap to store
+        """
+        self.bits_origin = bitmap.origin
+        self.recorded_bits, self.completed_bits = bitmap.to_bytes()
+
+
+class DailyRollup(db.Model):
+    """Progress counters of one day, per habit periodicity and target bucket.
+
+    Attributes:
+        day: Day of the counted progress entries
+        periodicity: Periodicity of the habits
+        target_bucket: Label of the habits' ``target_days`` range
+        entries: Number of progress entries
+        completions: Number of completed entries
+    """
+
+    __tablename__ = "daily_rollup"
+
+    day = db.Column(db.Date, primary_key=True)
+    periodicity = db.Column(db.String(20), primary_key=True)
+    target_bucket = db.Column(db.String(10), primary_key=True)
+    entries = db.Column(db.Integer, nullable=False, default=0)
+    completions = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DailyActiveUser(db.Model):
+    """User who recorded progress for a day.
+
+    Rows are kept when the habits they were recorded for are deleted, until
+    their day is rebuilt from the progress table.
+
+    Attributes:
+        day: Day of the progress entries
+        user_id: ID of the user owning the habits
+    """
+
+    __tablename__ = "daily_active_user"
+
+    day = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+
+class SyncVersion(db.Model):
+    """Latest change version of a user, for delta sync.
+
+    Writers advance the row of the owner whose records they change, which
+    keeps the row locked until they commit, so the versions of a user's
+    changes are committed in increasing order.
+
+    Attributes:
+        user_id: ID of the user
+        version: Version of the user's latest change
+    """
+
+    __tablename__ = "sync_version"
+
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ChangeLog(db.Model):
+    """Change to a habit or a progress entry, for delta sync.
+
+    Changes are numbered per user from the user's ``SyncVersion``; a client
+    that has applied the changes up to a version asks for the later ones.
+
+    Attributes:
+        id: Primary key
+        user_id: Owner of the changed habit
+        version: Version of the change among the user's changes
+        entity: 'habit' or 'progress'
+        habit_id: ID of the habit, or of the habit of the progress entry
+        day: Day of the progress entry, None for habit changes
+        completed: Completion state written to the progress entry
+        deleted: Whether the habit was deleted, with all its progress
+    """
+
+    __tablename__ = "change_log"
+    __table_args__ = (
+        db.Index("ix_change_log_user_version", "user_id", "version", unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    entity = db.Column(db.String(10), nullable=False)
+    habit_id = db.Column(db.Integer, nullable=False)
+    day = db.Column(db.Date)
+    completed = db.Column(db.Boolean)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+
+
+class Job(db.Model):
+    """Background job queued in the database.
+
+    Attributes:
+        id: Primary key
+        kind: Name of the registered handler
+        payload: JSON encoded handler arguments
+        dedup_key: Key shared by interchangeable jobs; at most one pending
+            job exists per key
+        status: 'pending', 'running' or 'failed'; finished jobs are deleted
+        attempts: Number of started runs
+        max_attempts: Runs allowed before the job fails
+        run_at: Earliest time the job may run
+        created_at: When the job was queued
+        started_at: When the latest run started
+        finished_at: When the job finished or failed
+        last_error: Error of the latest failed run
+    """
+
+    __tablename__ = "job"
+    __table_args__ = (
+        db.Index("ix_job_status_run_at", "status", "run_at"),
+        db.Index(
+            "ix_job_pending_dedup",
+            "dedup_key",
+            unique=True,
+            sqlite_where=db.text("status = 'pending'"),
+            postgresql_where=db.text("status = 'pending'"),
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default="{}")
+    dedup_key = db.Column(db.String(100))
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
@@ -0,0 +1,255 @@
+"""Password hashing offload and login attempt throttling.
+
+PBKDF2 hashing is CPU heavy, so it runs in a bounded process pool instead of
+the request worker. A login storm then queues up in front of the pool (or is
+rejected once the queue is full) rather than pinning every worker thread.
+Abusive retries are rejected by an in-memory attempt throttle before any
+hashing happens.
+"""
+
+import atexit
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full."""
+
+
+class HashingPool:
+    """Runs password hashing in a bounded pool of worker processes.
+
+    At most ``workers`` hashes run at the same time and at most
+    ``max_pending`` requests wait for or occupy a worker; further requests
+    wait up to ``queue_timeout`` seconds for a slot and then fail with
+    ``HashingBusy``. With ``workers`` set to 0 hashing runs inline.
+
+    Attributes:
+        workers: Number of worker processes
+        max_pending: Maximum number of queued and running hashes
+        queue_timeout: Seconds to wait for a free queue slot
+    """
+
+    def __init__(
+        self, workers: int = 2, max_pending: int = 32, queue_timeout: float = 5.0
+    ) -> None:
+        """Create the pool; worker processes start on first use.
+
+        The pool registers its shutdown at exit once its workers start.
+
+        Args:
+            workers: Number of worker processes, 0 to hash inline
+            max_pending: Maximum number of queued and running hashes
+            queue_timeout: Seconds to wait for a free queue slot
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+        self._exit_registered = False
+
+    def hash_password(self, password: str) -> str:
+        """Hash a password in the pool.
+
+        Args:
+            password: Plain text password
+
+        Returns:
+            str: Password hash
+
+        Raises:
+            HashingBusy: If the hashing queue is full
+        """
+        return self._run(generate_password_hash, password)
+
+    def check_password(self, password_hash: str, password: str) -> bool:
+        """Check a password against a hash in the pool.
+
+        Args:
+            password_hash: Stored password hash
+            password: Plain text password to verify
+
+        Returns:
+            bool: True if the password matches
+
+        Raises:
+            HashingBusy: If the hashing queue is full
+        """
+        return self._run(check_password_hash, password_hash, password)
+
+    def metrics(self) -> Dict[str, float]:
+        """Return queue depth and hash latency metrics.
+
+        Returns:
+            Dict[str, float]: ``queue_depth``, ``completed``, ``failed``,
+                ``rejected``, ``latency_avg_ms`` and ``latency_max_ms``; the
+                latencies cover completed hashes only
+        """
+        with self._lock:
+            average = self._total_seconds / self._completed if self._completed else 0
+            return {
+                "queue_depth": self._pending,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "latency_avg_ms": average * 1000,
+                "latency_max_ms": self._max_seconds * 1000,
+            }
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _run(self, func: Callable, *args: Any) -> Any:
+        """Run a hashing function in the pool, recording metrics.
+
+        Args:
+            func: Picklable hashing function
+            *args: Function arguments
+
+        Returns:
+            Any: Function result
+
+        Raises:
+            HashingBusy: If no queue slot frees up within ``queue_timeout``
+        """
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._rejected += 1
+            raise HashingBusy("Password hashing queue is full")
+
+        start = time.perf_counter()
+        with self._lock:
+            self._pending += 1
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                result = func(*args)
+            else:
+                result = executor.submit(func, *args).result()
+        except BaseException:
+            with self._lock:
+                self._failed += 1
+            raise
+        else:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._completed += 1
+                self._total_seconds += elapsed
+                self._max_seconds = max(self._max_seconds, elapsed)
+            return result
+        finally:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        """Return the process pool, starting it on first use."""
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers do not inherit the threads and open
+                # connections of the web worker
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                if not self._exit_registered:
+                    atexit.register(self.shutdown)
+                    self._exit_registered = True
+            return self._executor
+
+
+class LoginThrottle:
+    """In-memory sliding window throttle for authentication attempts.
+
+    Failed attempts are recorded per key, e.g. per account and per client
+    IP. A key is blocked once it reaches its limit within the window.
+
+    Attributes:
+        window: Length of the sliding window in seconds
+        max_keys: Maximum number of tracked keys
+    """
+
+    def __init__(
+        self,
+        window: float = 300.0,
+        max_keys: int = 100_000,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Create an empty throttle.
+
+        Args:
+            window: Length of the sliding window in seconds
+            max_keys: Maximum number of tracked keys, oldest are dropped first
+            timer: Monotonic clock
+        """
+        self.window = window
+        self.max_keys = max_keys
+        self._timer = timer
+        self._attempts: "OrderedDict[Hashable, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_blocked(self, key: Hashable, limit: int) -> bool:
+        """Check whether a key has used up its attempts.
+
+        Args:
+            key: Throttle key
+            limit: Maximum number of attempts within the window
+
+        Returns:
+            bool: True if further attempts must be rejected
+        """
+        with self._lock:
+            attempts = self._attempts.get(key)
+            if attempts is None:
+                return False
+            self._prune(attempts)
+            return len(attempts) >= limit
+
+    def record(self, key: Hashable) -> None:
+        """Record an attempt for a key.
+
+        Args:
+            key: Throttle key
+        """
+        with self._lock:
+            attempts = self._attempts.setdefault(key, deque())
+            self._attempts.move_to_end(key)
+            self._prune(attempts)
+            attempts.append(self._timer())
+            while len(self._attempts) > self.max_keys:
+                self._attempts.popitem(last=False)
+
+    def reset(self, key: Hashable) -> None:
+        """Forget the attempts of a key.
+
+        Args:
+            key: Throttle key
+        """
+        with self._lock:
+            self._attempts.pop(key, None)
+
+    def _prune(self, attempts: deque) -> None:
+        """Drop attempts that left the window."""
+        cutoff = self._timer() - self.window
+        while attempts and attempts[0] <= cutoff:
+            attempts.popleft()
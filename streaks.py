@@ -0,0 +1,349 @@
+"""Run-length encoded index of daily streaks.
+
+A daily streak is a run of completed entries that is not interrupted by a
+missed entry; days without an entry do not break it, as in
+``DailyStreakCalculator``. ``StreakIndex`` keeps the runs of a habit as
+sorted ``(start, end, length)`` arrays built in one pass over a progress
+bitmap, together with counters of the run lengths and of the gaps between
+runs. Current, longest and average streak and the gap statistics are read
+in constant or amortized logarithmic time, and writing a day only rebuilds
+the runs between the missed entries around it.
+
+Indexes are kept in the application's ``streak_cache`` per habit. A cached
+index is only used while its bitmap equals the habit's stored bitmap, and
+progress writes update it in place of a rebuild.
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bitmap import ProgressBitmap, popcount
+from cache import get_cache
+
+# First day, last day and number of completed entries of a streak
+Run = Tuple[date, date, int]
+
+
+class _MaxCounter:
+    """Multiset of non-negative integers with its maximum and total."""
+
+    def __init__(self) -> None:
+        """Create an empty multiset."""
+        self._counts: Counter = Counter()
+        # Max-heap of distinct values, cleaned lazily when a value is gone
+        self._heap: List[int] = []
+        self.total = 0
+        self.size = 0
+
+    def add(self, value: int) -> None:
+        """Add a value in O(log n)."""
+        if not self._counts[value]:
+            heapq.heappush(self._heap, -value)
+        self._counts[value] += 1
+        self.total += value
+        self.size += 1
+
+    def remove(self, value: int) -> None:
+        """Remove one occurrence of a value in O(1)."""
+        self._counts[value] -= 1
+        if not self._counts[value]:
+            del self._counts[value]
+        self.total -= value
+        self.size -= 1
+
+    def max(self) -> int:
+        """Return the largest value, 0 if empty, in amortized O(log n)."""
+        while self._heap and -self._heap[0] not in self._counts:
+            heapq.heappop(self._heap)
+        return -self._heap[0] if self._heap else 0
+
+    def mean(self) -> float:
+        """Return the average value, 0.0 if empty."""
+        return self.total / self.size if self.size else 0.0
+
+    def copy(self) -> "_MaxCounter":
+        """Return an independent copy of the multiset."""
+        clone = _MaxCounter()
+        clone._counts = self._counts.copy()
+        clone._heap = self._heap.copy()
+        clone.total = self.total
+        clone.size = self.size
+        return clone
+
+
+class StreakIndex:
+    """Daily streaks of a habit as run-length encoded runs.
+
+    Attributes:
+        bitmap: Progress history the runs are derived from
+    """
+
+    def __init__(self, bitmap: ProgressBitmap) -> None:
+        """Index the runs of a progress bitmap in one pass.
+
+        Args:
+            bitmap: Progress history, kept and updated by ``set``
+        """
+        self.bitmap = bitmap
+        # Day ordinals of the first and last entry and length of every run
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        self._lengths: List[int] = []
+        self._runs = _MaxCounter()
+        self._gaps = _MaxCounter()
+        self._splice(0, 0, self._window_runs(-1, None))
+
+    @classmethod
+    def from_entries(cls, origin: date, entries: Iterable) -> "StreakIndex":
+        """Index progress entries.
+
+        Args:
+            origin: Preferred date of bit 0
+            entries: Progress entries (or rows with ``date`` and ``completed``)
+
+        Returns:
+            StreakIndex: Index of the entries
+        """
+        return cls(ProgressBitmap.from_entries(origin, entries))
+
+    def copy(self) -> "StreakIndex":
+        """Return an independent copy of the index and its bitmap.
+
+        Returns:
+            StreakIndex: Copy that can be updated without affecting this one
+        """
+        clone = StreakIndex.__new__(StreakIndex)
+        clone.bitmap = ProgressBitmap(
+            self.bitmap.origin, self.bitmap.recorded, self.bitmap.completed
+        )
+        clone._starts = self._starts.copy()
+        clone._ends = self._ends.copy()
+        clone._lengths = self._lengths.copy()
+        clone._runs = self._runs.copy()
+        clone._gaps = self._gaps.copy()
+        return clone
+
+    def indexes(self, bitmap: ProgressBitmap) -> bool:
+        """Return whether the index was built from the same history.
+
+        Args:
+            bitmap: Progress history to compare with
+
+        Returns:
+            bool: True if the origins and bit arrays are equal
+        """
+        return (
+            self.bitmap.origin == bitmap.origin
+            and self.bitmap.recorded == bitmap.recorded
+            and self.bitmap.completed == bitmap.completed
+        )
+
+    def _window_runs(self, low: int, high: Optional[int]) -> List[Tuple[int, int, int]]:
+        """Find the runs between two bit offsets, both exclusive.
+
+        Args:
+            low: Offset before the window, -1 for the start of the history
+            high: Offset after the window, None for the end of the history
+
+        Returns:
+            List[Tuple[int, int, int]]: Start and end ordinals and lengths
+        """
+        missed = self.bitmap.recorded & ~self.bitmap.completed
+        completed = self.bitmap.completed
+        if high is not None:
+            missed &= (1 << high) - 1
+            completed &= (1 << high) - 1
+        base = low + 1
+        missed >>= base
+        completed >>= base
+        origin = self.bitmap.origin.toordinal()
+
+        runs = []
+        while True:
+            # Completed entries up to the next missed entry form one run
+            lowest = missed & -missed
+            segment = completed & (lowest - 1) if lowest else completed
+            if segment:
+                first = (segment & -segment).bit_length() - 1
+                last = segment.bit_length() - 1
+                runs.append(
+                    (origin + base + first, origin + base + last, popcount(segment))
+                )
+            if not lowest:
+                return runs
+            shift = lowest.bit_length()
+            missed >>= shift
+            completed >>= shift
+            base += shift
+
+    def _gap(self, index: int) -> int:
+        """Return the number of days between a run and the one before it."""
+        return self._starts[index] - self._ends[index - 1] - 1
+
+    def _splice(self, start: int, stop: int, runs: List[Tuple[int, int, int]]) -> None:
+        """Replace the runs ``start:stop`` and update the counters.
+
+        Args:
+            start: Index of the first replaced run
+            stop: Index after the last replaced run
+            runs: New runs in date order
+        """
+        for index in range(max(start, 1), min(stop, len(self._starts) - 1) + 1):
+            self._gaps.remove(self._gap(index))
+        for length in self._lengths[start:stop]:
+            self._runs.remove(length)
+
+        self._starts[start:stop] = [run[0] for run in runs]
+        self._ends[start:stop] = [run[1] for run in runs]
+        self._lengths[start:stop] = [run[2] for run in runs]
+
+        for _, _, length in runs:
+            self._runs.add(length)
+        last = min(start + len(runs), len(self._starts) - 1)
+        for index in range(max(start, 1), last + 1):
+            self._gaps.add(self._gap(index))
+
+    def set(self, day: date, completed: bool) -> None:
+        """Record the completion state of a day and update the runs.
+
+        Only the runs between the nearest missed entries before and after
+        the day can change; they are located by bisection and rebuilt from
+        the bitmap.
+
+        Args:
+            day: Date of the entry
+            completed: Whether the habit was completed that day
+        """
+        if self.bitmap.get(day) == completed:
+            return
+        self.bitmap.set(day, completed)
+
+        offset = self.bitmap.offset(day)
+        missed = self.bitmap.recorded & ~self.bitmap.completed
+        low = (missed & ((1 << offset) - 1)).bit_length() - 1
+        above = missed >> (offset + 1)
+        high = offset + (above & -above).bit_length() if above else None
+
+        origin = self.bitmap.origin.toordinal()
+        first = bisect_right(self._starts, origin + low)
+        stop = (
+            len(self._starts)
+            if high is None
+            else bisect_left(self._starts, origin + high)
+        )
+        self._splice(first, stop, self._window_runs(low, high))
+
+    @property
+    def count(self) -> int:
+        """Number of streaks."""
+        return len(self._lengths)
+
+    @property
+    def current(self) -> int:
+        """Completed entries since the latest missed entry."""
+        if not self._ends or not self.bitmap.recorded:
+            return 0
+        latest = self.bitmap.origin.toordinal() + self.bitmap.recorded.bit_length() - 1
+        return self._lengths[-1] if self._ends[-1] == latest else 0
+
+    @property
+    def longest(self) -> int:
+        """Length of the longest streak."""
+        return self._runs.max()
+
+    @property
+    def average(self) -> float:
+        """Average streak length."""
+        return self._runs.mean()
+
+    @property
+    def longest_gap(self) -> int:
+        """Most days between two consecutive streaks."""
+        return self._gaps.max()
+
+    @property
+    def average_gap(self) -> float:
+        """Average number of days between consecutive streaks."""
+        return self._gaps.mean()
+
+    def runs(self, limit: Optional[int] = None) -> List[Run]:
+        """Return the streaks in date order.
+
+        Args:
+            limit: Only return the latest ``limit`` streaks
+
+        Returns:
+            List[Run]: First day, last day and length of every streak
+        """
+        start = 0 if limit is None else max(len(self._starts) - limit, 0)
+        return [
+            (date.fromordinal(first), date.fromordinal(last), length)
+            for first, last, length in zip(
+                self._starts[start:], self._ends[start:], self._lengths[start:]
+            )
+        ]
+
+    def summary(self, limit: int = 5) -> Dict:
+        """Return the streak statistics.
+
+        Args:
+            limit: Number of latest streaks listed
+
+        Returns:
+            Dict: ``current``, ``longest``, ``average``, ``count``,
+                ``longest_gap``, ``average_gap`` and the latest ``runs``
+        """
+        return {
+            "current": self.current,
+            "longest": self.longest,
+            "average": self.average,
+            "count": self.count,
+            "longest_gap": self.longest_gap,
+            "average_gap": self.average_gap,
+            "runs": self.runs(limit),
+        }
+
+
+def cached_streak_index(habit_id: int, bitmap: ProgressBitmap) -> StreakIndex:
+    """Return the cached index of a habit's history, building it on a miss.
+
+    Args:
+        habit_id: Habit the history belongs to
+        bitmap: Stored progress history of the habit
+
+    Returns:
+        StreakIndex: Index of the history
+    """
+    indexes = get_cache("streak_cache")
+    index = indexes.get(habit_id) if indexes is not None else None
+    if index is None or not index.indexes(bitmap):
+        index = StreakIndex(bitmap)
+        if indexes is not None:
+            indexes.set(habit_id, index)
+    return index
+
+
+def update_cached_streaks(habit_id: int, day: date, completed: bool) -> None:
+    """Apply a progress write to the cached index of a habit, if any.
+
+    A copy of the index is updated and cached, so readers holding the old
+    index are not affected. If the write is rolled back, the updated index
+    no longer matches the stored bitmap and is rebuilt on the next read.
+
+    Args:
+        habit_id: Written habit
+        day: Date of the entry
+        completed: Whether the habit was completed that day
+    """
+    indexes = get_cache("streak_cache")
+    if indexes is None:
+        return
+    index = indexes.get(habit_id)
+    if index is None:
+        return
+    index = index.copy()
+    index.set(day, completed)
+    indexes.set(habit_id, index)
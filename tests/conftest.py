@@ -8,18 +8,21 @@ from db import db as _db
 
 
 @pytest.fixture
-def app():
+def app(tmp_path):
     """Create and configure a test Flask application.
 
+    Args:
+        tmp_path (pathlib.Path): Temporary directory for the activity log.
+
     Yields:
         Flask: Configured Flask application for testing.
     """
-    app = create_app()
-    app.config.update(
+    app = create_app(
         {
             "TESTING": True,
             "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
             "WTF_CSRF_ENABLED": False,
+            "ACTIVITY_LOG_PATH": str(tmp_path / "activity.log"),
         }
     )
 
@@ -28,6 +31,7 @@ def app():
         yield app
         _db.session.remove()
         _db.drop_all()
+    app.extensions["activity_logger"].close()
 
 
 @pytest.fixture
@@ -27,3 +27,167 @@ def test_db_init(app):
         except Exception:
             db.session.rollback()
             assert True
+
+
+def test_upgrade_schema_deduplicates_progress(app):
+    """Test the progress index migration on a database created without it.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    with app.app_context():
+        from datetime import date
+        from sqlalchemy import text
+        from db import db
+        from migrations import upgrade_schema
+
+        db.session.execute(text("DROP INDEX ix_progress_habit_date"))
+        for completed in (0, 1):
+            db.session.execute(
+                text(
+                    "INSERT INTO progress (habit_id, date, completed) "
+                    "VALUES (1, :date, :completed)"
+                ),
+                {"date": date.today(), "completed": completed},
+            )
+        db.session.commit()
+
+        assert "add_progress_habit_date_index" in upgrade_schema()
+        assert upgrade_schema() == []
+        rows = db.session.execute(text("SELECT completed FROM progress")).all()
+        assert [row.completed for row in rows] == [1]
+
+
+def test_upgrade_schema_rebuilds_weekly_stats(app, test_user):
+    """Test weekly streaks stored by older versions are recomputed.
+
+    Args:
+        app (Flask): The Flask application instance.
+        test_user (User): A fixture providing a test user.
+    """
+    with app.app_context():
+        from sqlalchemy import text
+        from db import db
+        from habits.factory import HabitFactory
+        from habits.progress import record_progress
+        from migrations import upgrade_schema
+        from models import HabitStats
+
+        habit = HabitFactory.create("Run", "weekly", 1, 28)
+        db.session.add(habit)
+        db.session.commit()
+        record_progress(habit, habit.created_at.date(), True)
+        db.session.commit()
+        db.session.execute(
+            text("UPDATE habit_stats SET current_streak = 3, longest_streak = 3")
+        )
+        db.session.commit()
+
+        assert "rebuild_weekly_stats" in upgrade_schema()
+        assert upgrade_schema() == []
+        stats = db.session.get(HabitStats, habit.id)
+        assert (stats.current_streak, stats.longest_streak) == (1, 1)
+
+
+def test_sqlite_file_connection_settings(tmp_path):
+    """Test pragmas, pooling and immediate write transactions on a file.
+
+    Args:
+        tmp_path (pathlib.Path): Temporary directory for the database file.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.pool import QueuePool
+    from app import create_app
+    from db import begin_immediate, db
+    from models import User
+
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'habits.db'}",
+            "WTF_CSRF_ENABLED": False,
+            "ACTIVITY_LOG_PATH": str(tmp_path / "activity.log"),
+        }
+    )
+    with app.app_context():
+        db.create_all()
+        assert isinstance(db.engine.pool, QueuePool)
+        pragmas = {
+            name: db.session.execute(f"PRAGMA {name}").scalar()
+            for name in ("journal_mode", "synchronous", "busy_timeout")
+        }
+        assert pragmas == {
+            "journal_mode": "wal",
+            "synchronous": 1,
+            "busy_timeout": 5000,
+        }
+        db.session.remove()
+
+    with app.test_request_context("/register", method="POST"):
+        db.session.add(User(username="writer", email="w@example.com", password="x"))
+        db.session.commit()
+        assert User.query.count() == 1
+        db.session.remove()
+
+    # Writers outside write requests ask for an immediate transaction
+    with app.app_context():
+        statements = []
+        event.listen(
+            db.engine,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+        User.query.count()
+        db.session.rollback()
+        begin_immediate()
+        User.query.count()
+        db.session.rollback()
+        assert [s for s in statements if s.startswith("BEGIN")] == [
+            "BEGIN",
+            "BEGIN IMMEDIATE",
+        ]
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_upgrade_schema_versions_logged_changes(app, test_user):
+    """Test changes logged before per-user versions keep their ID as version.
+
+    Args:
+        app (Flask): The Flask application instance.
+        test_user (User): A fixture providing a test user.
+    """
+    with app.app_context():
+        from sqlalchemy import text
+        from db import db
+        from habits.factory import HabitFactory
+        from habits.sync import sync_changes
+        from migrations import upgrade_schema
+        from models import SyncVersion
+
+        db.session.execute(text("DROP TABLE change_log"))
+        db.session.execute(
+            text(
+                "CREATE TABLE change_log (id INTEGER PRIMARY KEY, "
+                "user_id INTEGER NOT NULL, entity VARCHAR(10) NOT NULL, "
+                "habit_id INTEGER NOT NULL, day DATE, completed BOOLEAN, "
+                "deleted BOOLEAN NOT NULL)"
+            )
+        )
+        db.session.execute(
+            text(
+                "INSERT INTO change_log (id, user_id, entity, habit_id, deleted) "
+                "VALUES (7, 1, 'habit', 3, 0), (9, 1, 'habit', 3, 1)"
+            )
+        )
+        db.session.commit()
+
+        assert "backfill_change_versions" in upgrade_schema()
+        assert upgrade_schema() == []
+        assert db.session.get(SyncVersion, 1).version == 9
+
+        habit = HabitFactory.create("Read", "daily", 1, 21)
+        db.session.add(habit)
+        db.session.commit()
+        changes = sync_changes(1, 7)
+        assert (changes["version"], changes["deleted"]) == (10, [3])
@@ -16,3 +16,54 @@ def test_login(client, test_user):
         follow_redirects=True,
     )
     assert response.status_code == 200
+
+
+def test_user_cache(app, client, test_user):
+    """Test logged in users are cached and invalidated on update.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+    """
+    from db import db
+    from models import User
+
+    client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "Test1234!"},
+        follow_redirects=True,
+    )
+    user_cache = app.extensions["user_cache"]
+    client.get("/")
+    client.get("/")
+    assert user_cache.stats()["hits"] >= 1
+    assert user_cache.get(1) is not None
+
+    user = db.session.get(User, 1)
+    user.username = "renamed"
+    db.session.commit()
+    assert user_cache.get(1) is None
+
+
+def test_login_throttle(app, client, test_user):
+    """Test repeated failed logins are rejected before hashing.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+    """
+    hashing_pool = app.extensions["hashing_pool"]
+    for _ in range(app.config["LOGIN_MAX_ATTEMPTS_PER_ACCOUNT"]):
+        response = client.post(
+            "/login", data={"email": "test@example.com", "password": "wrong"}
+        )
+        assert response.status_code == 200
+    hashed = hashing_pool.metrics()["completed"]
+
+    response = client.post(
+        "/login", data={"email": "test@example.com", "password": "Test1234!"}
+    )
+    assert response.status_code == 429
+    assert hashing_pool.metrics()["completed"] == hashed
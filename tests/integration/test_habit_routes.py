@@ -2,6 +2,10 @@
 Integration tests for habit-related routes.
 """
 
+import json
+
+import pytest
+
 
 def test_add_habit(client, test_user):
     """Test adding a new habit.
@@ -24,3 +28,786 @@ def test_add_habit(client, test_user):
         follow_redirects=True,
     )
     assert response.status_code == 200
+
+
+def _count_dashboard_queries(client, app, habit_count):
+    """Seed habits with a week of progress and count dashboard queries.
+
+    Args:
+        client (FlaskClient): Logged in test client.
+        app (Flask): The Flask application instance.
+        habit_count (int): Number of habits to create.
+
+    Returns:
+        int: Number of SQL statements executed while rendering the dashboard.
+    """
+    from datetime import date, timedelta
+    from sqlalchemy import event
+    from db import db
+    from habits.factory import HabitFactory
+    from habits.progress import record_progress
+
+    for i in range(habit_count):
+        habit = HabitFactory.create(f"Habit {i}", "daily", 1, 21)
+        db.session.add(habit)
+        db.session.flush()
+        for offset in range(7, 0, -1):
+            record_progress(habit, date.today() - timedelta(days=offset), True)
+    db.session.commit()
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db.get_engine(app)
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.get("/")
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_dashboard_query_count_is_bounded(app, client, test_user):
+    """Test the dashboard runs a fixed number of queries for many habits.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+    """
+    client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "Test1234!"},
+        follow_redirects=True,
+    )
+
+    few = _count_dashboard_queries(client, app, 1)
+    many = _count_dashboard_queries(client, app, 50)
+
+    assert many == few
+    assert many <= 4
+
+
+def test_mark_habit_upserts_single_entry(app, client, test_user):
+    """Test repeated marks for the same day update one progress row.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+    """
+    from db import db
+    from models import Habit, Progress
+
+    client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "Test1234!"},
+        follow_redirects=True,
+    )
+    habit = Habit(name="Read", periodicity="daily", user_id=1)
+    db.session.add(habit)
+    db.session.commit()
+
+    client.post(f"/{habit.id}/mark/true")
+    client.post(f"/{habit.id}/mark/false")
+
+    entries = Progress.query.filter_by(habit_id=habit.id).all()
+    assert len(entries) == 1
+    assert entries[0].completed is False
+
+    # Both marks are recorded by the asynchronous activity log
+    assert app.extensions["activity_logger"].flush()
+    with open(app.config["ACTIVITY_LOG_PATH"]) as log:
+        records = [json.loads(line) for line in log]
+    assert [record["activity"] for record in records] == ["mark_habit"] * 2
+    assert records[0]["user_id"] == 1
+
+
+def test_progress_api_updates_stats(app, client, test_user):
+    """Test progress writes keep the materialized statistics up to date.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+    """
+    from datetime import date, datetime, timedelta
+    from db import db
+    from habits.factory import HabitFactory
+    from habits.stats import rebuild_stats
+
+    client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "Test1234!"},
+        follow_redirects=True,
+    )
+    habit = HabitFactory.create("Run", "daily", 1, 21)
+    habit.created_at = datetime.utcnow() - timedelta(days=5)
+    db.session.add(habit)
+    db.session.commit()
+
+    updates = [(4, True), (3, True), (2, False), (1, True), (0, True), (2, True)]
+    for offset, completed in updates:
+        day = (date.today() - timedelta(days=offset)).isoformat()
+        response = client.post(
+            "/api/progress",
+            json={"habit_id": habit.id, "date": day, "completed": completed},
+        )
+        assert response.status_code == 200
+
+    assert response.get_json()["streak"] == 5
+    assert habit.stats.longest_streak == 5
+    assert habit.stats.completed_count == 5
+    assert rebuild_stats(dry_run=True) == []
+
+    page = client.get(f"/{habit.id}").get_data(as_text=True)
+    assert "Streak History" in page
+    assert "<td>5</td>" in page
+
+
+def test_progress_batch_api(app, client, test_user):
+    """Test batch progress updates across habits and their validation.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+    """
+    from datetime import date, timedelta
+    from db import db
+    from habits.factory import HabitFactory
+    from models import Progress
+
+    client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "Test1234!"},
+        follow_redirects=True,
+    )
+    first = HabitFactory.create("Read", "daily", 1, 21)
+    second = HabitFactory.create("Swim", "weekly", 1, 21)
+    db.session.add_all([first, second])
+    db.session.commit()
+
+    today = date.today().isoformat()
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    updates = [
+        {"habit_id": first.id, "date": today, "completed": False},
+        {"habit_id": second.id, "date": tomorrow, "completed": True},
+        {"habit_id": first.id, "date": today, "completed": True},
+    ]
+
+    response = client.post("/api/progress/batch", json={"updates": updates})
+    assert response.status_code == 200
+    assert response.get_json()["habits"] == [
+        {"habit_id": first.id, "streak": 1, "completion_rate": 100},
+        {"habit_id": second.id, "streak": 1, "completion_rate": 100},
+    ]
+    assert Progress.query.count() == 2
+
+    invalid = [
+        {"habit_id": first.id, "date": "2000-01-01", "completed": True},
+        {"habit_id": 999, "date": today, "completed": True},
+        {"habit_id": [first.id], "date": today, "completed": True},
+        {"habit_id": first.id, "date": today, "completed": "false"},
+    ]
+    response = client.post("/api/progress/batch", json={"updates": invalid})
+    assert response.status_code == 400
+    assert [
+        (error["index"], error["error"]) for error in response.get_json()["errors"]
+    ] == [
+        (0, "Date outside habit period"),
+        (1, "Habit not found"),
+        (2, "Habit not found"),
+        (3, "Invalid completed"),
+    ]
+
+
+def test_conditional_get(app, client, test_user):
+    """Test dashboard and detail answer 304 until a write bumps their version.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+    """
+    from datetime import datetime, timedelta
+    from db import db
+    from habits.factory import HabitFactory
+
+    client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "Test1234!"},
+        follow_redirects=True,
+    )
+    tomorrow = (datetime.utcnow().date() + timedelta(days=1)).isoformat()
+    habit = HabitFactory.create("Read", "daily", 1, 21)
+    db.session.add(habit)
+    db.session.commit()
+
+    for url in ("/", f"/{habit.id}"):
+        etag = client.get(url).headers["ETag"]
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+        # Marking the habit flashes a message, which is shown once
+        client.post(f"/{habit.id}/mark/true")
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+        client.post(
+            "/api/progress",
+            json={"habit_id": habit.id, "date": tomorrow, "completed": True},
+        )
+        fresh = client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+        assert fresh.status_code == 200
+
+    assert client.get("/999").status_code == 404
+
+
+def test_dashboard_renders_changed_cards_only(app, client, test_user):
+    """Test cached habit cards are reused until their habit is written.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+    """
+    from db import db
+    from habits.factory import HabitFactory
+
+    client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "Test1234!"},
+        follow_redirects=True,
+    )
+    habits = [HabitFactory.create(f"Habit {n}", "daily", 1, 21) for n in range(3)]
+    db.session.add_all(habits)
+    db.session.commit()
+    fragments = app.extensions["fragment_cache"]
+    fragments.clear()
+
+    client.get("/")
+    assert fragments.stats()["misses"] == 3
+    client.post(f"/{habits[0].id}/mark/true")
+    response = client.get("/")
+
+    assert fragments.stats()["misses"] == 4
+    assert fragments.stats()["hits"] == 2
+    assert b"Streak: 1 days" in response.data
+
+
+def test_export_streams_history(app, client, test_user):
+    """Test NDJSON and gzip CSV exports and the admin-only full export.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+    """
+    import csv
+    import gzip
+    import io
+    from datetime import date, timedelta
+    from db import db
+    from habits.factory import HabitFactory
+    from habits.progress import record_progress
+
+    client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "Test1234!"},
+        follow_redirects=True,
+    )
+    read = HabitFactory.create("Read", "daily", 1, 21)
+    walk = HabitFactory.create("Walk", "weekly", 1, 21)
+    db.session.add_all([read, walk])
+    db.session.flush()
+    for offset in range(3):
+        record_progress(read, date.today() + timedelta(days=offset), offset != 1)
+    db.session.commit()
+
+    response = client.get("/export")
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(row["habit_name"], row["completed"]) for row in rows] == [
+        ("Read", True),
+        ("Read", False),
+        ("Read", True),
+        ("Walk", None),
+    ]
+
+    response = client.get("/export?format=csv&gzip=1")
+    assert response.mimetype == "application/gzip"
+    text = gzip.decompress(response.data).decode("utf-8")
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert len(rows) == 4
+    assert rows[0]["date"] == date.today().isoformat()
+
+    assert client.get("/export?format=xml").status_code == 400
+    assert client.get("/admin/export").status_code == 403
+
+
+def test_import_upload(app, client, test_user):
+    """Test a progress upload is validated per record and bulk written.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+    """
+    import io
+    from datetime import date, timedelta
+    from db import db
+    from habits.factory import HabitFactory
+    from models import Habit, Progress, User
+
+    client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "Test1234!"},
+        follow_redirects=True,
+    )
+    other = User(username="other", email="other@example.com", password="x")
+    db.session.add(other)
+    db.session.flush()
+    habit = HabitFactory.create("Read", "daily", 1, 21)
+    foreign = HabitFactory.create("Walk", "daily", other.id, 21)
+    db.session.add_all([habit, foreign])
+    db.session.commit()
+
+    def record(habit_id, offset, completed=True):
+        day = (date.today() + timedelta(days=offset)).isoformat()
+        return {"habit_id": habit_id, "date": day, "completed": completed}
+
+    records = [record(habit.id, offset) for offset in range(3)] + [
+        record(habit.id, 30),  # outside the habit period
+        record(foreign.id, 0),  # another user's habit
+        record(habit.id, 0, "maybe"),
+    ]
+    data = "\n".join(json.dumps(record) for record in records) + "\nnot json\n"
+    response = client.post(
+        "/import",
+        data={"file": (io.BytesIO(data.encode()), "history.ndjson")},
+        content_type="multipart/form-data",
+    )
+
+    report = response.get_json()
+    assert report["rows"] == 7
+    assert report["imported"] == 3
+    assert [error["line"] for error in report["errors"]] == [4, 5, 6, 7]
+    assert Progress.query.filter_by(habit_id=habit.id).count() == 3
+    assert Progress.query.filter_by(habit_id=foreign.id).count() == 0
+    assert db.session.get(Habit, habit.id).stats.completed_count == 3
+
+    response = client.post(
+        "/import",
+        data={"file": (io.BytesIO(b"a,b\n1,2\n"), "history.csv")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 400
+
+
+def test_export_import_round_trip(app, client, test_user):
+    """Test NDJSON and CSV exports import back into the same history.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+    """
+    import gzip
+    import io
+    from datetime import date, timedelta
+    from db import db
+    from habits.factory import HabitFactory
+    from habits.progress import record_progress
+    from models import Progress
+
+    client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "Test1234!"},
+        follow_redirects=True,
+    )
+    read = HabitFactory.create("Read", "daily", 1, 21)
+    walk = HabitFactory.create("Walk", "weekly", 1, 21)
+    db.session.add_all([read, walk])
+    db.session.flush()
+    for offset in range(4):
+        record_progress(read, date.today() + timedelta(days=offset), offset != 2)
+    db.session.commit()
+
+    def history():
+        return sorted((p.habit_id, p.date, p.completed) for p in Progress.query.all())
+
+    exported = history()
+    for output_format in ("ndjson", "csv"):
+        data = client.get(f"/export?format={output_format}&gzip=1").data
+        Progress.query.delete()
+        db.session.commit()
+
+        response = client.post(
+            "/import",
+            data={"file": (io.BytesIO(data), f"export.{output_format}.gz")},
+            content_type="multipart/form-data",
+        )
+        report = response.get_json()
+        assert (report["imported"], report["skipped"]) == (4, 1)
+        assert report["error_count"] == 0
+        db.session.expire_all()
+        assert history() == exported
+
+    truncated = gzip.compress(b'{"habit_id": 1}\n')[:-8]
+    response = client.post(
+        "/import",
+        data={"file": (io.BytesIO(truncated), "export.ndjson.gz")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 400
+
+
+def test_failed_import_finalises_committed_chunks(app, test_user):
+    """Test the chunks committed before an import fails update the stats.
+
+    Args:
+        app (Flask): The Flask application instance.
+        test_user (User): A fixture providing a test user.
+    """
+    from datetime import date, timedelta
+    from db import db
+    from habits.factory import HabitFactory
+    from habits.importer import import_progress
+    from models import Habit
+
+    habit = HabitFactory.create("Read", "daily", 1, 21)
+    db.session.add(habit)
+    db.session.commit()
+
+    def records():
+        for offset in range(3):
+            day = (date.today() + timedelta(days=offset)).isoformat()
+            yield offset + 1, (habit.id, day, True)
+        raise OSError("Upload interrupted")
+
+    with pytest.raises(OSError):
+        import_progress(records(), user_id=1, chunk_size=2)
+    assert db.session.get(Habit, habit.id).stats.completed_count == 2
+
+
+def test_read_api_pages_with_cursors(app, client, test_user):
+    """Test keyset pagination, field selection and date filters.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+    """
+    from datetime import datetime, timedelta
+    from db import db
+    from habits.factory import HabitFactory
+    from habits.progress import record_progress
+
+    client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "Test1234!"},
+        follow_redirects=True,
+    )
+    created_at = datetime.utcnow() - timedelta(days=29)
+    habits = []
+    for number in range(3):
+        habit = HabitFactory.create(f"Habit {number}", "daily", 1, 30)
+        habit.created_at = created_at
+        db.session.add(habit)
+        db.session.flush()
+        habits.append(habit)
+    for offset in range(30):
+        day = created_at.date() + timedelta(days=offset)
+        record_progress(habits[0], day, offset % 3 > 0)
+    db.session.commit()
+
+    first = client.get("/api/habits?limit=2&fields=id,name,current_streak").get_json()
+    assert [item["name"] for item in first["items"]] == ["Habit 0", "Habit 1"]
+    assert set(first["items"][0]) == {"id", "name", "current_streak"}
+    assert first["items"][0]["current_streak"] == 2
+    second = client.get(f"/api/habits?limit=2&cursor={first['next_cursor']}").get_json()
+    assert [item["id"] for item in second["items"]] == [habits[2].id]
+    assert second["next_cursor"] is None
+
+    url = f"/api/habits/{habits[0].id}/progress"
+    days = []
+    cursor = ""
+    while True:
+        page = client.get(f"{url}?limit=7&fields=date&cursor={cursor}").get_json()
+        days.extend(item["date"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(days) == 30
+    assert days == sorted(days)
+
+    start = (created_at.date() + timedelta(days=10)).isoformat()
+    end = (created_at.date() + timedelta(days=12)).isoformat()
+    window = client.get(f"{url}?from={start}&to={end}").get_json()["items"]
+    assert [(item["date"], item["completed"]) for item in window] == [
+        (start, True),
+        ((created_at.date() + timedelta(days=11)).isoformat(), True),
+        (end, False),
+    ]
+
+    assert client.get(f"{url}?fields=secret").status_code == 400
+    assert client.get(f"{url}?cursor=garbage").status_code == 400
+    assert client.get(f"{url}?limit=0").status_code == 400
+    assert client.get(f"{url}?limit=ten").status_code == 400
+    assert client.get("/api/habits/999/progress").status_code == 404
+
+
+def test_mark_toggles_are_coalesced(app, client, test_user):
+    """Test buffered toggles collapse and are visible before the flush.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+    """
+    from datetime import datetime
+    from db import db
+    from habits.factory import HabitFactory
+    from habits.write_buffer import ProgressWriteBuffer
+    from models import Progress
+
+    buffer = ProgressWriteBuffer(app, window=60)
+    app.extensions["write_buffer"] = buffer
+    client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "Test1234!"},
+        follow_redirects=True,
+    )
+    habit = HabitFactory.create("Read", "daily", 1, 21)
+    db.session.add(habit)
+    db.session.commit()
+
+    for completed in ("true", "false", "true"):
+        response = client.post(f"/{habit.id}/mark/{completed}")
+        assert response.status_code == 302
+    assert Progress.query.count() == 0
+    assert buffer.stats()["coalesced"] == 2
+
+    dashboard = client.get("/")
+    assert "Streak: 1 days" in dashboard.get_data(as_text=True)
+    assert "ETag" not in dashboard.headers
+
+    # Other requests read the database after the user's pending writes are
+    # stored; writes of other users are left to the flusher
+    buffer.add(habit.id + 1, 2, datetime.utcnow().date(), True)
+    assert client.get(f"/{habit.id}").status_code == 200
+    assert [(p.date, p.completed) for p in Progress.query.all()] == [
+        (datetime.utcnow().date(), True)
+    ]
+    assert buffer.stats()["flushes"] == 1
+    assert len(buffer) == 1
+    assert habit.stats.current_streak == 1
+
+    client.post(f"/{habit.id}/mark/false")
+
+    # A failed flush does not let the request read without the writes
+    def fail(writes):
+        raise RuntimeError("database unavailable")
+
+    buffer._write = fail
+    assert client.get(f"/{habit.id}").status_code == 503
+    assert buffer.pending(1) == {habit.id: {datetime.utcnow().date(): False}}
+    del buffer._write
+
+    buffer.close()
+    db.session.expire_all()
+    assert Progress.query.one().completed is False
+    del app.extensions["write_buffer"]
+
+
+def test_deferred_stats_are_rebuilt_by_jobs(app, client, test_user):
+    """Test progress writes queue deduplicated statistics jobs.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+    """
+    from datetime import date, datetime, timedelta
+    from db import db
+    from habits.factory import HabitFactory
+    from jobs import job_counts, run_next_job
+
+    app.config["STATS_MODE"] = "deferred"
+    client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "Test1234!"},
+        follow_redirects=True,
+    )
+    habit = HabitFactory.create("Stretch", "daily", 1, 21)
+    habit.created_at = datetime.utcnow() - timedelta(days=3)
+    db.session.add(habit)
+    db.session.commit()
+    version = habit.version
+
+    for offset in (2, 1, 0):
+        day = (date.today() - timedelta(days=offset)).isoformat()
+        response = client.post(
+            "/api/progress",
+            json={"habit_id": habit.id, "date": day, "completed": True},
+        )
+        assert response.get_json() == {"success": True, "stats_pending": True}
+    assert job_counts() == {"pending": 1}
+    assert habit.stats.current_streak == 0
+
+    assert run_next_job()
+    db.session.expire_all()
+    assert habit.stats.current_streak == 3
+    assert habit.version == version + 4
+    assert job_counts() == {}
+
+
+def test_admin_analytics_reads_rollups(app, client, test_user):
+    """Test the admin analytics endpoints and their access control.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+    """
+    from datetime import datetime, timedelta
+    from db import db
+    from habits.factory import HabitFactory
+    from models import User
+
+    client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "Test1234!"},
+        follow_redirects=True,
+    )
+    read = HabitFactory.create("Read", "daily", 1, 21)
+    walk = HabitFactory.create("Walk", "weekly", 1, 90)
+    db.session.add_all([read, walk])
+    db.session.commit()
+
+    today = datetime.utcnow().date()
+    tomorrow = today + timedelta(days=1)
+    updates = [
+        {"habit_id": read.id, "date": today.isoformat(), "completed": False},
+        {"habit_id": read.id, "date": tomorrow.isoformat(), "completed": True},
+        {"habit_id": walk.id, "date": today.isoformat(), "completed": True},
+    ]
+    response = client.post("/api/progress/batch", json={"updates": updates})
+    assert response.status_code == 200
+    # Toggles today's entry, which is counted once
+    client.post(f"/{read.id}/mark/true")
+    assert client.get("/admin/analytics/daily").status_code == 403
+
+    User.query.get(1).is_admin = True
+    db.session.commit()
+    query = f"from={today.isoformat()}&to={tomorrow.isoformat()}"
+    days = client.get(f"/admin/analytics/daily?{query}").get_json()["days"]
+    assert [(day["day"], day["active_users"], day["entries"]) for day in days] == [
+        (today.isoformat(), 1, 2),
+        (tomorrow.isoformat(), 1, 1),
+    ]
+
+    response = client.get(f"/admin/analytics/breakdown?{query}&by=target_bucket")
+    groups = response.get_json()["groups"]
+    assert [
+        (group["target_bucket"], group["entries"], group["completion_rate"])
+        for group in groups
+    ] == [("8-21", 2, 100.0), ("67+", 1, 100.0)]
+    assert client.get("/admin/analytics/breakdown?by=user").status_code == 400
+    reversed_range = f"from={tomorrow.isoformat()}&to={today.isoformat()}"
+    response = client.get(f"/admin/analytics/daily?{reversed_range}")
+    assert response.status_code == 400
+
+
+def test_sync_returns_changes_since_version(app, client, test_user):
+    """Test snapshots, collapsed deltas, tombstones, paging and compaction.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+    """
+    from datetime import datetime, timedelta
+    from db import db
+    from habits.factory import HabitFactory
+    from habits.sync import compact_change_log
+
+    client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "Test1234!"},
+        follow_redirects=True,
+    )
+    read = HabitFactory.create("Read", "daily", 1, 21)
+    db.session.add(read)
+    db.session.commit()
+
+    snapshot = client.get("/api/sync").get_json()
+    assert [habit[:2] for habit in snapshot["habits"]] == [[read.id, "Read"]]
+    assert snapshot["progress"] == []
+    version = snapshot["version"]
+
+    today = datetime.utcnow().date()
+    tomorrow = today + timedelta(days=1)
+    client.post(f"/{read.id}/mark/true")
+    client.post(f"/{read.id}/mark/false")
+    updates = [{"habit_id": read.id, "date": tomorrow.isoformat(), "completed": True}]
+    client.post("/api/progress/batch", json={"updates": updates})
+    walk = HabitFactory.create("Walk", "weekly", 1, 21)
+    db.session.add(walk)
+    db.session.commit()
+    client.post(f"/{walk.id}/mark/true")
+    client.post(f"/{walk.id}/delete")
+
+    delta = client.get(f"/api/sync?since={version}").get_json()
+    expected = {
+        "more": False,
+        "deleted": [walk.id],
+        "habits": [],
+        "progress": [
+            [read.id, today.isoformat(), 0],
+            [read.id, tomorrow.isoformat(), 1],
+        ],
+    }
+    assert {key: delta[key] for key in expected} == expected
+    latest = client.get(f"/api/sync?since={delta['version']}").get_json()
+    assert (latest["version"], latest["progress"]) == (delta["version"], [])
+
+    pages, since = [], version
+    while True:
+        page = client.get(f"/api/sync?since={since}&limit=2").get_json()
+        pages.append(page)
+        since = page["version"]
+        if not page["more"]:
+            break
+    assert since == delta["version"]
+    assert len(pages) == 3
+    assert {tuple(row) for page in pages for row in page["progress"]} >= {
+        (read.id, today.isoformat(), 0),
+        (read.id, tomorrow.isoformat(), 1),
+    }
+
+    # Superseded toggle, and the insert and progress of the deleted habit
+    assert compact_change_log() == 3
+    compacted = client.get(f"/api/sync?since={version}").get_json()
+    assert {key: compacted[key] for key in expected} == expected
+
+    # A new habit reusing the deleted habit's ID keeps the tombstone
+    swim = HabitFactory.create("Swim", "daily", 1, 21)
+    db.session.add(swim)
+    db.session.commit()
+    assert swim.id == walk.id
+    assert compact_change_log() == 0
+    compacted = client.get(f"/api/sync?since={version}").get_json()
+    assert compacted["deleted"] == [walk.id]
+    assert [habit[:2] for habit in compacted["habits"]] == [[swim.id, "Swim"]]
+    assert client.get("/api/sync?limit=0").status_code == 400
+    for query in ("since=abc", "since=1.5", "limit=ten"):
+        response = client.get(f"/api/sync?{query}")
+        assert response.status_code == 400
+        assert "must be an integer" in response.get_json()["error"]
@@ -0,0 +1,93 @@
+"""
+Integration tests for the request instrumentation.
+"""
+
+import os
+
+
+def test_instrumentation(app, client, test_user, tmp_path):
+    """Test Server-Timing headers, metrics and profiles of the slowest requests.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+        tmp_path (pathlib.Path): Directory for the profile dumps.
+    """
+    from db import db
+    from habits.factory import HabitFactory
+    from instrumentation import init_instrumentation
+    from models import User
+
+    app.config.update(
+        {
+            "INSTRUMENTATION_ENABLED": True,
+            "INSTRUMENTATION_PROFILE_SLOWEST": 2,
+            "INSTRUMENTATION_PROFILE_SAMPLE_RATE": 1.0,
+            "INSTRUMENTATION_PROFILE_DIR": str(tmp_path),
+        }
+    )
+    instrumentation = init_instrumentation(app)
+    db.session.add(HabitFactory.create("Read", "daily", 1, 21))
+    db.session.commit()
+    client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "Test1234!"},
+        follow_redirects=True,
+    )
+
+    for _ in range(3):
+        response = client.get("/")
+    timing = dict(
+        part.split(";", 1) for part in response.headers["Server-Timing"].split(", ")
+    )
+    assert set(timing) == {"app", "db", "orm", "tpl"}
+    # The habit and its statistics are loaded, besides the user
+    assert int(timing["orm"].split('"')[1].split()[0]) >= 2
+
+    User.query.get(1).is_admin = True
+    db.session.commit()
+    # The login redirect loaded the dashboard once more
+    metrics = client.get("/metrics").get_data(as_text=True)
+    assert 'pytracker_requests_total{endpoint="habits.dashboard",method="GET"} 4' in (
+        metrics
+    )
+    assert "pytracker_user_cache_hits" in metrics
+
+    kept = instrumentation.profiles()["habits.dashboard"]
+    assert len(kept) == 2
+    assert all(os.path.exists(path) for _, path in kept)
+    assert len([name for name in os.listdir(tmp_path) if "dashboard" in name]) == 2
+
+
+def test_metrics_require_admin(app, client, test_user):
+    """Test that the metrics endpoint is restricted to administrators.
+
+    Args:
+        app (Flask): The Flask application instance.
+        client (FlaskClient): Test client for making requests.
+        test_user (User): A fixture providing a test user.
+    """
+    from db import db
+    from instrumentation import init_instrumentation
+    from models import User
+
+    app.config["INSTRUMENTATION_ENABLED"] = True
+    init_instrumentation(app)
+
+    response = client.get("/metrics")
+    assert response.status_code == 302
+    assert "/login" in response.headers["Location"]
+
+    client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "Test1234!"},
+        follow_redirects=True,
+    )
+    assert client.get("/metrics").status_code == 403
+
+    User.query.get(1).is_admin = True
+    db.session.commit()
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "pytracker_requests_total" in response.get_data(as_text=True)
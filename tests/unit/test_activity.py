@@ -0,0 +1,122 @@
+"""
+Unit tests for the asynchronous activity logger.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+from activity import (
+    BLOCK,
+    DROP_NEWEST,
+    DROP_OLDEST,
+    ActivityLogger,
+    FileSink,
+    SQLiteSink,
+)
+
+
+class BlockingSink:
+    """Sink that holds the writer until released and keeps all records."""
+
+    def __init__(self):
+        self.records = []
+        self.release = threading.Event()
+
+    def write(self, records):
+        self.release.wait(5)
+        self.records.extend(records)
+
+    def close(self):
+        pass
+
+
+def _record(index):
+    return {"ts": float(index), "activity": f"activity_{index}", "user_id": 1}
+
+
+def test_overflow_policies():
+    """A full queue drops new or old records, or briefly blocks, per policy."""
+    for policy, kept, accepted in (
+        (DROP_NEWEST, "activity_1", [True, False, False, False]),
+        (DROP_OLDEST, "activity_4", [True, True, True, True]),
+        (BLOCK, "activity_1", [True, False, False, False]),
+    ):
+        sink = BlockingSink()
+        logger = ActivityLogger(
+            sink, max_queue=1, policy=policy, block_timeout=0.01
+        )
+        logger.log(_record(0))
+        # Wait until the writer holds the first record, so the queue is empty
+        while logger.stats()["queued"]:
+            time.sleep(0.001)
+        results = [logger.log(_record(index)) for index in range(1, 5)]
+        sink.release.set()
+        assert logger.flush()
+
+        activities = [record["activity"] for record in sink.records]
+        assert activities == ["activity_0", kept]
+        assert results == accepted
+        assert logger.stats()["dropped"] == 3
+        logger.close()
+
+
+def test_drop_oldest_keeps_flush_markers():
+    """A flush marker pushed out of a full queue is still set."""
+    sink = BlockingSink()
+    logger = ActivityLogger(sink, max_queue=1, policy=DROP_OLDEST)
+    logger.log(_record(0))
+    while logger.stats()["queued"]:
+        time.sleep(0.001)
+
+    flushed = []
+    flusher = threading.Thread(target=lambda: flushed.append(logger.flush(5)))
+    flusher.start()
+    # The marker fills the queue and is the oldest item when the record comes
+    while not logger.stats()["queued"]:
+        time.sleep(0.001)
+    assert logger.log(_record(1))
+    sink.release.set()
+    flusher.join()
+
+    assert flushed == [True]
+    assert logger.stats()["dropped"] == 0
+    logger.close()
+    assert [record["activity"] for record in sink.records] == [
+        "activity_0",
+        "activity_1",
+    ]
+
+
+def test_file_sink_rotation(tmp_path):
+    """The file sink writes JSON lines and rotates at the size limit."""
+    path = tmp_path / "activity.log"
+    logger = ActivityLogger(FileSink(str(path), max_bytes=200, backups=2))
+    for index in range(20):
+        logger.log(_record(index))
+        assert logger.flush()
+    logger.close()
+
+    assert (tmp_path / "activity.log.1").exists()
+    assert (tmp_path / "activity.log.2").exists()
+    assert not (tmp_path / "activity.log.3").exists()
+    last = path.read_text().splitlines()[-1]
+    assert json.loads(last)["activity"] == "activity_19"
+    assert logger.stats()["written"] == 20
+
+
+def test_sqlite_sink_flushes_on_close(tmp_path):
+    """Queued records are written to the SQLite table when closing."""
+    path = tmp_path / "activity.db"
+    logger = ActivityLogger(SQLiteSink(str(path)), flush_interval=10)
+    for index in range(100):
+        logger.log(_record(index))
+    logger.close()
+
+    with sqlite3.connect(path) as connection:
+        count, user_id = connection.execute(
+            "SELECT COUNT(*), MIN(user_id) FROM activity"
+        ).fetchone()
+    assert (count, user_id) == (100, 1)
+    assert logger.log(_record(100)) is False
@@ -0,0 +1,61 @@
+"""
+Unit tests for the vectorized analytics engine.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+
+def test_habit_report_matches_calculators(app):
+    """Test vectorized analytics agree with the streak calculators.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    with app.app_context():
+        from analytics import habit_report
+        from db import db
+        from models import (
+            DailyStreakCalculator,
+            Habit,
+            Progress,
+            WeeklyStreakCalculator,
+            completion_percentage,
+        )
+
+        rng = random.Random(7)
+        start = datetime(2023, 12, 1)
+        for index in range(30):
+            habit = Habit(
+                name=f"Habit {index}",
+                periodicity=rng.choice(["daily", "weekly"]),
+                target_days=rng.choice([7, 21, 90]),
+                created_at=start,
+                user_id=1,
+            )
+            db.session.add(habit)
+            db.session.flush()
+            for offset in range(rng.randint(0, 90)):
+                if rng.random() < 0.8:
+                    db.session.add(
+                        Progress(
+                            habit_id=habit.id,
+                            date=(start + timedelta(days=offset)).date(),
+                            completed=rng.random() < 0.7,
+                        )
+                    )
+        db.session.commit()
+
+        report = {row["habit_id"]: row for row in habit_report()}
+        daily, weekly = DailyStreakCalculator(), WeeklyStreakCalculator()
+        for habit in Habit.query.all():
+            row = report[habit.id]
+            calculator = daily if habit.periodicity == "daily" else weekly
+            completed = len([p for p in habit.progress if p.completed])
+            assert row["current_streak"] == calculator.calculate(habit.progress)
+            assert row["longest_streak"] == calculator.longest(habit.progress)
+            assert row["weekly_streak"] == weekly.calculate(habit.progress)
+            assert row["completed_count"] == completed
+            assert row["completion_rate"] == completion_percentage(
+                completed, habit.created_at, habit.target_days
+            )
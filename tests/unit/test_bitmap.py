@@ -0,0 +1,61 @@
+"""
+Unit tests for the progress bitmap.
+"""
+
+import random
+from datetime import date, timedelta
+
+from bitmap import ProgressBitmap
+from models import DailyStreakCalculator, Progress, WeeklyStreakCalculator
+
+
+def _random_history(rng, origin, days):
+    """Create random progress entries with gaps.
+
+    Args:
+        rng (random.Random): Random generator.
+        origin (date): First possible day.
+        days (int): Number of days to cover.
+
+    Returns:
+        list: Progress entries.
+    """
+    return [
+        Progress(date=origin + timedelta(days=offset), completed=rng.random() < 0.7)
+        for offset in range(days)
+        if rng.random() < 0.8
+    ]
+
+
+def test_bitmap_calculators_match_entry_calculators():
+    """Test bitmap streak calculations agree with the entry based ones."""
+    rng = random.Random(42)
+    origin = date(2023, 12, 20)
+    for _ in range(200):
+        entries = _random_history(rng, origin, rng.randint(0, 120))
+        bitmap = ProgressBitmap.from_entries(origin, entries)
+        for calculator in (DailyStreakCalculator(), WeeklyStreakCalculator()):
+            assert calculator.calculate_bitmap(bitmap) == calculator.calculate(entries)
+            assert calculator.longest_bitmap(bitmap) == calculator.longest(entries)
+        assert bitmap.count() == len([e for e in entries if e.completed])
+
+
+def test_bitmap_set_and_series():
+    """Test setting days, moving the origin and building series."""
+    origin = date(2024, 1, 10)
+    bitmap = ProgressBitmap(origin)
+    bitmap.set(date(2024, 1, 11), True)
+    bitmap.set(date(2024, 1, 12), False)
+    bitmap.set(date(2024, 1, 8), True)
+
+    assert bitmap.origin == date(2024, 1, 8)
+    assert bitmap.get(date(2024, 1, 12)) is False
+    assert bitmap.get(date(2024, 1, 9)) is None
+    assert bitmap.series(date(2024, 1, 7), 6) == [0, 1, 0, 0, 1, 0]
+    assert bitmap.count(date(2024, 1, 9), date(2024, 1, 12)) == 1
+
+    restored = ProgressBitmap.from_bytes(bitmap.origin, *bitmap.to_bytes())
+    assert (restored.recorded, restored.completed) == (
+        bitmap.recorded,
+        bitmap.completed,
+    )
@@ -0,0 +1,45 @@
+"""
+Unit tests for process-local caches.
+"""
+
+from cache import FragmentCache, TTLCache
+
+
+def test_ttl_cache_expiry_and_eviction():
+    """Test TTL expiry, LRU eviction and the hit/miss counters."""
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, timer=lambda: now[0])
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts "b", the least recently used entry
+    assert cache.get("b") is None
+
+    now[0] = 11
+    assert cache.get("a") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "evictions": 1, "size": 1}
+
+
+def test_fragment_cache_memory_cap_and_tags():
+    """Test size-based LRU eviction and invalidation by tag."""
+    cache = FragmentCache(max_bytes=12)
+
+    cache.set(("card", 1), "aaaa", tag=1)
+    cache.set(("chart", 1), ("bb", "cc"), tag=1)
+    cache.set(("card", 2), "dddd", tag=2)
+    assert cache.get(("card", 1)) == "aaaa"
+    cache.set(("card", 3), "eeee", tag=3)  # evicts the chart of habit 1
+    assert cache.get(("chart", 1)) is None
+    cache.set(("card", 4), "x" * 13)  # larger than the cache
+    assert cache.get(("card", 4)) is None
+
+    cache.invalidate_tag(1)
+    assert cache.get(("card", 1)) is None
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 3,
+        "evictions": 1,
+        "size": 2,
+        "bytes": 8,
+    }
@@ -2,6 +2,7 @@
 Unit tests for custom decorators.
 """
 
+from activity import default_logger
 from decorators import log_activity
 
 
@@ -17,6 +18,7 @@ def test_log_activity(capsys):
         return "test"
 
     result = test_func()
+    assert default_logger.flush()
     captured = capsys.readouterr()
 
     assert result == "test"
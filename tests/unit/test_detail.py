@@ -0,0 +1,30 @@
+"""
+Unit tests for habit detail helpers.
+"""
+
+from datetime import date, timedelta
+
+
+def test_build_chart_series(app):
+    """Test chart series building with missing and incomplete days.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    with app.app_context():
+        from habits.routes.detail import build_chart_series
+        from models import Progress
+
+        start = date(2024, 1, 1)
+        entries = [
+            Progress(date=start, completed=True),
+            Progress(date=start + timedelta(days=2), completed=False),
+            Progress(date=start + timedelta(days=3), completed=True),
+        ]
+
+        labels, data, completed = build_chart_series(start, 5, entries)
+
+        assert labels[0] == "2024-01-01"
+        assert labels[-1] == "2024-01-05"
+        assert data == [1, 0, 0, 1, 0]
+        assert completed == 2
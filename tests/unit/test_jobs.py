@@ -0,0 +1,114 @@
+"""
+Unit tests for the background job queue.
+"""
+
+from datetime import datetime, timedelta
+
+
+def test_enqueue_deduplicates_pending_jobs(app):
+    """Test pending jobs with the same key are queued once.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    with app.app_context():
+        from db import db
+        from jobs import JOB_HANDLERS, enqueue, job_counts, run_next_job
+
+        calls = []
+        JOB_HANDLERS["test_record"] = calls.append
+        try:
+            for number in range(3):
+                enqueue("test_record", {"number": number}, dedup_key="record")
+            enqueue("test_record", {"number": 9})
+            db.session.commit()
+            assert job_counts() == {"pending": 2}
+
+            while run_next_job():
+                pass
+        finally:
+            del JOB_HANDLERS["test_record"]
+
+        assert calls == [{"number": 0}, {"number": 9}]
+        assert job_counts() == {}
+
+
+def test_failed_jobs_are_retried_then_failed(app):
+    """Test retries with backoff and the final failure.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    with app.app_context():
+        from db import db
+        from jobs import JOB_HANDLERS, enqueue, run_next_job
+        from models import Job
+
+        def fail(payload):
+            raise RuntimeError("boom")
+
+        JOB_HANDLERS["test_fail"] = fail
+        try:
+            enqueue("test_fail", max_attempts=2)
+            db.session.commit()
+
+            assert run_next_job()
+            job = Job.query.one()
+            assert (job.status, job.attempts) == ("pending", 1)
+            assert job.run_at > datetime.utcnow()
+            assert "boom" in job.last_error
+            assert not run_next_job()
+
+            job.run_at = datetime.utcnow()
+            db.session.commit()
+            assert run_next_job()
+        finally:
+            del JOB_HANDLERS["test_fail"]
+
+        db.session.expire_all()
+        job = Job.query.one()
+        assert (job.status, job.attempts) == ("failed", 2)
+
+
+def test_abandoned_jobs_are_requeued(app):
+    """Test running jobs of a stopped worker are queued again.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    with app.app_context():
+        from db import db
+        from jobs import claim_next_job, enqueue, requeue_stale_jobs
+        from models import Job
+
+        enqueue("refresh_stats", {"habit_id": 1}, dedup_key="stats:1")
+        enqueue("refresh_stats", {"habit_id": 2}, dedup_key="stats:2")
+        db.session.commit()
+        for _ in range(2):
+            job = claim_next_job()
+            job.started_at = datetime.utcnow() - timedelta(hours=1)
+        enqueue("refresh_stats", {"habit_id": 2}, dedup_key="stats:2")
+        db.session.commit()
+
+        assert requeue_stale_jobs(600) == 1
+        assert sorted(job.dedup_key for job in Job.query) == ["stats:1", "stats:2"]
+        assert {job.status for job in Job.query} == {"pending"}
+
+
+def test_worker_starts_on_first_request(app, monkeypatch):
+    """Test the in-process worker starts without waiting for a new job.
+
+    Args:
+        app (Flask): The Flask application instance.
+        monkeypatch (MonkeyPatch): Fixture replacing the thread start.
+    """
+    from jobs import JobWorker, init_jobs
+
+    started = []
+    monkeypatch.setattr(JobWorker, "start", lambda worker: started.append(worker))
+    app.config["JOB_WORKER_THREADS"] = 1
+    worker = init_jobs(app)
+
+    assert app.test_client().get("/login").status_code == 200
+    assert started == [worker]
+    del app.extensions["job_worker"]
@@ -19,3 +19,39 @@ def test_progress_creation(app):
             completed=True,
         )
         assert progress.completed is True
+
+
+def test_progress_write_retries_stale_stats(app, test_user):
+    """Test a progress write that lost a race on its statistics row.
+
+    Args:
+        app (Flask): The Flask application instance.
+        test_user (User): A fixture providing a test user.
+    """
+    with app.app_context():
+        from db import db
+        from habits.factory import HabitFactory
+        from habits.progress import commit_progress, record_progress
+        from models import HabitStats
+
+        habit = HabitFactory.create("Read", "daily", 1, 30)
+        db.session.add(habit)
+        db.session.commit()
+        attempts = []
+
+        def write():
+            stats = habit.stats
+            if not attempts:
+                # Another writer updates the statistics behind the session
+                db.session.execute(
+                    HabitStats.__table__.update()
+                    .where(HabitStats.habit_id == habit.id)
+                    .values(version=stats.version + 1)
+                )
+            attempts.append(stats.version)
+            return record_progress(habit, habit.created_at.date(), True)
+
+        stats = commit_progress(write)
+        assert len(attempts) == 2
+        assert stats.completed_count == 1
+        assert stats.current_streak == 1
@@ -0,0 +1,153 @@
+"""
+Unit tests for the daily analytics rollups.
+"""
+
+import random
+from datetime import date, timedelta
+
+
+def _snapshot():
+    """Read the rollup tables.
+
+    Returns:
+        tuple: Counters per rollup key and the active ``(day, user_id)`` pairs.
+    """
+    from models import DailyActiveUser, DailyRollup
+
+    counters = {
+        (row.day, row.periodicity, row.target_bucket): (row.entries, row.completions)
+        for row in DailyRollup.query
+        if row.entries or row.completions
+    }
+    active = {(row.day, row.user_id) for row in DailyActiveUser.query}
+    return counters, active
+
+
+def test_target_buckets():
+    """Test the bounds of the ``target_days`` buckets."""
+    from habits.rollups import target_bucket
+
+    assert [target_bucket(days) for days in (1, 7, 8, 21, 22, 66, 67, 365)] == [
+        "1-7",
+        "1-7",
+        "8-21",
+        "8-21",
+        "22-66",
+        "22-66",
+        "67+",
+        "67+",
+    ]
+
+
+def test_incremental_rollups_match_rebuild(app, test_user):
+    """Test single, batch and deleting writes against a rebuild.
+
+    Args:
+        app (Flask): The Flask application instance.
+        test_user (User): A fixture providing a test user.
+    """
+    with app.app_context():
+        from db import db
+        from habits.factory import HabitFactory
+        from habits.progress import record_progress, record_progress_many
+        from habits.rollups import (
+            compact_rollups,
+            rebuild_rollups,
+            remove_habit_rollups,
+            rollup_breakdown,
+        )
+        from models import User
+
+        db.session.add(User(username="other", email="other@example.com", password="x"))
+        db.session.flush()
+        habits = [
+            HabitFactory.create(f"Habit {number}", periodicity, user_id, target)
+            for number, (periodicity, user_id, target) in enumerate(
+                [("daily", 1, 7), ("daily", 2, 21), ("weekly", 1, 30), ("daily", 2, 90)]
+            )
+        ]
+        db.session.add_all(habits)
+        db.session.commit()
+
+        rng = random.Random(23)
+        start = date.today()
+        for _ in range(60):
+            if rng.random() < 0.7:
+                habit = rng.choice(habits)
+                day = start + timedelta(days=rng.randrange(10))
+                record_progress(habit, day, rng.random() < 0.6)
+            else:
+                keys = {
+                    (rng.choice(habits).id, start + timedelta(days=rng.randrange(10)))
+                    for _ in range(5)
+                }
+                entries = [
+                    {"habit_id": habit_id, "date": day, "completed": rng.random() < 0.6}
+                    for habit_id, day in sorted(keys)
+                ]
+                record_progress_many(entries)
+            db.session.commit()
+
+        incremental = _snapshot()
+        rebuild_rollups(start, start + timedelta(days=9))
+        assert _snapshot() == incremental
+        assert {key[1:] for key in incremental[0]} <= {
+            ("daily", "1-7"),
+            ("daily", "8-21"),
+            ("weekly", "22-66"),
+            ("daily", "67+"),
+        }
+
+        groups = rollup_breakdown(start, start + timedelta(days=9), "target_bucket")
+        assert [group["target_bucket"] for group in groups] == [
+            "1-7",
+            "8-21",
+            "22-66",
+            "67+",
+        ]
+
+        remove_habit_rollups(habits[1])
+        db.session.delete(habits[1])
+        db.session.commit()
+        counters, _ = _snapshot()
+        compact_rollups(0)
+        rebuild_rollups(start, start + timedelta(days=9))
+        assert _snapshot()[0] == counters
+
+
+def test_imported_progress_updates_rollups(app, test_user):
+    """Test imports of overwritten and new progress apply their deltas.
+
+    Args:
+        app (Flask): The Flask application instance.
+        test_user (User): A fixture providing a test user.
+    """
+    with app.app_context():
+        from db import db
+        from habits.factory import HabitFactory
+        from habits.importer import import_progress
+        from habits.progress import record_progress
+        from habits.rollups import rebuild_rollups
+
+        habits = [
+            HabitFactory.create("Read", "weekly", 1, 14),
+            HabitFactory.create("Walk", "daily", 1, 30),
+        ]
+        db.session.add_all(habits)
+        db.session.commit()
+        start = date.today()
+        record_progress(habits[0], start, True)
+        db.session.commit()
+
+        rng = random.Random(17)
+        days = [(start + timedelta(days=offset)).isoformat() for offset in range(5)]
+        records = [
+            (line, (rng.choice(habits).id, rng.choice(days), rng.random() < 0.5))
+            for line in range(30)
+        ]
+        import_progress(records, user_id=1, chunk_size=6)
+
+        imported = _snapshot()
+        assert imported[0]
+        rebuild_rollups(start, start + timedelta(days=4))
+        assert _snapshot() == imported
@@ -0,0 +1,21 @@
+"""
+Unit tests for the password hashing pool.
+"""
+
+import pytest
+
+from security import HashingPool
+
+
+def test_hashing_failures_are_counted_separately():
+    """Test that failed hashes are not reported as completed."""
+    pool = HashingPool(workers=0)
+    password_hash = pool.hash_password("Test1234!")
+    with pytest.raises(AttributeError):
+        pool.hash_password(None)
+
+    assert pool.check_password(password_hash, "Test1234!")
+    metrics = pool.metrics()
+    assert metrics["completed"] == 2
+    assert metrics["failed"] == 1
+    assert metrics["queue_depth"] == 0
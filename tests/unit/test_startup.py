@@ -0,0 +1,58 @@
+"""
+Unit tests for lazy application startup.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def _loaded_modules(statement, names):
+    """Run a statement in a fresh interpreter and report loaded modules.
+
+    Args:
+        statement (str): Python code to run.
+        names (list): Module names to look up.
+
+    Returns:
+        list: The names that were imported by the statement.
+    """
+    code = (
+        f"import sys; {statement}; "
+        f"print(','.join(name for name in {names!r} if name in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return [name for name in result.stdout.strip().split(",") if name]
+
+
+def test_imports_are_deferred():
+    """Test importing the entry points and the habits package stays light."""
+    heavy = ["flask", "sqlalchemy", "flask_wtf", "habits.routes.dashboard"]
+    assert _loaded_modules("import app", heavy) == []
+    assert _loaded_modules("import wsgi", heavy) == []
+    assert _loaded_modules("import habits", heavy) == ["flask"]
+
+
+def test_lazy_app_builds_once():
+    """Test the lazy WSGI application calls its factory on first use only."""
+    from app import LazyApp
+
+    built = []
+
+    def factory():
+        built.append(object())
+        return lambda environ, start_response: [b"ok"]
+
+    lazy = LazyApp(factory)
+    assert built == []
+    assert lazy({}, None) == [b"ok"]
+    assert lazy({}, None) == [b"ok"]
+    assert len(built) == 1
@@ -0,0 +1,145 @@
+"""
+Unit tests for the run-length encoded streak index.
+"""
+
+import random
+from datetime import date, timedelta
+
+from bitmap import ProgressBitmap
+from models import DailyStreakCalculator, Progress
+from streaks import StreakIndex
+
+
+def _reference_runs(days):
+    """Split a history into runs of completed entries.
+
+    Args:
+        days (dict): Completion state per day.
+
+    Returns:
+        list: First day, last day and length of every run.
+    """
+    runs = []
+    run = None
+    for day in sorted(days):
+        if not days[day]:
+            run = None
+        elif run is None:
+            run = [day, day, 1]
+            runs.append(run)
+        else:
+            run[1] = day
+            run[2] += 1
+    return [tuple(run) for run in runs]
+
+
+def _assert_matches(index, days):
+    """Check an index against the reference runs of a history."""
+    runs = _reference_runs(days)
+    entries = [Progress(date=day, completed=done) for day, done in days.items()]
+    lengths = [length for _, _, length in runs]
+    gaps = [(b[0] - a[1]).days - 1 for a, b in zip(runs, runs[1:])]
+
+    assert index.runs() == runs
+    assert index.count == len(runs)
+    assert index.current == DailyStreakCalculator().calculate(entries)
+    assert index.longest == DailyStreakCalculator().longest(entries)
+    assert index.average == (sum(lengths) / len(lengths) if lengths else 0.0)
+    assert index.longest_gap == max(gaps, default=0)
+    assert index.average_gap == (sum(gaps) / len(gaps) if gaps else 0.0)
+
+
+def test_index_matches_reference():
+    """Test indexes built in one pass against the reference runs."""
+    rng = random.Random(19)
+    origin = date(2024, 1, 1)
+    for _ in range(200):
+        days = {
+            origin + timedelta(days=offset): rng.random() < 0.75
+            for offset in range(rng.randint(0, 200))
+            if rng.random() < 0.85
+        }
+        entries = [Progress(date=day, completed=done) for day, done in days.items()]
+        _assert_matches(StreakIndex.from_entries(origin, entries), days)
+
+
+def test_index_runs_and_gaps():
+    """Test a missed entry splits a run and opens a gap."""
+    origin = date(2024, 1, 1)
+    entries = [
+        Progress(date=origin + timedelta(days=offset), completed=completed)
+        for offset, completed in enumerate((True, False, True))
+    ]
+    index = StreakIndex.from_entries(origin, entries)
+    assert index.runs(limit=1) == [(origin + timedelta(days=2),) * 2 + (1,)]
+    assert (index.current, index.longest, index.longest_gap) == (1, 1, 1)
+
+
+def test_index_updates_match_reference():
+    """Test single-day writes, including toggles and backdated days."""
+    rng = random.Random(91)
+    origin = date(2024, 1, 1)
+    for _ in range(30):
+        index = StreakIndex.from_entries(origin, [])
+        days = {}
+        for _ in range(150):
+            day = origin + timedelta(days=rng.randint(-10, 90))
+            completed = rng.random() < 0.7
+            index.set(day, completed)
+            days[day] = completed
+            _assert_matches(index, days)
+
+
+def test_toggling_a_day_inside_a_run_matches_rebuild():
+    """Test splitting and rejoining a run against a full rebuild."""
+    origin = date(2024, 1, 1)
+    entries = [
+        Progress(date=origin + timedelta(days=offset), completed=offset != 12)
+        for offset in range(30)
+    ]
+    index = StreakIndex.from_entries(origin, entries)
+    middle = origin + timedelta(days=5)
+    for completed in (False, True, False):
+        index.set(middle, completed)
+        bitmap = ProgressBitmap(
+            index.bitmap.origin, index.bitmap.recorded, index.bitmap.completed
+        )
+        assert index.summary() == StreakIndex(bitmap).summary()
+    assert [length for _, _, length in index.runs()] == [5, 6, 17]
+
+
+def test_cached_index_follows_progress_writes(app, test_user):
+    """Test progress writes update the cached index of a habit.
+
+    Args:
+        app (Flask): The Flask application instance.
+        test_user (User): A fixture providing a test user.
+    """
+    with app.app_context():
+        from cache import get_cache
+        from db import db
+        from habits.factory import HabitFactory
+        from habits.progress import record_progress
+        from streaks import cached_streak_index
+
+        habit = HabitFactory.create("Run", "daily", 1, 30)
+        db.session.add(habit)
+        db.session.commit()
+        start = habit.created_at.date()
+        for offset in range(6):
+            record_progress(habit, start + timedelta(days=offset), True)
+        db.session.commit()
+
+        index = cached_streak_index(habit.id, habit.stats.bitmap())
+        record_progress(habit, start + timedelta(days=3), False)
+        db.session.commit()
+
+        updated = get_cache("streak_cache").get(habit.id)
+        assert updated is not index
+        assert index.longest == 6
+        assert cached_streak_index(habit.id, habit.stats.bitmap()) is updated
+        assert updated.summary() == StreakIndex(habit.stats.bitmap()).summary()
+        assert updated.runs() == [
+            (start, start + timedelta(days=2), 3),
+            (start + timedelta(days=4), start + timedelta(days=5), 2),
+        ]
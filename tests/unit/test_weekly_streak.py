@@ -0,0 +1,119 @@
+"""
+Unit tests for weekly streaks.
+"""
+
+import random
+from datetime import date, datetime, timedelta
+
+from bitmap import ProgressBitmap
+from habits.stats import bitmap_stats, update_stats
+from models import (
+    Habit,
+    HabitStats,
+    Progress,
+    WeeklyStreakCalculator,
+    week_index,
+    week_key,
+)
+
+
+def _reference_streaks(days):
+    """Compute weekly streaks by walking every week of a history.
+
+    Args:
+        days (dict): Completion state per day.
+
+    Returns:
+        tuple: Current and longest weekly streak.
+    """
+    if not days:
+        return 0, 0
+    completed = {day.isocalendar()[:2] for day, done in days.items() if done}
+    first, last = min(days), max(days)
+    longest = run = 0
+    day = first - timedelta(days=first.weekday())
+    while day <= last:
+        run = run + 1 if day.isocalendar()[:2] in completed else 0
+        longest = max(longest, run)
+        day += timedelta(weeks=1)
+    return run, longest
+
+
+def _random_days(rng, origin, days):
+    """Create a random history with missing and empty weeks.
+
+    Args:
+        rng (random.Random): Random generator.
+        origin (date): First possible day.
+        days (int): Number of days to cover.
+
+    Returns:
+        dict: Completion state per day.
+    """
+    density = rng.choice([0.1, 0.3, 0.8])
+    return {
+        origin + timedelta(days=offset): rng.random() < 0.6
+        for offset in range(days)
+        if rng.random() < density
+    }
+
+
+def test_week_index_is_consecutive_across_years():
+    """Test week indexes of ISO weeks around year boundaries."""
+    assert week_key(week_index(date(2020, 12, 31))) == (2020, 53)
+    assert week_index(date(2021, 1, 4)) == week_index(date(2020, 12, 31)) + 1
+    assert week_key(week_index(date(2021, 1, 3))) == (2020, 53)
+    assert week_key(week_index(date(2024, 12, 30))) == (2025, 1)
+
+    # Week 1 of two different years is not the same week
+    calculator = WeeklyStreakCalculator()
+    entries = [
+        Progress(date=date(2023, 1, 2), completed=True),
+        Progress(date=date(2024, 1, 1), completed=True),
+    ]
+    assert calculator.calculate(entries) == 1
+    assert calculator.longest(entries) == 1
+
+
+def test_calculators_match_reference():
+    """Test the entry and bitmap calculators against the reference."""
+    rng = random.Random(18)
+    calculator = WeeklyStreakCalculator()
+    for _ in range(300):
+        origin = date(2020, 11, 1) + timedelta(days=rng.randrange(60))
+        days = _random_days(rng, origin, rng.randint(0, 500))
+        entries = [Progress(date=day, completed=done) for day, done in days.items()]
+        bitmap = ProgressBitmap.from_entries(origin, entries)
+        current, longest = _reference_streaks(days)
+
+        assert calculator.calculate(entries) == current
+        assert calculator.longest(entries) == longest
+        assert calculator.calculate_bitmap(bitmap) == current
+        assert calculator.longest_bitmap(bitmap) == longest
+
+
+def test_incremental_updates_match_reference():
+    """Test single-day writes to the statistics against the reference."""
+    rng = random.Random(81)
+    created_at = datetime(2020, 12, 1)
+    for _ in range(40):
+        habit = Habit(periodicity="weekly", created_at=created_at)
+        habit.stats = HabitStats()
+        days = {}
+        day = created_at.date()
+        for _ in range(rng.randint(1, 150)):
+            if days and rng.random() < 0.2:
+                # Backdated write or toggle of an earlier day
+                write = rng.choice(list(days))
+            else:
+                day += timedelta(days=rng.choice([1, 1, 1, 2, 4, 9]))
+                write = day
+            completed = rng.random() < 0.6
+            update_stats(habit, write, days.get(write), completed)
+            days[write] = completed
+
+            current, longest = _reference_streaks(days)
+            assert habit.stats.current_streak == current
+            assert habit.stats.longest_streak == longest
+            rebuilt = bitmap_stats("weekly", habit.stats.bitmap())
+            assert habit.stats.weeks_before_latest == rebuilt["weeks_before_latest"]
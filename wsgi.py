@@ -0,0 +1,25 @@
+"""WSGI entry point for production servers.
+
+By default workers build the application on their first request, so they
+boot without importing Flask or SQLAlchemy::
+
+    gunicorn wsgi:app
+
+With ``PYTRACKER_PRELOAD=1`` the application is built at import, so servers
+that preload it share one copy between their forked workers; the database
+connections pooled while preloading are dropped in every worker::
+
+    PYTRACKER_PRELOAD=1 gunicorn --preload wsgi:app
+"""
+
+import os
+
+from app import LazyApp, create_app
+
+if os.environ.get("PYTRACKER_PRELOAD", "").lower() in ("1", "true"):
+    from db import dispose_after_fork
+
+    app = create_app()
+    dispose_after_fork(app)
+else:
+    app = LazyApp(create_app)